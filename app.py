@@ -1,30 +1,32 @@
-
 import sys
 import os, time
+import json
 import asyncio
 import logging
+import traceback
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
 from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from pydantic import BaseModel
-import chromadb
-from dotenv import load_dotenv
-load_dotenv()
-
-CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
 
 # Ensure project root is in sys.path
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
-from src.vector_search.document_processor import DocumentProcessor
-from src.vector_search.vector_store import VectorStore
-import traceback
+# Importing the config loads .env, so it comes before anything that reads the environment
+from src.config import llm_name, chroma_collection_name, chroma_host, ingest_on_startup, vector_backend
+from src.config import embedding_backend, chroma_wait_timeout
+from src.utils.metrics import metrics, start_trace
+from src.utils.readiness import Readiness, wait_with_backoff
+from src.utils.location_extractor import get_location_extractor
 
-from dotenv import load_dotenv
-load_dotenv()
+# Heavy dependencies (torch, chromadb, LangChain/LangGraph, the Mistral client) are imported
+# inside the startup steps that need them, so the module imports in well under a second and
+# the server answers liveness probes while they load; benchmarks/import_time.py guards this.
+if TYPE_CHECKING:
+    from src.vector_search.vector_store import VectorStore
 
-from langchain_mistralai import ChatMistralAI
-from src.agent.prompts import Prompts
-from src.agent.travel_agent import TravelChatbotGraph
-from src.config import llm_name
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
 
 logging.basicConfig(
     level=logging.INFO,
@@ -37,55 +39,162 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("sentence_transformers").setLevel(logging.WARNING)
 logger = logging.getLogger("agent")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global startup_task
+    # Initialise in the background so the server accepts connections (and liveness probes) right away
+    startup_task = asyncio.create_task(initialize())
+    startup_task.add_done_callback(log_task_failure)
+    yield
+    await close_clients()
+
+
 # Setup FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Request schema
 class QueryRequest(BaseModel):
     query: str
     chat_history: list = []
+    # skip the semantic response cache for this request
+    bypass_cache: bool = False
 
-# Agent setup with Mistral LLM and TravelChatbotGraph
-api_key = os.environ["MISTRAL_API_KEY"]
-llm = ChatMistralAI(
-    model="mistral-small",
-    temperature=0.5,
-    max_retries=2,
-    mistral_api_key=api_key,
-)
-prompts = Prompts()
-graph = TravelChatbotGraph(llm=llm, prompts=prompts)
-
-@app.on_event("startup")
-async def load_book_to_chromadb():
-    # Wait for ChromaDB to be ready
-    max_retries = 30
-    for i in range(max_retries):
-        try:
-            client = chromadb.HttpClient(host="chromadb", port=CHROMA_PORT)
-            client.get_version()
-            break
-        except Exception:
-            logger.info("Retrying to connect to chromadb")
-            time.sleep(1)
-    else:
-        raise RuntimeError("ChromaDB not available after waiting")
-    
-    vector_store = VectorStore(collection_name="twain_book", chroma_host="chromadb", chroma_port=CHROMA_PORT)
-    if vector_store.collection.count() == 0:
-        print("Loading book into ChromaDB...")
-        processor = DocumentProcessor()
-        book_path = "src/data/book.txt"
-        chunks = processor.load_and_process_document(book_path)
-        vector_store.add_documents(chunks)
-        print("Book loaded into ChromaDB.")
+# The LLM client is created at startup, unless a test harness has already set one
+llm = None
+# The graph is built at startup, once the shared vector store exists
+graph = None
+# Background startup and ingestion tasks, kept referenced while they run
+startup_task = None
+ingestion_task = None
+# Dependencies that must be up before /readyz reports ready and /ask serves requests
+readiness = Readiness(required=["vector_index", "embedding_model", "llm", "location_extractor", "graph"])
+
+
+def build_llm():
+    from langchain_mistralai import ChatMistralAI
+    return ChatMistralAI(
+        model="mistral-small",
+        temperature=0.5,
+        max_retries=2,
+        mistral_api_key=os.environ["MISTRAL_API_KEY"],
+    )
+
+
+def load_embedder():
+    from src.vector_search.embedders import load_embedder as create_embedder
+    embedder = create_embedder(embedding_backend)
+    embedder.encode(["warmup"])
+    return embedder
+
+
+def connect_chroma():
+    import chromadb
+    client = chromadb.HttpClient(host=chroma_host, port=CHROMA_PORT)
+    client.heartbeat()
+    return client
+
+
+def log_task_failure(task: asyncio.Task):
+    """Retrieve a background task's exception as soon as it ends, rather than when a probe asks"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background task {task.get_name()} failed", exc_info=task.exception())
+
+
+async def initialize():
+    global graph, llm, ingestion_task
+
+    async def wait_for_index():
+        # The in-process numpy backend has no server to wait for
+        if vector_backend == "chroma":
+            await wait_with_backoff(connect_chroma, "ChromaDB", timeout=chroma_wait_timeout)
+
+    async def load_llm():
+        return llm if llm is not None else await asyncio.to_thread(build_llm)
+
+    # Independent steps load in parallel; model loading releases the GIL for most of its time
+    _, embedder, llm, location_extractor = await asyncio.gather(
+        readiness.track("vector_index", wait_for_index),
+        readiness.track("embedding_model", lambda: asyncio.to_thread(load_embedder)),
+        readiness.track("llm", load_llm),
+        readiness.track("location_extractor", lambda: asyncio.to_thread(get_location_extractor)),
+    )
+
+    def build_graph():
+        from src.vector_search.vector_store import VectorStore, set_vector_store
+        from src.vector_search.corpus import CorpusRouter, load_corpus_registry
+        from src.agent.prompts import Prompts
+        from src.agent.travel_agent import TravelChatbotGraph
+
+        # One store and embedder per process, shared by the graph and the ingestion below
+        vector_store = VectorStore(collection_name=chroma_collection_name, chroma_host=chroma_host,
+                                   chroma_port=CHROMA_PORT, embedder=embedder)
+        set_vector_store(vector_store)
+        vector_store.warmup()
+
+        # Every registered corpus gets its own collection; the stores share one embedder and cache
+        corpora = load_corpus_registry()
+        stores = {
+            name: vector_store if name == chroma_collection_name else VectorStore(
+                collection_name=name, chroma_host=chroma_host, chroma_port=CHROMA_PORT,
+                embedder=vector_store.embedder, embedding_cache=vector_store.embedding_cache)
+            for name in corpora
+        }
+        corpus_router = CorpusRouter(corpora, stores) if len(stores) > 1 else None
+        travel_graph = TravelChatbotGraph(llm=llm, prompts=Prompts(), vector_store=vector_store,
+                                          location_extractor=location_extractor, corpus_router=corpus_router)
+        if travel_graph.rag_tool.reranker is not None:
+            travel_graph.rag_tool.reranker.warmup()
+        return travel_graph, vector_store, corpora, stores
+
+    graph, vector_store, corpora, stores = await readiness.track("graph", lambda: asyncio.to_thread(build_graph))
+    register_component_stats(vector_store)
+
+    from src.vector_search.ingestion import IngestionPipeline
+    pending = []
+    for name, corpus in corpora.items():
+        pipeline = IngestionPipeline(stores[name])
+        if ingest_on_startup and not pipeline.is_complete(corpus.document_paths()):
+            pending.append((pipeline, corpus.document_paths()))
+    if not ingest_on_startup:
+        logger.info("Startup ingestion disabled, run `python -m src.vector_search.ingestion` separately.")
+        readiness.set("ingestion", "skipped")
+    elif not pending:
+        logger.info("All corpora already ingested, skipping load.")
+        readiness.set("ingestion", "ok")
     else:
-        print("ChromaDB already has data, skipping book load.")
-    
+        # Ingest in the background (resuming any interrupted run); the API serves meanwhile
+        logger.info(f"Loading {len(pending)} corpora in the background...")
+        ingestion_task = asyncio.create_task(readiness.track(
+            "ingestion", lambda: asyncio.to_thread(lambda: [pipeline.run(paths) for pipeline, paths in pending])))
+        ingestion_task.add_done_callback(log_task_failure)
 
-@app.post("/ask")
-async def ask_agent(request: QueryRequest):
-    init_state = {
+
+def register_component_stats(vector_store: "VectorStore"):
+    """Expose the counters the caches and batchers already keep on /metrics"""
+    from src.tools.wether_api import get_weather_client
+    from src.tools.weather_cache import get_weather_cache
+    weather_client = get_weather_client()
+    metrics.register_stats("embedding_cache", vector_store.embedding_cache.stats)
+    metrics.register_stats("embedding_batcher", vector_store.batcher.stats)
+    metrics.register_stats("weather_cache", get_weather_cache().stats)
+    metrics.register_stats("weather_client", lambda: {"upstream_calls": weather_client.upstream_calls,
+                                                      "coalesced_calls": weather_client.coalesced_calls})
+    metrics.register_stats("intent_classifier", graph.intent_classifier.stats)
+    if graph.response_cache is not None:
+        metrics.register_stats("response_cache", graph.response_cache.stats)
+    if graph.rag_tool.reranker is not None:
+        metrics.register_stats("reranker", graph.rag_tool.reranker.stats)
+
+
+async def close_clients():
+    # Nothing to close if startup never got as far as creating the client
+    if "src.tools.wether_api" in sys.modules:
+        from src.tools.wether_api import get_weather_client
+        await get_weather_client().aclose()
+
+
+def build_init_state(request: QueryRequest) -> dict:
+    return {
         "query": request.query,
         "intent": "",
         "context": "",
@@ -93,13 +202,136 @@ async def ask_agent(request: QueryRequest):
         "weather_info": "",
         "final_answer": "",
         "chat_history": request.chat_history,
+        "bypass_cache": request.bypass_cache,
+        "error": "",
+        "timings": {},
     }
-    logger.info(f"Received query: {request.query}")
-    logger.info(f"Chat history: {request.chat_history}")
+
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process serves requests; fails only if startup itself crashed"""
+    if startup_task is not None and startup_task.done() and startup_task.exception() is not None:
+        return JSONResponse({"status": "failed", "error": str(startup_task.exception())}, status_code=503)
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: every required dependency is loaded, with per-dependency status and cold start time"""
+    report = readiness.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+def not_ready_response() -> JSONResponse:
+    return JSONResponse({"response": "The travel assistant is still starting up, please retry in a moment."},
+                        status_code=503)
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/ask")
+async def ask_agent(request: QueryRequest, http_request: Request):
+    if graph is None:
+        return not_ready_response()
+    # A caller-supplied trace id lets the request be followed across services
+    trace = start_trace(http_request.headers.get("X-Trace-Id"))
+    init_state = build_init_state(request)
+    logger.info(f"[{trace.trace_id}] Received query: {request.query}")
+    logger.info(f"[{trace.trace_id}] Chat history: {request.chat_history}")
     try:
-        result = await graph.graph.ainvoke(init_state)
-        logger.info(f"Agent result: {result}")
-        return {"response": result.get("final_answer", "")}
+        with metrics.timer("request.ask"):
+            result = await graph.graph.ainvoke(init_state)
+        logger.info(f"[{trace.trace_id}] Agent result: {result}")
+        logger.info(f"[{trace.trace_id}] Stage timings (ms): {trace.summary()}")
+        return {"response": result.get("final_answer", ""), "trace_id": trace.trace_id}
     except Exception as e:
-        logger.error(f"Agent error: {e}\n{traceback.format_exc()}")
-        return {"response": f"Error: {e}"}
\ No newline at end of file
+        metrics.inc("request_errors_total", endpoint="ask")
+        logger.error(f"[{trace.trace_id}] Agent error: {e}\n{traceback.format_exc()}")
+        return {"response": f"Error: {e}", "trace_id": trace.trace_id}
+
+
+# Nodes whose LLM tokens are streamed to the client, and the progress event emitted when other nodes finish
+STREAMED_NODES = {"final_response_node", "chitchat_node"}
+PROGRESS_EVENTS = {
+    "oracle_node": "intent_decided",
+    "get_loc_from_query_node": "locations_found",
+    "get_loc_from_book_node": "passages_retrieved",
+    "book_retriever_node": "passages_retrieved",
+    "get_weather_node": "weather_fetched",
+}
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def progress_payload(node: str, output: dict) -> dict:
+    if node == "oracle_node":
+        return {"intent": output.get("intent", ""), "cached": bool(output.get("final_answer"))}
+    payload = {}
+    if "locations" in output:
+        payload["locations"] = output["locations"]
+    if "context" in output:
+        payload["passages"] = output["context"].count("Passage ")
+    if "weather_info" in output:
+        payload["locations_with_weather"] = len(output["weather_info"] or [])
+    return payload
+
+
+@app.post("/ask/stream")
+async def ask_agent_stream(request: QueryRequest, http_request: Request):
+    """Stream graph progress and answer tokens as Server-Sent Events"""
+    if graph is None:
+        return not_ready_response()
+    init_state = build_init_state(request)
+    trace_id = http_request.headers.get("X-Trace-Id")
+
+    async def event_stream():
+        # The trace is started inside the generator, which runs in the response's own context
+        trace = start_trace(trace_id)
+        logger.info(f"[{trace.trace_id}] Received streaming query: {request.query}")
+        streamed_tokens = False
+        final_answer, error = "", ""
+        start = time.perf_counter()
+        try:
+            async for event in graph.graph.astream_events(init_state, version="v2"):
+                kind = event["event"]
+                node = event.get("metadata", {}).get("langgraph_node")
+                if kind == "on_chat_model_stream" and node in STREAMED_NODES:
+                    token = event["data"]["chunk"].content
+                    if token:
+                        streamed_tokens = True
+                        yield sse_event("token", {"text": token})
+                elif kind == "on_chain_end" and event["name"] in PROGRESS_EVENTS and event["name"] == node:
+                    output = event["data"].get("output") or {}
+                    yield sse_event(PROGRESS_EVENTS[node], progress_payload(node, output))
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    output = event["data"].get("output") or {}
+                    final_answer, error = output.get("final_answer", ""), output.get("error", "")
+            if error:
+                # The LLM failed, possibly mid-answer: say so explicitly rather than leave a truncated answer
+                metrics.inc("request_errors_total", endpoint="ask_stream")
+                logger.error(f"[{trace.trace_id}] Answer generation failed: {error}")
+                yield sse_event("error", {"message": error, "fallback": final_answer, "partial": streamed_tokens,
+                                          "trace_id": trace.trace_id})
+                return
+            # Cached and fallback answers never went through a streaming LLM call
+            if not streamed_tokens and final_answer:
+                yield sse_event("token", {"text": final_answer})
+            metrics.observe("request.ask_stream", time.perf_counter() - start)
+            logger.info(f"[{trace.trace_id}] Stage timings (ms): {trace.summary()}")
+            yield sse_event("done", {"response": final_answer, "trace_id": trace.trace_id})
+        except Exception as e:
+            metrics.inc("request_errors_total", endpoint="ask_stream")
+            logger.error(f"[{trace.trace_id}] Agent error: {e}\n{traceback.format_exc()}")
+            yield sse_event("error", {"message": str(e), "trace_id": trace.trace_id})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,110 @@
+"""Compare the embedding backends on startup time, memory and encode latency.
+
+Each backend runs in a fresh interpreter so startup time (imports, model load, first
+encode) and resident memory are measured from a cold process, as a new API worker
+would see them. Reported per backend: startup ms, RSS after load and peak RSS, whether
+torch was loaded, single-query encode latency percentiles and batch throughput.
+
+Usage: python benchmarks/bench_embedders.py [--backends torch onnx onnx-int8] [--queries 300]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+_SENTENCE = re.compile(r"[^.!?]{20,200}[.!?]")
+
+
+def rss_mb():
+    """Current and peak resident memory of this process (Linux /proc)"""
+    try:
+        with open("/proc/self/status") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(status["VmRSS"].split()[0]) / 1024, int(status["VmHWM"].split()[0]) / 1024
+    except (OSError, KeyError):
+        return None, None
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return round(values[min(int(q * len(values)), len(values) - 1)], 2)
+
+
+def measure(backend, model_dir, n_queries, batch_size):
+    """Worker side: everything from the first import of the backend is counted as startup"""
+    start = time.perf_counter()
+    from src.vector_search.embedders import load_embedder
+    embedder = load_embedder(backend, model_dir=model_dir)
+    embedder.encode(["warmup"])
+    startup_ms = (time.perf_counter() - start) * 1000
+    rss_loaded, _ = rss_mb()
+
+    from src.config import book_path
+    with open(book_path, encoding="utf-8") as f:
+        sentences = [s.strip() for s in _SENTENCE.findall(f.read(2_000_000).replace("\n", " "))]
+    queries = sentences[:n_queries]
+    latencies = []
+    for query in queries:
+        t = time.perf_counter()
+        embedder.encode([query])
+        latencies.append((time.perf_counter() - t) * 1000)
+
+    passages = [" ".join(sentences[i:i + 6]) for i in range(0, min(len(sentences), 6 * 256), 6)]
+    t = time.perf_counter()
+    embedder.encode(passages, batch_size=batch_size)
+    batch_seconds = time.perf_counter() - t
+    _, rss_peak = rss_mb()
+    return {
+        "backend": backend,
+        "startup_ms": round(startup_ms, 1),
+        "rss_loaded_mb": rss_loaded,
+        "rss_peak_mb": rss_peak,
+        "torch_loaded": "torch" in sys.modules,
+        "query_ms": {"p50": percentile(latencies, 0.5), "p95": percentile(latencies, 0.95),
+                     "p99": percentile(latencies, 0.99)},
+        "batch_texts_per_s": round(len(passages) / batch_seconds, 1),
+    }
+
+
+def main(args):
+    results = []
+    for backend in args.backends:
+        command = [sys.executable, os.path.abspath(__file__), "--worker", backend, "--model-dir", args.model_dir,
+                   "--queries", str(args.queries), "--batch-size", str(args.batch_size)]
+        completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{backend:>10}: failed\n{completed.stderr[-1500:]}")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        results.append(result)
+        rss = f"{result['rss_loaded_mb']:.0f}/{result['rss_peak_mb']:.0f}" if result["rss_loaded_mb"] else "n/a"
+        print(f"{backend:>10}: startup {result['startup_ms']:8.1f} ms  rss loaded/peak {rss} MB  "
+              f"torch {'yes' if result['torch_loaded'] else 'no '}  query p50 {result['query_ms']['p50']:6.2f} ms  "
+              f"p95 {result['query_ms']['p95']:6.2f} ms  batch {result['batch_texts_per_s']:7.1f} texts/s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--model-dir", default=None, help="exported ONNX artifacts (default: embedding_onnx_dir)")
+    parser.add_argument("--json", help="write the results to this JSON file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.model_dir is None:
+        from src.config import embedding_onnx_dir
+        args.model_dir = embedding_onnx_dir
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.model_dir, args.queries, args.batch_size)))
+    else:
+        main(args)
@@ -0,0 +1,59 @@
+"""Compare per-call query encoding with the micro-batcher under concurrent load.
+
+Usage: python benchmarks/bench_embedding_batcher.py --concurrency 64 --rounds 5
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sentence_transformers import SentenceTransformer
+
+from src.config import embedding_model_name, embedding_max_workers
+from src.vector_search.batcher import EmbeddingBatcher
+
+
+def make_queries(n):
+    # Distinct queries so the batcher can't win by deduplication alone
+    return [f"What did Mark Twain think about place number {i}?" for i in range(n)]
+
+
+async def run_per_call(embedder, executor, queries):
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*[loop.run_in_executor(executor, embedder.encode, [q]) for q in queries])
+
+
+async def run_batched(batcher, queries):
+    await asyncio.gather(*[batcher.encode(q) for q in queries])
+
+
+async def main(args):
+    embedder = SentenceTransformer(embedding_model_name)
+    embedder.encode(["warmup"])
+    executor = ThreadPoolExecutor(max_workers=embedding_max_workers)
+    batcher = EmbeddingBatcher(embedder.encode, executor=executor,
+                               max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    queries = make_queries(args.concurrency)
+
+    for name, run in (("per-call", lambda: run_per_call(embedder, executor, queries)),
+                      ("batched", lambda: run_batched(batcher, queries))):
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            await run()
+        elapsed = time.perf_counter() - start
+        total = args.rounds * args.concurrency
+        print(f"{name:>9}: {total / elapsed:8.1f} queries/s  ({elapsed * 1000 / args.rounds:.1f} ms per round)")
+    print(f"batcher stats: {batcher.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,54 @@
+"""Measure per-request cost of building prompt chains versus reusing precompiled ones.
+
+Usage: python benchmarks/bench_prompt_chains.py --iterations 2000
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
+
+from src.agent.prompts import Prompts
+
+
+def build_per_request(prompts, llm):
+    # What every graph node used to do on each request
+    return [
+        prompts.create_oracle_prompt_template() | llm | JsonOutputParser(),
+        prompts.create_get_locations_from_query_prompt_template() | llm | JsonOutputParser(),
+        prompts.create_get_locations_from_book_prompt_template() | llm | JsonOutputParser(),
+        prompts.create_final_response_prompt_template() | llm | StrOutputParser(),
+        prompts.create_chitchat_prompt_template() | llm | StrOutputParser(),
+    ]
+
+
+def measure(label, fn, iterations):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>12}: {elapsed * 1e6 / iterations:9.1f} us/request  peak traced memory {peak / 1024:8.1f} KiB")
+
+
+def main(args):
+    llm = FakeListChatModel(responses=["{}"])
+    prompts = Prompts()
+    prompts.validate()
+    compiled = build_per_request(prompts, llm)
+
+    measure("per-request", lambda: build_per_request(prompts, llm), args.iterations)
+    measure("precompiled", lambda: compiled, args.iterations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    main(parser.parse_args())
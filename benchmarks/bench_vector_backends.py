@@ -0,0 +1,99 @@
+"""Compare the in-process numpy index with the Chroma HTTP server on the same vectors.
+
+Loads identical vectors into a temporary NumpyCollection and a temporary Chroma
+collection, then reports per-query latency, single-client QPS and how often both
+return the same top-k ids (Chroma's HNSW is approximate, the numpy index is exact).
+
+Usage: python benchmarks/bench_vector_backends.py --host localhost --port 8000 --queries 200
+       python benchmarks/bench_vector_backends.py --synthetic 5000   # random vectors, no model load
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.config import book_path, chroma_host, chroma_port, chunk_size, chunk_overlap, embedding_model_name
+from src.vector_search.numpy_index import NumpyClient
+
+
+def load_vectors(args):
+    """(ids, documents, embeddings, query embeddings) from the book, or random unit vectors"""
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        embeddings = rng.standard_normal((args.synthetic, 384)).astype(np.float32)
+        queries = rng.standard_normal((args.queries, 384)).astype(np.float32)
+        return [f"doc_{i}" for i in range(args.synthetic)], [""] * args.synthetic, embeddings, queries
+
+    from sentence_transformers import SentenceTransformer
+    from src.vector_search.document_processor import DocumentProcessor
+
+    chunks = DocumentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap).load_and_process_document(book_path)
+    embedder = SentenceTransformer(embedding_model_name)
+    texts = [chunk['text'] for chunk in chunks]
+    embeddings = embedder.encode(texts, batch_size=64)
+    # Queries are passages of the book itself, so there is a meaningful nearest neighbour
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(texts), size=min(args.queries, len(texts)), replace=False)
+    queries = embedder.encode([texts[i][:200] for i in sample])
+    return [chunk['id'] for chunk in chunks], texts, embeddings, queries
+
+
+def fill(collection, ids, documents, embeddings, batch=512):
+    for start in range(0, len(ids), batch):
+        collection.upsert(ids=ids[start:start + batch], documents=documents[start:start + batch],
+                          embeddings=embeddings[start:start + batch].tolist())
+
+
+def measure(name, collection, queries, k):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=['distances'])
+        latencies.append(time.perf_counter() - start)
+        results.append(result['ids'][0])
+    latencies_ms = np.array(latencies) * 1000
+    print(f"{name:>7}: p50 {np.percentile(latencies_ms, 50):7.2f} ms  p95 {np.percentile(latencies_ms, 95):7.2f} ms  "
+          f"{len(queries) / sum(latencies):8.1f} queries/s")
+    return results
+
+
+def main(args):
+    ids, documents, embeddings, queries = load_vectors(args)
+    print(f"{len(ids)} vectors of dimension {embeddings.shape[1]}, {len(queries)} queries, k={args.k}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        numpy_collection = NumpyClient(directory).get_or_create_collection("bench")
+        fill(numpy_collection, ids, documents, embeddings)
+        numpy_results = measure("numpy", numpy_collection, queries, args.k)
+
+    if args.skip_chroma:
+        return
+    import chromadb
+    client = chromadb.HttpClient(host=args.host, port=args.port)
+    name = f"bench_{int(time.time())}"
+    chroma_collection = client.get_or_create_collection(name=name, metadata={"hnsw:space": "cosine"})
+    try:
+        fill(chroma_collection, ids, documents, embeddings)
+        chroma_results = measure("chroma", chroma_collection, queries, args.k)
+    finally:
+        client.delete_collection(name)
+
+    same_order = sum(a == b for a, b in zip(numpy_results, chroma_results))
+    overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(numpy_results, chroma_results)])
+    print(f"identical top-{args.k}: {same_order}/{len(queries)}  mean id overlap: {overlap:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=chroma_host)
+    parser.add_argument("--port", type=int, default=chroma_port)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--synthetic", type=int, default=0, help="use this many random vectors instead of the book")
+    parser.add_argument("--skip-chroma", action="store_true", help="only time the numpy index")
+    main(parser.parse_args())
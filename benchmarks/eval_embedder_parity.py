@@ -0,0 +1,87 @@
+"""Check that the ONNX embedding backends agree with the PyTorch SentenceTransformer.
+
+Encodes book passages and queries with every backend and compares them to the torch
+embeddings: per-text cosine similarity, and retrieval agreement (overlap of the top-k
+passages when the backend's query vectors search the torch-encoded passages, which is
+what happens when only the query encoder is switched). Exits non-zero when the mean
+cosine falls under the threshold for a backend. Needs torch and exported artifacts
+(python -m src.vector_search.embedders).
+
+Usage: python benchmarks/eval_embedder_parity.py [--passages 500] [--queries 200] [--k 4]
+"""
+import os
+import re
+import sys
+import random
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.config import book_path, chunk_size, chunk_overlap, embedding_onnx_dir
+from src.vector_search.document_processor import DocumentProcessor
+from src.vector_search.embedders import load_embedder
+
+_SENTENCE = re.compile(r"[^.!?]{40,200}[.!?]")
+TRAVEL_QUERIES = [
+    "What's the weather like in Paris?", "What did Mark Twain write about Venice?",
+    "How did the pilgrims behave in Jerusalem?", "Tell me about the voyage of the Quaker City",
+    "Is it raining in Naples right now?", "What did Twain think of the Sphinx?",
+]
+
+
+def build_texts(n_passages, n_queries, seed=0):
+    chunks = DocumentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap).load_and_process_document(book_path)
+    rng = random.Random(seed)
+    passages = [chunk['text'] for chunk in rng.sample(chunks, min(n_passages, len(chunks)))]
+    sentences = _SENTENCE.findall(" ".join(passages).replace("\n", " "))
+    queries = TRAVEL_QUERIES + [s.strip() for s in rng.sample(sentences, min(n_queries, len(sentences)))]
+    return passages, queries[:max(n_queries, len(TRAVEL_QUERIES))]
+
+
+def top_k(queries, passages, k):
+    return np.argsort(-(queries @ passages.T), axis=1)[:, :k]
+
+
+def main(args):
+    passages, queries = build_texts(args.passages, args.queries)
+    print(f"{len(passages)} passages, {len(queries)} queries, k={args.k}")
+    reference = load_embedder("torch")
+    ref_passages = reference.encode(passages, batch_size=32)
+    ref_queries = reference.encode(queries, batch_size=32)
+    ref_top = top_k(ref_queries, ref_passages, args.k)
+
+    failures = []
+    for backend, min_cosine in (("onnx", args.min_cosine_fp32), ("onnx-int8", args.min_cosine_int8)):
+        try:
+            embedder = load_embedder(backend, model_dir=args.model_dir)
+        except FileNotFoundError as e:
+            print(f"{backend:>10}: skipped, {e}")
+            continue
+        backend_passages = embedder.encode(passages, batch_size=32)
+        backend_queries = embedder.encode(queries, batch_size=32)
+        cosines = np.concatenate([(backend_passages * ref_passages).sum(axis=1),
+                                  (backend_queries * ref_queries).sum(axis=1)])
+        backend_top = top_k(backend_queries, ref_passages, args.k)
+        overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(ref_top, backend_top)])
+        top1 = np.mean(ref_top[:, 0] == backend_top[:, 0])
+        print(f"{backend:>10}: cosine mean {cosines.mean():.5f}  min {cosines.min():.5f}  "
+              f"p1 {np.percentile(cosines, 1):.5f}  overlap@{args.k} {overlap:.3f}  top-1 agreement {top1:.3f}")
+        if cosines.mean() < min_cosine:
+            failures.append(f"{backend} mean cosine {cosines.mean():.5f} < {min_cosine}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--passages", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--model-dir", default=embedding_onnx_dir)
+    parser.add_argument("--min-cosine-fp32", type=float, default=0.999)
+    parser.add_argument("--min-cosine-int8", type=float, default=0.99)
+    sys.exit(main(parser.parse_args()))
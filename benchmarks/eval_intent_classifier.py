@@ -0,0 +1,163 @@
+"""Compare the local intent classifier with the LLM oracle on a set of queries.
+
+Needs MISTRAL_API_KEY. Usage: python benchmarks/eval_intent_classifier.py [--queries file.txt]
+
+With --offline, calibrates the keyword rules instead: every rule's precision on a
+hand-labelled set (including near misses such as "write a poem about the rain"),
+which is what RULE_CONFIDENCE in src/agent/intent_classifier.py is set from.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.agent.intent_classifier import IntentClassifier, RULE_CONFIDENCE
+from src.config import embedding_model_name, intent_confidence_threshold
+
+DEFAULT_QUERIES = [
+    "What's the weather like in Paris?",
+    "Is it sunny in Naples today?",
+    "How cold is Constantinople right now?",
+    "What did Mark Twain think about the Sphynx?",
+    "How did the pilgrims behave in the Holy Land?",
+    "Tell me about Twain's visit to the Louvre",
+    "What did he write about Lake Como?",
+    "I want to visit the places Twain went to in Italy - what's the weather like there now?",
+    "What's the weather today in the Greek cities from The Innocents Abroad?",
+    "Hi, how are you?",
+    "Thanks a lot!",
+    "What do you think about traveling alone?",
+    "Explain quantum physics",
+    "Write a haiku about databases",
+    "Which is better for a honeymoon, Venice or Florence?",
+    "Where did the Quaker City sail first?",
+]
+
+# (query, intent the oracle should pick); rule hits that are wrong here are what keeps a rule under the threshold
+LABELLED_QUERIES = [
+    ("What's the weather like in Paris?", "weather"),
+    ("Is it raining in London right now?", "weather"),
+    ("How cold is it in Moscow today?", "weather"),
+    ("Is it sunny in Naples today?", "weather"),
+    ("What is the temperature in Cairo?", "weather"),
+    ("weather in rome", "weather"),
+    ("forecast for Athens tomorrow", "weather"),
+    ("Is it going to snow in Geneva?", "weather"),
+    ("How humid is it in Beirut?", "weather"),
+    ("Will it be windy in Gibraltar?", "weather"),
+    ("what's the weather", "weather"),
+    ("rainy days", "irrelevant"),
+    ("write a poem about the rain", "irrelevant"),
+    ("Write a short story about a storm in Paris", "irrelevant"),
+    ("how many degrees is a right angle", "irrelevant"),
+    ("wind instruments for beginners", "irrelevant"),
+    ("Explain how snow forms", "irrelevant"),
+    ("Why is the sky cloudy?", "irrelevant"),
+    ("What is humidity?", "irrelevant"),
+    ("Convert 30 degrees Celsius to Fahrenheit", "irrelevant"),
+    ("Is a sunny disposition genetic?", "irrelevant"),
+    ("What did Mark Twain think about the Sphynx?", "book"),
+    ("How did Twain describe Venice?", "book"),
+    ("Where did the Quaker City sail first?", "book"),
+    ("What is The Innocents Abroad about?", "book"),
+    ("Tell me about Twain's visit to the Louvre", "book"),
+    ("How did the pilgrims behave in the Holy Land?", "book"),
+    ("What did the narrator think of the Sphinx?", "book"),
+    ("Who built the pyramids?", "irrelevant"),
+    ("Recommend a good book for a long flight", "chitchat"),
+    ("Who were the Pilgrims that landed at Plymouth Rock?", "irrelevant"),
+    ("How tall is the Sphinx?", "irrelevant"),
+    ("What's the weather today in the cities Mark Twain wrote about in Greece?", "combined"),
+    ("I want to visit the places Twain went to in Italy - what's the weather like there now?", "combined"),
+    ("Is it raining now in the towns Twain saw in Italy?", "combined"),
+    ("What did Twain say about the rain in Rome?", "book"),
+    ("Did the pilgrims complain about the weather?", "book"),
+    ("Hi, how are you?", "chitchat"),
+    ("Hello there!", "chitchat"),
+    ("Thanks a lot!", "chitchat"),
+    ("Good morning", "chitchat"),
+    ("thank you so much", "chitchat"),
+    ("What can you do?", "chitchat"),
+    ("hey, explain quantum physics", "irrelevant"),
+    ("hi, what's 17 times 23", "irrelevant"),
+    ("Hello, plan my trip to Rome", "chitchat"),
+    ("Explain quantum physics", "irrelevant"),
+    ("Write a haiku about databases", "irrelevant"),
+]
+
+
+def calibrate(threshold):
+    """Precision of every keyword rule on LABELLED_QUERIES, next to the confidence it is given"""
+    classifier = IntentClassifier()
+    by_rule = {}
+    for query, expected in LABELLED_QUERIES:
+        rule, label = classifier.match_rule(query)
+        by_rule.setdefault(rule, []).append((label == expected, query, expected))
+    print(f"{'rule':>18} {'hits':>5} {'precision':>9} {'confidence':>10}")
+    for rule, outcomes in sorted(by_rule.items()):
+        precision = sum(correct for correct, _, _ in outcomes) / len(outcomes)
+        flag = "  <- above threshold with precision below it" if (
+            RULE_CONFIDENCE[rule] >= threshold and precision < threshold) else ""
+        print(f"{rule:>18} {len(outcomes):>5} {precision:>9.2f} {RULE_CONFIDENCE[rule]:>10.2f}{flag}")
+        for correct, query, expected in outcomes:
+            if not correct and rule != "none":
+                print(f"{'':>20}wrong: {query!r} (expected {expected})")
+
+
+async def main(args):
+    from sentence_transformers import SentenceTransformer
+    from langchain_mistralai import ChatMistralAI
+    from langchain_core.output_parsers import JsonOutputParser
+    from src.agent.prompts import Prompts
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    embedder = SentenceTransformer(embedding_model_name)
+    classifier = IntentClassifier(encode_fn=embedder.encode)
+    llm = ChatMistralAI(model="mistral-small", temperature=0, mistral_api_key=os.environ["MISTRAL_API_KEY"])
+    oracle = Prompts().create_oracle_prompt_template() | llm | JsonOutputParser()
+
+    agree, local, confusion = 0, 0, Counter()
+    local_ms, llm_ms = [], []
+    for query in queries:
+        start = time.perf_counter()
+        label, confidence = classifier.classify_rules(query)
+        if confidence < args.threshold:
+            label, confidence = classifier.classify_embedding(embedder.encode([query])[0], query)
+        local_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        expected = (await oracle.ainvoke({"query": query})).get("category", "irrelevant")
+        llm_ms.append((time.perf_counter() - start) * 1000)
+
+        confident = confidence >= args.threshold
+        local += confident
+        if confident:
+            agree += label == expected
+            confusion[(expected, label)] += 1
+        print(f"{'local' if confident else 'llm  '} {confidence:4.2f} {label:>10} | oracle {expected:>10} | {query}")
+
+    print(f"\nlocal coverage: {local}/{len(queries)}  agreement on local decisions: {agree}/{local or 1}")
+    print(f"mean latency: local {sum(local_ms) / len(local_ms):.2f} ms, llm {sum(llm_ms) / len(llm_ms):.0f} ms")
+    for (expected, label), count in sorted(confusion.items()):
+        if expected != label:
+            print(f"  disagreement: oracle={expected} local={label} x{count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", help="text file with one query per line")
+    parser.add_argument("--threshold", type=float, default=intent_confidence_threshold)
+    parser.add_argument("--offline", action="store_true", help="calibrate the keyword rules on the labelled set, no LLM")
+    args = parser.parse_args()
+    if args.offline:
+        calibrate(args.threshold)
+    else:
+        asyncio.run(main(args))
@@ -0,0 +1,100 @@
+"""Measure what cross-encoder re-ranking adds over dense retrieval, in precision and in milliseconds.
+
+The evaluation set is built from the book: a sentence taken from inside a chunk is the
+query and the chunks containing that sentence are the relevant ones. Needs an ingested
+collection (Chroma, or VECTOR_BACKEND=numpy).
+
+Usage: python benchmarks/eval_reranker.py --size 200 [--eval-set eval.jsonl] [--deadline-ms 150]
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.config import (book_path, chunk_size, chunk_overlap, n_rag_results, reranker_candidates,
+                        reranker_deadline_ms, chroma_collection_name, chroma_host, chroma_port)
+from src.vector_search.document_processor import DocumentProcessor
+from src.vector_search.vector_store import VectorStore
+from src.vector_search.reranker import CrossEncoderReranker
+
+_SENTENCE = re.compile(r"[^.!?]{60,200}[.!?]")
+
+
+def build_eval_set(size, seed=0):
+    chunks = DocumentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap).load_and_process_document(book_path)
+    rng = random.Random(seed)
+    examples = []
+    for chunk in rng.sample(chunks, min(size * 2, len(chunks))):
+        sentences = [s.strip() for s in _SENTENCE.findall(chunk['text'].replace("\n", " "))]
+        if not sentences:
+            continue
+        sentence = rng.choice(sentences)
+        relevant = [c['metadata']['chunk_id'] for c in chunks if sentence in c['text'].replace("\n", " ")]
+        examples.append({"query": sentence, "chunk_ids": relevant or [chunk['metadata']['chunk_id']]})
+        if len(examples) == size:
+            break
+    return examples
+
+
+def score(results, relevant, k):
+    ids = [result['metadata']['chunk_id'] for result in results[:k]]
+    hits = [i for i, chunk_id in enumerate(ids) if chunk_id in relevant]
+    return {"precision": len(hits) / k, "hit": float(bool(hits)), "mrr": 1.0 / (hits[0] + 1) if hits else 0.0}
+
+
+def summarize(name, rows, latencies_ms):
+    means = {key: sum(row[key] for row in rows) / len(rows) for key in rows[0]}
+    latencies_ms = sorted(latencies_ms)
+    p50, p95 = latencies_ms[len(latencies_ms) // 2], latencies_ms[int(len(latencies_ms) * 0.95)]
+    print(f"{name:>8}: precision@k {means['precision']:.3f}  hit@k {means['hit']:.3f}  MRR@k {means['mrr']:.3f}  "
+          f"p50 {p50:6.1f} ms  p95 {p95:6.1f} ms")
+
+
+async def main(args):
+    if args.eval_set and os.path.exists(args.eval_set):
+        with open(args.eval_set, encoding="utf-8") as f:
+            examples = [json.loads(line) for line in f]
+    else:
+        examples = build_eval_set(args.size)
+        if args.eval_set:
+            with open(args.eval_set, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(example) + "\n" for example in examples)
+    print(f"{len(examples)} queries, k={args.k}, {args.candidates} candidates re-ranked")
+
+    store = VectorStore(collection_name=chroma_collection_name, chroma_host=chroma_host, chroma_port=chroma_port)
+    store.warmup()
+    reranker = CrossEncoderReranker(deadline_ms=args.deadline_ms, cache_size=0)
+    reranker.warmup()
+
+    dense_rows, reranked_rows, dense_ms, rerank_ms = [], [], [], []
+    for example in examples:
+        relevant = set(example["chunk_ids"])
+        start = time.perf_counter()
+        candidates = await store.asearch(example["query"], n_results=args.candidates)
+        dense_ms.append((time.perf_counter() - start) * 1000)
+        dense_rows.append(score(candidates, relevant, args.k))
+
+        start = time.perf_counter()
+        reranked = await reranker.arerank(example["query"], candidates, args.k)
+        rerank_ms.append((time.perf_counter() - start) * 1000)
+        reranked_rows.append(score(reranked, relevant, args.k))
+
+    summarize("dense", dense_rows, dense_ms)
+    summarize("reranked", reranked_rows, [d + r for d, r in zip(dense_ms, rerank_ms)])
+    print(f"re-ranking adds {sum(rerank_ms) / len(rerank_ms):.1f} ms on average; stats: {reranker.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200)
+    parser.add_argument("--eval-set", help="JSONL file to load the evaluation set from, or to save a generated one to")
+    parser.add_argument("--k", type=int, default=n_rag_results)
+    parser.add_argument("--candidates", type=int, default=reranker_candidates)
+    parser.add_argument("--deadline-ms", type=float, default=reranker_deadline_ms)
+    asyncio.run(main(parser.parse_args()))
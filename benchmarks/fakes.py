@@ -0,0 +1,159 @@
+"""Deterministic local stand-ins for Mistral and WeatherAPI, used by the load test.
+
+FakeChatModel answers every prompt of the travel graph (intent JSON, location JSON,
+free-text answers) with a configurable time to first token and per-token delay, and
+streams its tokens. StubWeatherServer serves weatherapi.com-shaped JSON over HTTP
+from a background thread with a configurable delay.
+"""
+import re
+import json
+import time
+import random
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Iterator, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_QUERY = re.compile(r'Query\**:\s*"(.*?)"', re.S)
+_WEATHER_WORDS = ("weather", "temperature", "sunny", "rain", "cold", "hot", "forecast")
+_BOOK_WORDS = ("twain", "book", "innocents", "pilgrims", "quaker city", "he write", "did he")
+_CHITCHAT_WORDS = ("hi", "hello", "thanks", "how are you", "recommend")
+PLACES = ("Paris", "Rome", "Naples", "Venice", "Florence", "Milan", "Genoa", "Athens", "Constantinople", "Smyrna",
+          "Beirut", "Damascus", "Jerusalem", "Jaffa", "Alexandria", "Cairo", "Gibraltar", "Marseilles", "Tangier",
+          "Odessa", "Sevastopol", "Malta", "Lake Como", "Pompeii")
+_WORDS = ("the", "voyage", "pilgrims", "sea", "city", "old", "sun", "warm", "streets", "ancient", "travellers",
+          "today", "weather", "pleasant", "twain", "wrote", "about", "and", "a", "of", "in", "with")
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model stand-in whose latency and answer length are parameters rather than network conditions"""
+
+    first_token_latency: float = 0.3
+    token_latency: float = 0.01
+    answer_tokens: int = 60
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-travel-chat"
+
+    def _respond(self, messages: List[BaseMessage], call: Optional[str]) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        queries = _QUERY.findall(prompt)
+        query = queries[-1] if queries else prompt[-200:]
+        lowered = query.lower()
+        if call == "oracle" or "intent classification component" in prompt:
+            weather = any(word in lowered for word in _WEATHER_WORDS)
+            book = any(word in lowered for word in _BOOK_WORDS)
+            chitchat = any(re.search(rf"\b{word}\b", lowered) for word in _CHITCHAT_WORDS)
+            category = ("combined" if weather and book else "weather" if weather else "book" if book
+                        else "chitchat" if chitchat else "irrelevant")
+            return json.dumps({"category": category})
+        if call in ("locations_from_query", "locations_from_book") or '"locations"' in prompt:
+            text = query if call == "locations_from_query" else prompt
+            return json.dumps({"locations": [place for place in PLACES if place in text][:3]})
+        # Free-text answers are seeded by the query so repeated runs produce the same tokens
+        rng = random.Random(f"{self.seed}:{query}")
+        return " ".join(rng.choice(_WORDS) for _ in range(self.answer_tokens))
+
+    @staticmethod
+    def _call(run_manager) -> Optional[str]:
+        return (getattr(run_manager, "metadata", None) or {}).get("llm_call")
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        return re.findall(r"\S+\s*", text)
+
+    def _usage(self, messages: List[BaseMessage], text: str) -> dict:
+        prompt_tokens = sum(len(str(message.content).split()) for message in messages)
+        completion_tokens = len(text.split())
+        return {"input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = self._respond(messages, self._call(run_manager))
+        time.sleep(self.first_token_latency + self.token_latency * len(self._tokens(text)))
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = self._respond(messages, self._call(run_manager))
+        await asyncio.sleep(self.first_token_latency + self.token_latency * len(self._tokens(text)))
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        text = self._respond(messages, self._call(run_manager))
+        time.sleep(self.first_token_latency)
+        for token in self._tokens(text):
+            time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        text = self._respond(messages, self._call(run_manager))
+        await asyncio.sleep(self.first_token_latency)
+        tokens = self._tokens(text)
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(self.token_latency)
+            usage = self._usage(messages, text) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+class StubWeatherServer:
+    """weatherapi.com current.json stand-in on localhost"""
+
+    def __init__(self, port: int = 0, latency: float = 0.05):
+        latency_seconds = latency
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = parse_qs(urlparse(self.path).query)
+                location = (params.get("q") or ["Unknown"])[0]
+                time.sleep(latency_seconds)
+                # Deterministic per location, so answers are stable across runs
+                rng = random.Random(location.lower())
+                body = json.dumps({
+                    "location": {"name": location.title(), "region": "", "country": "Stubland"},
+                    "current": {
+                        "temp_c": round(rng.uniform(-5, 35), 1),
+                        "feelslike_c": round(rng.uniform(-8, 38), 1),
+                        "condition": {"text": rng.choice(["Sunny", "Cloudy", "Light rain", "Overcast"]), "icon": None},
+                        "humidity": rng.randint(20, 95),
+                        "wind_kph": round(rng.uniform(0, 40), 1),
+                    },
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1/current.json"
+
+    def start(self) -> "StubWeatherServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,92 @@
+"""Import-time profile of the API module, failing when startup regresses.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter (best of --repeat runs),
+prints the total and the packages that cost the most, and exits non-zero when the import
+takes longer than --budget-ms or pulls in a dependency that should only load on its own
+code path (torch, chromadb, LangGraph, the Mistral client, ...).
+
+Usage: python benchmarks/import_time.py [--module app] [--budget-ms 1500] [--json out.json]
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Loaded lazily by the startup steps, never by importing the API module
+FORBIDDEN = ("torch", "sentence_transformers", "transformers", "chromadb", "langchain_mistralai", "langgraph",
+             "langchain_core", "langchain_text_splitters", "requests", "onnxruntime")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def profile(module):
+    """(module name, self us, cumulative us, depth) for every import made by `import module`"""
+    env = {**os.environ, "MISTRAL_API_KEY": os.environ.get("MISTRAL_API_KEY", "import-time")}
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    rows = []
+    for line in completed.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def summarize(rows, module, top):
+    total_us = next((cumulative for name, _, cumulative, depth in rows if name == module and depth == 0), 0)
+    # Self time grouped by top-level package shows which dependency the time goes to
+    by_package = {}
+    for name, self_us, _, _ in rows:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    heaviest = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 1),
+        "modules_imported": len(rows),
+        "packages_ms": {package: round(us / 1000, 1) for package, us in heaviest},
+        "imported": sorted({name.split(".")[0] for name, _, _, _ in rows}),
+    }
+
+
+def main(args):
+    runs = [summarize(profile(args.module), args.module, args.top) for _ in range(args.repeat)]
+    # The fastest run is the least disturbed by the rest of the machine
+    result = min(runs, key=lambda run: run["total_ms"])
+    forbidden = sorted(set(result["imported"]) & set(args.forbid))
+
+    print(f"import {args.module}: {result['total_ms']} ms, {result['modules_imported']} modules "
+          f"(best of {args.repeat}, budget {args.budget_ms} ms)")
+    for package, ms in result["packages_ms"].items():
+        print(f"  {package:>28}: {ms:8.1f} ms")
+
+    failures = []
+    if forbidden:
+        failures.append(f"heavy dependencies imported eagerly: {', '.join(forbidden)}")
+    if result["total_ms"] > args.budget_ms:
+        failures.append(f"import took {result['total_ms']} ms, over the {args.budget_ms} ms budget")
+    result.update({"budget_ms": args.budget_ms, "forbidden_imported": forbidden, "ok": not failures})
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="number of packages to list")
+    parser.add_argument("--forbid", nargs="*", default=list(FORBIDDEN), help="packages the import must not load")
+    parser.add_argument("--json", help="write the profile to this JSON file")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,240 @@
+"""Load test of the FastAPI app against local stand-ins, with results saved as JSON for run-to-run comparison.
+
+The app runs in a subprocess with FakeChatModel in place of Mistral, a stub weatherapi
+server and the in-process numpy vector index, ingested into --index-dir by the ingestion CLI
+in a separate process beforehand (and reused), so the server's memory is the app's own.
+Embeddings use the real MiniLM model. The driver sends /ask requests with a fixed, seeded
+mix of intents at the given concurrency. It reports throughput, latency percentiles
+overall and per intent, server memory, and per-stage quantiles scraped from /metrics.
+
+Usage: python benchmarks/load_test.py --requests 500 --concurrency 16
+       python benchmarks/load_test.py --compare benchmarks/results/baseline.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from datetime import datetime, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+import httpx
+
+from benchmarks.fakes import FakeChatModel, StubWeatherServer, PLACES
+
+# intent -> (share of traffic, query templates)
+QUERY_MIX = {
+    "weather": (0.35, ["What's the weather like in {place}?", "Is it raining in {place} right now?",
+                       "How warm is {place} today?"]),
+    "book": (0.30, ["What did Mark Twain write about {place}?", "How did the pilgrims behave in {place}?",
+                    "Tell me about Twain's visit to {place}"]),
+    "combined": (0.15, ["I want to visit the places Twain saw near {place} - what's the weather there now?",
+                        "What did Twain think of {place} and what's the weather there today?"]),
+    "chitchat": (0.15, ["Hi, how are you?", "Thanks a lot!", "What do you recommend for a first trip to {place}?"]),
+    "irrelevant": (0.05, ["Explain quantum physics", "Write a haiku about databases"]),
+}
+
+
+def build_workload(n, seed):
+    rng = random.Random(seed)
+    intents = list(QUERY_MIX)
+    weights = [QUERY_MIX[intent][0] for intent in intents]
+    workload = []
+    for _ in range(n):
+        intent = rng.choices(intents, weights)[0]
+        query = rng.choice(QUERY_MIX[intent][1]).format(place=rng.choice(PLACES))
+        workload.append((intent, query))
+    return workload
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    values = sorted(values)
+    pick = lambda q: round(values[min(int(q * len(values)), len(values) - 1)], 1)
+    return {"p50": pick(0.5), "p90": pick(0.9), "p95": pick(0.95), "p99": pick(0.99),
+            "max": round(values[-1], 1), "mean": round(sum(values) / len(values), 1)}
+
+
+def server_memory_mb(pid):
+    """Current and peak resident memory of the server process (Linux /proc)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+        return {"rss": int(status["VmRSS"].split()[0]) / 1024, "peak": int(status["VmHWM"].split()[0]) / 1024}
+    except (OSError, KeyError):
+        return {}
+
+
+def stage_quantiles(metrics_text):
+    stages = {}
+    pattern = re.compile(r'travel_agent_latency_recent_seconds\{quantile="([\d.]+)",stage="([^"]+)"\} (\S+)')
+    for quantile, stage, value in pattern.findall(metrics_text):
+        stages.setdefault(stage, {})[f"p{int(float(quantile) * 100)}"] = round(float(value) * 1000, 2)
+    return stages
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+async def drive(base_url, workload, concurrency, bypass_cache):
+    queue = asyncio.Queue()
+    for item in workload:
+        queue.put_nowait(item)
+    records = []
+
+    async def worker(client):
+        while not queue.empty():
+            intent, query = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await client.post("/ask", json={"query": query, "bypass_cache": bypass_cache})
+                ok = response.status_code == 200 and not response.json().get("response", "").startswith("Error:")
+            except httpx.HTTPError:
+                ok = False
+            records.append({"intent": intent, "ms": (time.perf_counter() - start) * 1000, "ok": ok})
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(client) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    return records, elapsed
+
+
+def wait_until_ready(base_url, process, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/readyz", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("server did not become ready")
+
+
+def compare(result, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} (commit {baseline.get('git_commit')}):")
+    rows = [("throughput_rps", result["throughput_rps"], baseline["throughput_rps"])]
+    rows += [(f"latency {key}", result["latency_ms"][key], baseline["latency_ms"].get(key)) for key in ("p50", "p95", "p99")]
+    rows.append(("peak rss MB", result["server_memory_mb"].get("peak"), baseline["server_memory_mb"].get("peak")))
+    for name, current, previous in rows:
+        if current is None or not previous:
+            continue
+        print(f"  {name:>15}: {previous:10.1f} -> {current:10.1f}  ({(current - previous) / previous * 100:+.1f}%)")
+
+
+def run(args):
+    weather = StubWeatherServer(latency=args.weather_latency_ms / 1000).start()
+    env = {
+        **os.environ,
+        "MISTRAL_API_KEY": "fake",
+        "WEATHERAPI_KEY": "fake",
+        "WEATHERAPI_BASE_URL": weather.url,
+        "VECTOR_BACKEND": "numpy",
+        "INDEX_DIR": os.path.abspath(args.index_dir),
+        "INGEST_ON_STARTUP": "false",
+        "WEATHER_CACHE_BACKEND": "memory",
+    }
+    env.pop("EMBEDDING_CACHE_PATH", None)
+    # Its own process: the ingestion embedder and peak must not count towards the server's memory
+    subprocess.run([sys.executable, "-m", "src.vector_search.ingestion"], cwd=ROOT, env=env, check=True)
+    command = [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port),
+               "--llm-first-token-ms", str(args.llm_first_token_ms), "--llm-token-ms", str(args.llm_token_ms),
+               "--answer-tokens", str(args.answer_tokens), "--seed", str(args.seed)]
+    server = subprocess.Popen(command, cwd=ROOT, env=env)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(base_url, server, args.startup_timeout)
+        asyncio.run(drive(base_url, build_workload(args.warmup, args.seed + 1), args.concurrency, True))
+
+        records, elapsed = asyncio.run(drive(base_url, build_workload(args.requests, args.seed), args.concurrency,
+                                             args.bypass_cache))
+        memory = server_memory_mb(server.pid)
+        stages = stage_quantiles(httpx.get(f"{base_url}/metrics").text)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        weather.stop()
+
+    ok = [record for record in records if record["ok"]]
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "serve")},
+        "requests": len(records),
+        "errors": len(records) - len(ok),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 2),
+        "latency_ms": percentiles([record["ms"] for record in ok]),
+        "by_intent": {intent: {"count": sum(1 for r in ok if r["intent"] == intent),
+                               **percentiles([r["ms"] for r in ok if r["intent"] == intent])}
+                      for intent in QUERY_MIX},
+        "server_memory_mb": memory,
+        "stages_ms": stages,
+    }
+
+    print(f"{result['requests']} requests, {result['errors']} errors, {result['throughput_rps']} req/s")
+    print(f"latency ms: {result['latency_ms']}")
+    for intent, stats in result["by_intent"].items():
+        print(f"  {intent:>10}: {stats}")
+    print(f"server memory MB: {memory}")
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                         f"load_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"saved {output}")
+    if args.compare:
+        compare(result, args.compare)
+
+
+def serve(args):
+    """Server side: run the real app with the fake LLM over the index the driver has ingested"""
+    import uvicorn
+    import app as app_module
+
+    app_module.llm = FakeChatModel(first_token_latency=args.llm_first_token_ms / 1000,
+                                   token_latency=args.llm_token_ms / 1000,
+                                   answer_tokens=args.answer_tokens, seed=args.seed)
+    uvicorn.run(app_module.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bypass-cache", action="store_true", help="skip the semantic response cache")
+    parser.add_argument("--llm-first-token-ms", type=float, default=300)
+    parser.add_argument("--llm-token-ms", type=float, default=10)
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--weather-latency-ms", type=float, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--index-dir", default=os.path.join(ROOT, "benchmarks", ".load_test_index"))
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    parser.add_argument("--output", help="result JSON path (default benchmarks/results/load_test_<time>.json)")
+    parser.add_argument("--compare", help="previous result JSON to print deltas against")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args)
+    else:
+        run(args)
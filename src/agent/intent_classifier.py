@@ -0,0 +1,182 @@
+"""Local intent classifier that answers confident cases before the LLM oracle is called."""
+import re
+from collections import Counter
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+INTENT_LABELS = ("weather", "book", "combined", "chitchat", "irrelevant")
+
+_WEATHER_PATTERN = re.compile(
+    r"\b(weather|temperature|forecast|degrees|rain(ing|y)?|sunny|snow(ing)?|humid(ity)?|wind(y)?|cloudy|storm)\b"
+)
+_BOOK_PATTERN = re.compile(
+    r"\b(twain|mark twain|innocents abroad|the book|the author|quaker city|pilgrims?|excursion(ists)?|"
+    r"sphinx|sphynx|pyramids?|holy land|the narrator)\b"
+)
+_PRESENT_PATTERN = re.compile(r"\b(now|currently|today|tonight|at the moment|these days)\b")
+# Keywords that point at the book on their own; the weaker ones above also appear in other topics
+_STRONG_BOOK_PATTERN = re.compile(r"\b(twain|innocents abroad|quaker city)\b")
+# The shapes of an actual weather question, as opposed to "rain" or "degrees" in any sentence
+_WEATHER_QUESTION_PATTERN = re.compile(
+    r"\b(what('?s| is| will be) the (weather|temperature|forecast)|how (hot|cold|warm|humid|windy|sunny) is it|"
+    r"is it (going to )?(rain(ing)?|snow(ing)?|sunny|cloudy|windy|stormy|hot|cold|warm|humid)|"
+    r"(weather|temperature|forecast) (like )?(in|at|for|there)|(raining|snowing) (in|at|there))\b"
+)
+# Requests for some other task that merely mention the weather ("write a poem about the rain")
+_TASK_PATTERN = re.compile(r"^(please )?(write|compose|explain|translate|define|calculate|convert|solve|summari[sz]e|list|name)\b")
+# A capitalised word after a preposition, when no gazetteer lookup is available
+_PLACE_HINT_PATTERN = re.compile(r"\b(in|at|near|around|to|for)\s+[A-Z][a-z]")
+_CHITCHAT_PATTERN = re.compile(
+    r"^(hi|hello|hey|howdy|greetings|good (morning|afternoon|evening)|thanks|thank you|bye|goodbye|"
+    r"how are you|who are you|what can you do|nice to meet you)\b"
+)
+_CHITCHAT_WORDS = frozenset("""
+hi hello hey howdy greetings good morning afternoon evening thanks thank you a lot so much very bye goodbye
+how are who what can do nice to meet there again ok okay great cool
+""".split())
+
+# Confidence of each rule: its precision on the labelled set in benchmarks/eval_intent_classifier.py --offline.
+# Only rules grounded in a place or a weather question clear intent_confidence_threshold (0.8); a bare keyword
+# hit is left to the embedding centroids or the LLM.
+RULE_CONFIDENCE = {
+    "weather_question": 0.95,
+    "weather_keyword": 0.3,
+    "book_strong": 0.95,
+    "book_keyword": 0.4,
+    "combined_present": 0.9,
+    "combined_keyword": 0.3,
+    "chitchat_greeting": 0.95,
+    "chitchat_prefix": 0.35,
+    "none": 0.0,
+}
+
+# A handful of labelled examples per intent; their mean embeddings are the centroids
+_PROTOTYPES = {
+    "weather": [
+        "What's the weather like in Paris?",
+        "Is it raining in London right now?",
+        "How hot is it in Cairo today?",
+        "Current temperature in Rome",
+    ],
+    "book": [
+        "What did Mark Twain think about the Sphinx?",
+        "How did Twain describe Venice in The Innocents Abroad?",
+        "What happened to the pilgrims in Jerusalem?",
+        "Which places did the Quaker City visit?",
+    ],
+    "combined": [
+        "I want to visit the places Twain went to in Italy - what's the weather like there now?",
+        "What's the weather today in the cities Mark Twain wrote about in Greece?",
+        "Is it warm now in the places the pilgrims saw in the Holy Land?",
+    ],
+    "chitchat": [
+        "Hi, how are you?",
+        "Hello there!",
+        "Thanks, that was helpful",
+        "What do you think about traveling?",
+    ],
+    "irrelevant": [
+        "Explain quantum physics",
+        "Write me a Python function to sort a list",
+        "What is the stock price of Apple?",
+        "Solve this equation for x",
+    ],
+}
+
+
+class IntentClassifier:
+    """Keyword rules plus optional nearest-centroid matching on query embeddings.
+
+    classify() returns (label, confidence); callers send anything below their
+    confidence threshold to the LLM oracle.
+    """
+
+    def __init__(self, encode_fn: Optional[Callable[[Sequence[str]], np.ndarray]] = None,
+                 temperature: float = 0.05, min_similarity: float = 0.35,
+                 has_location: Optional[Callable[[str], bool]] = None):
+        self.temperature = temperature
+        self.min_similarity = min_similarity
+        # Whether a query names a place; the gazetteer when the caller has one, else a capitalisation hint
+        self.has_location = has_location or (lambda query: bool(_PLACE_HINT_PATTERN.search(query)))
+        self.path_counts = Counter()
+        self.label_counts = Counter()
+        self._labels = list(_PROTOTYPES)
+        self._centroids = None
+        if encode_fn is not None:
+            self._centroids = np.stack([self._centroid(encode_fn(examples)) for examples in _PROTOTYPES.values()])
+
+    @staticmethod
+    def _centroid(embeddings) -> np.ndarray:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        centroid = embeddings.mean(axis=0)
+        return centroid / np.linalg.norm(centroid)
+
+    @property
+    def has_embeddings(self) -> bool:
+        return self._centroids is not None
+
+    def is_grounded_weather(self, query: str) -> bool:
+        """A real weather question: a weather question shape or a named place, and not some other task"""
+        text = query.lower().strip()
+        if _TASK_PATTERN.search(text):
+            return False
+        return bool(_WEATHER_QUESTION_PATTERN.search(text)) or self.has_location(query)
+
+    def match_rule(self, query: str) -> tuple[str, str]:
+        """(rule, label) of the keyword rule a query falls under; see RULE_CONFIDENCE"""
+        text = query.lower().strip()
+        mentions_weather = bool(_WEATHER_PATTERN.search(text))
+        mentions_book = bool(_BOOK_PATTERN.search(text))
+        if mentions_weather and mentions_book:
+            # "What did Twain say about the rain in Rome?" is a book question; leave these to the LLM
+            if (_PRESENT_PATTERN.search(text) and _STRONG_BOOK_PATTERN.search(text)
+                    and self.is_grounded_weather(query)):
+                return "combined_present", "combined"
+            return "combined_keyword", "combined"
+        if mentions_weather:
+            return ("weather_question" if self.is_grounded_weather(query) else "weather_keyword"), "weather"
+        if mentions_book:
+            return ("book_strong" if _STRONG_BOOK_PATTERN.search(text) else "book_keyword"), "book"
+        if _CHITCHAT_PATTERN.search(text) and len(text.split()) <= 6:
+            words = re.findall(r"[a-z']+", text)
+            return ("chitchat_greeting" if set(words) <= _CHITCHAT_WORDS else "chitchat_prefix"), "chitchat"
+        return "none", "irrelevant"
+
+    def classify_rules(self, query: str) -> tuple[str, float]:
+        """Sub-millisecond keyword rules"""
+        rule, label = self.match_rule(query)
+        return label, RULE_CONFIDENCE[rule]
+
+    def classify_embedding(self, embedding: Sequence[float], query: Optional[str] = None) -> tuple[str, float]:
+        """Nearest centroid, with confidence from a softmax over centroid similarities.
+
+        With the query text, a weather answer that isn't a grounded weather question is
+        kept under the threshold, as in the rules.
+        """
+        if self._centroids is None:
+            return "irrelevant", 0.0
+        vector = np.asarray(embedding, dtype=np.float32)
+        similarities = self._centroids @ (vector / np.linalg.norm(vector))
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.min_similarity:
+            return self._labels[best], 0.0
+        weights = np.exp((similarities - similarities[best]) / self.temperature)
+        confidence = float(weights[best] / weights.sum())
+        if query is not None and self._labels[best] in ("weather", "combined") and not self.is_grounded_weather(query):
+            confidence = min(confidence, RULE_CONFIDENCE["weather_keyword"])
+        return self._labels[best], confidence
+
+    def record(self, path: str, label: str):
+        """Count which path (rules, embedding or llm) decided a query"""
+        self.path_counts[path] += 1
+        self.label_counts[label] += 1
+
+    def stats(self) -> dict:
+        total = sum(self.path_counts.values())
+        return {
+            "paths": dict(self.path_counts),
+            "labels": dict(self.label_counts),
+            "local_rate": (total - self.path_counts["llm"]) / total if total else 0.0,
+        }
@@ -1,10 +1,44 @@
 from langchain_core.prompts import PromptTemplate
+from string import Formatter
+from typing import Optional
 import os
 
 class Prompts:
-
-    def __init__(self) -> None:
-        pass
+    # name -> version -> (factory method, input variables the graph passes in)
+    TEMPLATES = {
+        "oracle": {"v1": ("create_oracle_prompt_template", ["query"])},
+        "locations_from_query": {"v1": ("create_get_locations_from_query_prompt_template", ["query"])},
+        "locations_from_book": {"v1": ("create_get_locations_from_book_prompt_template", ["query", "context"])},
+        "final_response": {"v1": ("create_final_response_prompt_template", ["query", "context", "weather_info"])},
+        "chitchat": {"v1": ("create_chitchat_prompt_template", ["query", "chat_history"])},
+    }
+
+    def __init__(self, versions: Optional[dict] = None) -> None:
+        # Latest version of every prompt unless pinned explicitly; "v10" sorts after "v2"
+        self.versions = {name: max(variants, key=lambda v: int(v.lstrip("v"))) for name, variants in self.TEMPLATES.items()}
+        self.versions.update(versions or {})
+        self._cache = {}
+
+    def get_prompt_template(self, name: str, version: Optional[str] = None) -> PromptTemplate:
+        """Return the compiled template for a prompt, building it only once per (name, version)"""
+        version = version or self.versions[name]
+        key = (name, version)
+        if key not in self._cache:
+            factory, _ = self.TEMPLATES[name][version]
+            self._cache[key] = getattr(self, factory)()
+        return self._cache[key]
+
+    def validate(self):
+        """Startup self-check that every template uses exactly the variables it declares and the graph passes"""
+        for name, variants in self.TEMPLATES.items():
+            for version, (_, expected) in variants.items():
+                template = self.get_prompt_template(name, version)
+                used = {field for _, field, _, _ in Formatter().parse(template.template) if field}
+                if used != set(expected) or set(template.input_variables) != set(expected):
+                    raise ValueError(
+                        f"Prompt {name}/{version} expects {sorted(expected)}, "
+                        f"declares {sorted(template.input_variables)} and uses {sorted(used)}"
+                    )
 
     def create_oracle_prompt_template(self):
 
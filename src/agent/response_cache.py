@@ -0,0 +1,99 @@
+"""Semantic cache of final answers keyed by query embedding and intent."""
+import time
+import threading
+from collections import OrderedDict, Counter
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+class SemanticResponseCache:
+    """Returns a stored answer when a new query of the same intent and key is close enough to a cached one.
+
+    The key separates entries that embed alike but must not share answers, such as
+    weather questions about different places. Entries expire after the TTL configured
+    for their intent, or a shorter one given when stored (weather-dependent answers
+    must not outlive the weather they quote), and the least recently used entries
+    are evicted once max_entries is reached.
+    """
+
+    def __init__(self, ttls: dict, max_entries: int = 1000, similarity_threshold: float = 0.95):
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.hits = Counter()
+        self.misses = Counter()
+        self._entries: "OrderedDict[int, tuple[tuple, np.ndarray, str, float]]" = OrderedDict()
+        self._next_id = 0
+        # Per-(intent, key) (ids, matrix) snapshots, rebuilt lazily after the entries change
+        self._matrices: dict = {}
+        self._lock = threading.Lock()
+
+    def is_cacheable(self, intent: str) -> bool:
+        return intent in self.ttls
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def _matrix(self, group: tuple):
+        if group not in self._matrices:
+            ids = [entry_id for entry_id, entry in self._entries.items() if entry[0] == group]
+            matrix = np.stack([self._entries[entry_id][1] for entry_id in ids]) if ids else None
+            self._matrices[group] = (ids, matrix)
+        return self._matrices[group]
+
+    def lookup(self, embedding: Sequence[float], intent: str, key: tuple = ()) -> Optional[str]:
+        """Return the cached answer of the most similar live entry with the same intent and key, or None"""
+        if not self.is_cacheable(intent):
+            return None
+        query = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            ids, matrix = self._matrix((intent, key))
+            if matrix is not None:
+                similarities = matrix @ query
+                for index in np.argsort(-similarities):
+                    if similarities[index] < self.similarity_threshold:
+                        break
+                    entry_id = ids[index]
+                    _, _, answer, expires_at = self._entries[entry_id]
+                    if expires_at < now:
+                        continue
+                    self._entries.move_to_end(entry_id)
+                    self.hits[intent] += 1
+                    return answer
+            self.misses[intent] += 1
+            return None
+
+    def store(self, embedding: Sequence[float], intent: str, answer: str, key: tuple = (),
+              ttl: Optional[float] = None):
+        """Cache an answer for the TTL of its intent, or for ttl seconds if that is shorter"""
+        if not self.is_cacheable(intent) or not answer:
+            return
+        ttl = self.ttls[intent] if ttl is None else min(ttl, self.ttls[intent])
+        if ttl <= 0:
+            return
+        group = (intent, key)
+        with self._lock:
+            self._entries[self._next_id] = (group, self._normalize(embedding), answer, time.time() + ttl)
+            self._next_id += 1
+            self._matrices.pop(group, None)
+            now = time.time()
+            expired = [entry_id for entry_id, entry in self._entries.items() if entry[3] < now]
+            for entry_id in expired:
+                self._matrices.pop(self._entries.pop(entry_id)[0], None)
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._matrices.pop(evicted[0], None)
+
+    def stats(self) -> dict:
+        """Hit-rate metrics per intent"""
+        hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        return {
+            "size": len(self._entries),
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        }
@@ -1,16 +1,65 @@
 """This module defines a graph for a travel chatbot using LangGraph and LangChain."""
 from src.tools.tools import WeatherTool, RagTool
-from src.utils.text_processing import format_retrieved_chunks
+from src.utils.text_processing import assemble_context
+from src.utils.location_extractor import LocationExtractor, get_location_extractor
+from src.utils.metrics import metrics
+from src.utils.llm_metrics import llm_metrics_callback
+from src.vector_search.vector_store import VectorStore
+from src.vector_search.corpus import CorpusRouter
+from src.vector_search.reranker import get_reranker
+
+import time
+import asyncio
+from typing import Optional, Annotated
 
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START, END
 from langchain_core.language_models import BaseLanguageModel
 
 from src.agent.prompts import Prompts
+from src.agent.intent_classifier import IntentClassifier
+from src.agent.response_cache import SemanticResponseCache
+from src.tools.weather_cache import get_weather_cache, normalize_location
+from src.config import intent_confidence_threshold, intent_use_embeddings, speculative_weather_max, reranker_enabled
+from src.config import (response_cache_enabled, response_cache_size, response_cache_similarity,
+                        response_cache_book_ttl, response_cache_chitchat_ttl, weather_cache_ttl)
 from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 
 import logging
 
+
+def merge_timings(left: dict, right: dict) -> dict:
+    return {**(left or {}), **(right or {})}
+
+
+def elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def timed_node(name: str, node):
+    """Wrap a graph node so its wall time (ms) is merged into the state's timings and recorded in the metrics"""
+    async def wrapper(state):
+        start = time.perf_counter()
+        update = dict(await node(state))
+        metrics.observe(f"node.{name}", time.perf_counter() - start)
+        update["timings"] = merge_timings(update.get("timings"), {name: elapsed_ms(start)})
+        return update
+    return wrapper
+
+
+def places_from_chunks(chunks: list[dict]) -> list[str]:
+    """Cities recorded in the chunk metadata at ingestion time, in retrieval order"""
+    places = []
+    for chunk in chunks:
+        value = (chunk.get("metadata") or {}).get("cities") or []
+        if isinstance(value, str):
+            value = [place for place in value.split("|") if place]
+        for place in value:
+            if place not in places:
+                places.append(place)
+    return places
+
+
 class TravelGraphState(TypedDict):
     query: str
     intent: str
@@ -19,34 +68,90 @@ class TravelGraphState(TypedDict):
     weather_info: str
     final_answer: str
     chat_history: list[dict]
+    bypass_cache: bool
+    # set when a node answered with its fallback text because the LLM call failed
+    error: str
+    timings: Annotated[dict, merge_timings]
 
 
 class TravelChatbotGraph(StateGraph):
 
-    def __init__(self, llm: BaseLanguageModel, prompts):
+    def __init__(self, llm: BaseLanguageModel, prompts, vector_store: Optional[VectorStore] = None,
+                 intent_classifier: Optional[IntentClassifier] = None,
+                 location_extractor: Optional[LocationExtractor] = None,
+                 corpus_router: Optional[CorpusRouter] = None):
         super().__init__(TravelGraphState)
         self.llm = llm
         self.prompts = prompts
+        self.vector_store = vector_store
+        self.corpus_router = corpus_router
+        self.location_extractor = location_extractor or get_location_extractor()
+        self.intent_classifier = intent_classifier or self.set_up_intent_classifier()
+        self.intent_threshold = intent_confidence_threshold
+        self.response_cache = self.set_up_response_cache()
         self.tools = self.set_up_tools()
+        self.chains = self.build_chains()
         self.graph = self.build_graph()
 
+    def build_chains(self):
+        """Compile every prompt | llm | parser chain once; nodes reuse them on each request"""
+        self.prompts.validate()
+        get_prompt = self.prompts.get_prompt_template
+
+        def llm(name):
+            # Each chain's LLM calls are timed and their tokens counted under the chain name
+            return self.llm.with_config(callbacks=[llm_metrics_callback], metadata={"llm_call": name})
+
+        return {
+            "oracle": get_prompt("oracle") | llm("oracle") | JsonOutputParser(),
+            "locations_from_query": get_prompt("locations_from_query") | llm("locations_from_query") | JsonOutputParser(),
+            "locations_from_book": get_prompt("locations_from_book") | llm("locations_from_book") | JsonOutputParser(),
+            "final_response": get_prompt("final_response") | llm("final_response") | StrOutputParser(),
+            "chitchat": get_prompt("chitchat") | llm("chitchat") | StrOutputParser(),
+        }
+
+    def set_up_intent_classifier(self):
+        # Reuse the already loaded MiniLM for the centroids when a store is available
+        encode_fn = None
+        if intent_use_embeddings and self.vector_store is not None:
+            encode_fn = self.vector_store.embedder.encode
+        # Weather rules only clear the threshold for a named place or a weather question
+        return IntentClassifier(encode_fn=encode_fn, has_location=lambda query: bool(self.location_extractor.find(query)))
+
+    def set_up_response_cache(self):
+        # The cache is keyed on query embeddings, so it needs the store's embedder
+        if not response_cache_enabled or self.vector_store is None:
+            return None
+        ttls = {
+            "weather": weather_cache_ttl,
+            "combined": weather_cache_ttl,
+            "book": response_cache_book_ttl,
+            "chitchat": response_cache_chitchat_ttl,
+        }
+        return SemanticResponseCache(ttls, max_entries=response_cache_size, similarity_threshold=response_cache_similarity)
+
     def set_up_tools(self):
         self.weather_tool = WeatherTool()
-        self.rag_tool = RagTool()
+        self.rag_tool = RagTool(vector_store=self.vector_store, corpus_router=self.corpus_router,
+                                reranker=get_reranker() if reranker_enabled else None)
         return 
     
     
     def build_graph(self):
         builder = StateGraph(TravelGraphState)
         # add nodes
-        builder.add_node("oracle_node", self.oracle_node)
-        builder.add_node("get_loc_from_query_node", self.get_loc_from_query)
-        builder.add_node("get_loc_from_book_node", self.get_loc_from_book)
-        builder.add_node("book_retriever_node", self.book_retriever_node)
-        builder.add_node("get_weather_node", self.get_weather)
-        builder.add_node("final_response_node", self.final_response)
-        builder.add_node("fallback_node", self.fallback_node)
-        builder.add_node("chitchat_node", self.chitchat_node)
+        nodes = {
+            "oracle_node": self.oracle_node,
+            "get_loc_from_query_node": self.get_loc_from_query,
+            "get_loc_from_book_node": self.get_loc_from_book,
+            "book_retriever_node": self.book_retriever_node,
+            "get_weather_node": self.get_weather,
+            "final_response_node": self.final_response,
+            "fallback_node": self.fallback_node,
+            "chitchat_node": self.chitchat_node,
+        }
+        for name, node in nodes.items():
+            builder.add_node(name, timed_node(name, node))
 
         # add edges
         builder.set_entry_point("oracle_node")
@@ -58,11 +163,13 @@ class TravelChatbotGraph(StateGraph):
                                         "combined": "get_loc_from_book_node",
                                         "chitchat": "chitchat_node",
                                         "irrelevant": "fallback_node",
+                                        "cached": END,
                                     })
         builder.add_edge("get_loc_from_query_node", "get_weather_node")
         builder.add_edge("get_weather_node", "final_response_node")
         builder.add_edge("book_retriever_node", "final_response_node")
-        builder.add_edge("get_loc_from_book_node", "get_weather_node")
+        # the combined branch fetches weather itself, overlapped with location extraction
+        builder.add_edge("get_loc_from_book_node", "final_response_node")
         builder.add_edge("chitchat_node", END)
         builder.add_edge("fallback_node", END)
         builder.add_edge("final_response_node", END)
@@ -70,6 +177,9 @@ class TravelChatbotGraph(StateGraph):
         return builder.compile()
     
     def get_intent(self, state: TravelGraphState):
+        if state.get("final_answer"):
+            # answered from the response cache by oracle_node
+            return "cached"
         if "weather" in state['intent']:
             return "weather"
         elif "book" in state['intent'] or "travel" in state['intent']:
@@ -83,13 +193,78 @@ class TravelChatbotGraph(StateGraph):
                                 
     
     async def oracle_node(self, state: TravelGraphState):
-        chain = self.prompts.create_oracle_prompt_template() | self.llm | JsonOutputParser()
-        response = await chain.ainvoke({"query": state["query"]})
-        intent = response.get("category", "irrelevant")
+        # Confident cases are decided locally, only ambiguous queries pay the LLM round trip
+        intent, confidence = self.intent_classifier.classify_rules(state["query"])
+        path = "rules"
+        if confidence < self.intent_threshold and self.intent_classifier.has_embeddings:
+            # The query embedding is cached, so retrieval later reuses it for free
+            embedding = await self.vector_store.aembed_query(state["query"])
+            intent, confidence = self.intent_classifier.classify_embedding(embedding[0], state["query"])
+            path = "embedding"
+        if confidence < self.intent_threshold:
+            chain = self.chains["oracle"]
+            response = await chain.ainvoke({"query": state["query"]})
+            intent = response.get("category", "irrelevant")
+            path = "llm"
+        self.intent_classifier.record(path, intent)
+
+        cached_answer = await self.lookup_cached_answer(state, intent)
+        if cached_answer:
+            return ({"intent": intent, "final_answer": cached_answer})
         return ({"intent": intent})
 
+    def _use_response_cache(self, state: TravelGraphState, intent: str) -> bool:
+        if self.response_cache is None or state.get("bypass_cache"):
+            return False
+        # Follow-ups ("what's the weather there now?") embed alike in every conversation but mean
+        # different things, so nothing is cached or served once there is a history
+        if state.get("chat_history"):
+            return False
+        return self.response_cache.is_cacheable(intent)
+
+    def _response_cache_key(self, query: str, intent: str) -> Optional[tuple]:
+        """The places a weather-dependent answer is about; None when they can't be told reliably"""
+        if intent not in ("weather", "combined"):
+            return ()
+        locations, ambiguous = self.location_extractor.extract(query)
+        if ambiguous or not locations:
+            return None
+        return tuple(sorted(normalize_location(location) for location in locations))
+
+    async def lookup_cached_answer(self, state: TravelGraphState, intent: str) -> Optional[str]:
+        if not self._use_response_cache(state, intent):
+            return None
+        key = self._response_cache_key(state["query"], intent)
+        if key is None:
+            return None
+        embedding = await self.vector_store.aembed_query(state["query"])
+        return self.response_cache.lookup(embedding[0], intent, key)
+
+    async def store_answer(self, state: TravelGraphState, answer: str):
+        intent = state["intent"]
+        if not self._use_response_cache(state, intent):
+            return
+        key = self._response_cache_key(state["query"], intent)
+        if key is None:
+            return
+        ttl = None
+        if intent in ("weather", "combined"):
+            # The answer stays only while the weather it quotes is fresh; one built on a stale entry isn't kept
+            weather_cache = self.weather_tool.weather_cache or get_weather_cache()
+            age = await weather_cache.oldest_age(state.get("locations") or [])
+            if age is None:
+                return
+            ttl = weather_cache_ttl - age
+        embedding = await self.vector_store.aembed_query(state["query"])
+        self.response_cache.store(embedding[0], intent, answer, key, ttl=ttl)
+
     async def get_loc_from_query(self,  state: TravelGraphState):
-        chain = self.prompts.create_get_locations_from_query_prompt_template() | self.llm | JsonOutputParser()
+        # The gazetteer answers in microseconds; the LLM only sees queries it can't resolve
+        locations, ambiguous = self.location_extractor.extract(state["query"])
+        if locations and not ambiguous:
+            return ({"locations": locations})
+
+        chain = self.chains["locations_from_query"]
         try:
             response = await chain.ainvoke({"query": state["query"]})
         except Exception as e:
@@ -99,19 +274,74 @@ class TravelChatbotGraph(StateGraph):
         return ({"locations": response.get("locations", [])})
 
     async def get_loc_from_book(self,  state: TravelGraphState):
-        chain = self.prompts.create_get_locations_from_book_prompt_template() | self.llm | JsonOutputParser()
+        """Retrieve passages, extract locations and fetch their weather with the independent steps overlapped.
+
+        Locations come from the local gazetteer when it is confident. Otherwise
+        weather lookups start as soon as a location is complete in the LLM's
+        streamed JSON, and places recorded in the retrieved chunks' metadata are
+        fetched speculatively while the LLM is still running.
+        """
+        chain = self.chains["locations_from_book"]
+        formatted_context = ""
+        locations = []
+        timings = {}
+        weather_tasks: dict[str, asyncio.Task] = {}
+
+        def fetch_weather(location: str):
+            if location and location not in weather_tasks:
+                weather_tasks[location] = asyncio.ensure_future(self.weather_tool.ainvoke({"locations": [location]}))
+
         try:
-            formatted_context = self.rag_tool.run(state["query"])
-            response = await chain.ainvoke({"context": formatted_context, "query": state["query"]})
+            start = time.perf_counter()
+            retrieved_chunks = await self.rag_tool.aretrieve(state["query"])
+            formatted_context = assemble_context(retrieved_chunks)
+            timings["get_loc_from_book_node.retrieval"] = elapsed_ms(start)
+
+            start = time.perf_counter()
+            passages = "\n".join(chunk.get("text", "") for chunk in retrieved_chunks)
+            locations, confident = self.location_extractor.extract_for_query(state["query"], passages)
+            timings["get_loc_from_book_node.locations_local"] = elapsed_ms(start)
+
+            if confident:
+                for location in locations:
+                    fetch_weather(location)
+            else:
+                for place in places_from_chunks(retrieved_chunks)[:speculative_weather_max]:
+                    fetch_weather(place)
+
+                start = time.perf_counter()
+                async for partial in chain.astream({"context": formatted_context, "query": state["query"]}):
+                    locations = partial.get("locations", []) if isinstance(partial, dict) else []
+                    locations = [location for location in locations if isinstance(location, str)] if isinstance(locations, list) else []
+                    # the last list item may still be a partial string
+                    for location in locations[:-1]:
+                        fetch_weather(location)
+                for location in locations:
+                    fetch_weather(location)
+                timings["get_loc_from_book_node.locations_llm"] = elapsed_ms(start)
         except Exception as e:
             logging.info(f"Error in get_loc_from_book: {e}")
-            response = {"locations": []}
-            # Handle the error (e.g., log it)
-        return ({"locations": response.get("locations", []), "context": formatted_context})
+
+        start = time.perf_counter()
+        weather_info = []
+        for location in locations:
+            if location not in weather_tasks:
+                continue
+            try:
+                weather_info.extend(await weather_tasks[location])
+            except Exception as e:
+                logging.info(f"Error fetching weather for {location}: {e}")
+        # speculative lookups the LLM didn't confirm are not needed any more
+        for location, task in weather_tasks.items():
+            if location not in locations:
+                task.cancel()
+        timings["get_loc_from_book_node.weather_wait"] = elapsed_ms(start)
+
+        return ({"locations": locations, "context": formatted_context, "weather_info": weather_info, "timings": timings})
 
     async def book_retriever_node(self,  state: TravelGraphState):
         try:
-            formatted_context = self.rag_tool.run({"query":state["query"]})
+            formatted_context = await self.rag_tool.ainvoke({"query": state["query"]})
         except Exception as e:
             logging.info(f"Error in book_retriever_node: {e}")
             formatted_context = ""
@@ -126,12 +356,17 @@ class TravelChatbotGraph(StateGraph):
         return ({"weather_info": weather_info})
 
     async def final_response(self,  state: TravelGraphState):
-        chain = self.prompts.create_final_response_prompt_template() | self.llm | StrOutputParser()
+        chain = self.chains["final_response"]
         try:
             response = await chain.ainvoke({"query": state["query"], "context": state.get("context", ""), "weather_info": state.get("weather_info", "")})
         except Exception as e:
             logging.info(f"Error in final_response: {e}")
             response = "I am sorry, but I am unable to provide a response at this time. Please try again later."
+            return ({"final_answer": response, "error": str(e)})
+        else:
+            # answers built on a failed retrieval or weather lookup are not worth keeping
+            if state.get("context") or state.get("weather_info"):
+                await self.store_answer(state, response)
         return ({"final_answer": response})
 
     async def fallback_node(self,  state: TravelGraphState):
@@ -141,11 +376,14 @@ class TravelChatbotGraph(StateGraph):
 
     async def chitchat_node(self,  state: TravelGraphState):
         
-        chain  = self.prompts.create_chitchat_prompt_template() | self.llm | StrOutputParser()
+        chain = self.chains["chitchat"]
 
         try:
             response = await chain.ainvoke({"query": state["query"], "chat_history": state.get("chat_history", [])})
         except Exception as e:
             logging.info(f"Error in chitchat_node: {e}")
             response = "I am sorry, but I am unable to provide a response at this time. Please try again later."
+            return ({"final_answer": response, "error": str(e)})
+        else:
+            await self.store_answer(state, response)
         return ({"final_answer": response})
@@ -1,7 +1,92 @@
+import os
+from dotenv import load_dotenv
+
+# The one place .env is read; every module takes its settings from here
+load_dotenv()
+
 n_rag_results=4
 llm_name='mistral-large'
 embedding_model_name='all-MiniLM-L6-v2'
 chroma_collection_name='twain_book'
 chroma_host='chromadb'
 # chroma_host='localhost'
-chroma_port=8000
\ No newline at end of file
+chroma_port=8000
+# seconds to wait for the Chroma server at startup, retrying with exponential backoff
+chroma_wait_timeout=60
+# threads used to run query embedding off the event loop
+embedding_max_workers=2
+# query embedding cache: max in-memory entries, TTL in seconds and optional SQLite file
+embedding_cache_size=2048
+embedding_cache_ttl=24*3600
+embedding_cache_path=os.getenv("EMBEDDING_CACHE_PATH")
+# micro-batching of concurrent query embeddings: max queries per batch and wait window in ms
+embedding_batch_max_size=32
+embedding_batch_wait_ms=5
+# query/document encoder: "torch" (SentenceTransformer), or "onnx" / "onnx-int8" (ONNX Runtime on CPU, no torch);
+# the ONNX artifacts are exported ahead of time with `python -m src.vector_search.embedders`, 0 threads = runtime default
+embedding_backend=os.getenv("EMBEDDING_BACKEND", "torch")
+embedding_onnx_dir=os.getenv("EMBEDDING_ONNX_DIR", "src/data/models/all-MiniLM-L6-v2")
+embedding_onnx_threads=int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))
+# weatherapi.com client: endpoint (overridable for a local stub), timeout in seconds, pool size and retries
+weather_api_base_url=os.getenv("WEATHERAPI_BASE_URL", "http://api.weatherapi.com/v1/current.json")
+weather_api_timeout=5.0
+weather_api_max_connections=20
+weather_api_retries=2
+# weather cache: "memory" (per worker) or "sqlite" (shared by workers on the host); TTLs in seconds
+weather_cache_backend=os.getenv("WEATHER_CACHE_BACKEND", "memory")
+weather_cache_path=os.getenv("WEATHER_CACHE_PATH", "weather_cache.sqlite3")
+weather_cache_ttl=600
+weather_cache_stale_ttl=1800
+weather_cache_negative_ttl=60
+weather_cache_max_entries=1024
+# local intent classifier: minimum confidence to skip the LLM oracle, and whether to use embedding centroids
+intent_confidence_threshold=0.8
+intent_use_embeddings=True
+# semantic response cache: entries, minimum cosine similarity for a hit and TTLs per intent (weather ones follow weather_cache_ttl)
+response_cache_enabled=True
+response_cache_size=1000
+response_cache_similarity=0.95
+response_cache_book_ttl=7*24*3600
+response_cache_chitchat_ttl=3600
+# combined queries: max places from retrieved chunk metadata whose weather is fetched speculatively
+speculative_weather_max=5
+# local location extraction: gazetteer source, its precomputed index and max locations returned
+gazetteer_path='src/data/gazetteer.tsv'
+gazetteer_index_path=os.getenv("GAZETTEER_INDEX_PATH", "src/data/gazetteer.pkl")
+local_location_max=5
+# directory for indexes kept next to the Chroma collections (place index, ...)
+index_dir=os.getenv("INDEX_DIR", "src/data/index")
+# vector index backend: "chroma" (HTTP server) or "numpy" (in-process, memory-mapped files in index_dir)
+vector_backend=os.getenv("VECTOR_BACKEND", "chroma")
+# hybrid retrieval: BM25 built at ingestion, fused with dense hits by weighted reciprocal rank fusion
+hybrid_search_enabled=os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+bm25_k1=1.5
+bm25_b=0.75
+rrf_k=60
+rrf_dense_weight=1.0
+rrf_sparse_weight=1.0
+hybrid_candidates=20
+# optional cross-encoder re-ranking: candidates taken from retrieval, batch size, latency budget, cached (query, chunk) scores
+# and batches allowed to wait for the scoring thread before new requests skip re-ranking
+reranker_enabled=os.getenv("RERANKER_ENABLED", "false").lower() == "true"
+reranker_model_name='cross-encoder/ms-marco-MiniLM-L-6-v2'
+reranker_candidates=12
+reranker_batch_size=16
+reranker_deadline_ms=150
+reranker_cache_size=4096
+reranker_max_queued_batches=4
+# context packing: estimated token budget for retrieved passages and share of a passage's word trigrams already kept above which it is a duplicate
+context_token_budget=1200
+context_duplicate_threshold=0.8
+# ingestion: source document, chunking, chunks per upsert page and per embedding batch
+book_path='src/data/book.txt'
+chunk_size=1000
+chunk_overlap=200
+ingestion_page_size=256
+ingestion_embed_batch_size=64
+# run ingestion in the background at API startup; disable when the CLI is run separately
+ingest_on_startup=os.getenv("INGEST_ON_STARTUP", "true").lower() == "true"
+# corpus registry and routing: max collections searched per query and minimum description similarity
+corpus_registry_path=os.getenv("CORPUS_REGISTRY", "src/data/corpora.json")
+route_max_collections=2
+route_min_similarity=0.2
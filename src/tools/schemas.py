@@ -1,7 +1,10 @@
 from pydantic import BaseModel, Field
+from typing import Optional
 
 class WeatherToolInput(BaseModel):
     locations: list[str] = Field(..., description="List of locations to get weather information for.")
 
 class RagToolInput(BaseModel):
-    query: str = Field(..., description="User query to search in the book passages.")
\ No newline at end of file
+    query: str = Field(..., description="User query to search in the book passages.")
+    chapter: Optional[int] = Field(None, description="Only search passages from this chapter number.")
+    place: Optional[str] = Field(None, description="Only search passages mentioning this place.")
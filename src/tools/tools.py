@@ -3,20 +3,18 @@ from langchain_core.tools import BaseTool
 from langchain_core.tools.base import ArgsSchema
 import os, asyncio
 from typing import Optional
-from dotenv import load_dotenv
-load_dotenv()
 
 # Import custom modules
 from src.tools.schemas import WeatherToolInput, RagToolInput
-from src.tools.wether_api import WeatherAPIClient
-from src.vector_search.vector_store import VectorStore
-from src.utils.text_processing import format_retrieved_chunks
+from src.tools.wether_api import WeatherAPIClient, get_weather_client
+from src.tools.weather_cache import WeatherCache, get_weather_cache
+from src.vector_search.vector_store import VectorStore, get_vector_store
+from src.vector_search.corpus import CorpusRouter
+from src.vector_search.reranker import CrossEncoderReranker
+from src.utils.text_processing import assemble_context
 
-# Load environment variables for ChromaDB configuration
-from src.config import chroma_collection_name, chroma_host, chroma_port
-
-# load other config variables
-from src.config import n_rag_results
+# load config variables
+from src.config import n_rag_results, reranker_candidates
 
 # Load API keys from environment variables
 WEATHERAPI_KEY = os.getenv("WEATHERAPI_KEY")
@@ -28,13 +26,26 @@ class WeatherTool(BaseTool):
     Th output consists of the current weather conditions, temperature, feels like temperature, humidity, and wind speed for each location.
     Example locations: "Paris", "New York", "Tokyo", "London", "Berlin"
     """
+    # Shared pooled client; falls back to the process-wide instance
+    weather_client: Optional[WeatherAPIClient] = None
+    weather_cache: Optional[WeatherCache] = None
+
+    def _get_weather_client(self) -> WeatherAPIClient:
+        if self.weather_client is None:
+            self.weather_client = get_weather_client()
+        return self.weather_client
+
+    def _get_weather_cache(self) -> WeatherCache:
+        if self.weather_cache is None:
+            self.weather_cache = get_weather_cache()
+        return self.weather_cache
 
     def _run(self, locations: list[str]) -> str:
         # Accept either a list or a dict with 'locations'
         if not locations:
             return []
         
-        weather_client = WeatherAPIClient(api_key=WEATHERAPI_KEY)
+        weather_client = self._get_weather_client()
         results_list = []
         for loc in locations:
             results = weather_client.get_current_weather(location=loc)  
@@ -48,9 +59,10 @@ class WeatherTool(BaseTool):
         # Accept either a list or a dict with 'locations'
         if not locations:
             return []
-        weather_client = WeatherAPIClient(api_key=os.getenv("WEATHERAPI_KEY"))
-        # get weather all locations concurrently
-        tasks = [weather_client.aget_current_weather(loc) for loc in locations]
+        weather_client = self._get_weather_client()
+        weather_cache = self._get_weather_cache()
+        # get weather all locations concurrently, served from the cache where possible
+        tasks = [weather_cache.get_or_fetch(loc, weather_client.aget_current_weather) for loc in locations]
         results = await asyncio.gather(*tasks)
         results_list = []
         for result in results:
@@ -68,12 +80,46 @@ class RagTool(BaseTool):
     The input should be a question (str). The output will be a string with the text chunks retrieved usinf cosine similarity from the book.
     """
     args_schema: Optional[ArgsSchema] = RagToolInput
+    # Shared store injected at startup; falls back to the process-wide instance
+    vector_store: Optional[VectorStore] = None
+    # Routes queries across several corpora when configured
+    corpus_router: Optional[CorpusRouter] = None
+    # Re-scores a wider candidate set when configured
+    reranker: Optional[CrossEncoderReranker] = None
 
-    def _run(self, query: str) -> str:
-        vector_store = VectorStore(collection_name=chroma_collection_name, chroma_host=chroma_host, chroma_port=chroma_port)
-        retrieved_chunks = vector_store.search(query, n_results=n_rag_results)
-        formatted_context = format_retrieved_chunks(retrieved_chunks)
+    def _get_vector_store(self) -> VectorStore:
+        if self.vector_store is None:
+            self.vector_store = get_vector_store()
+        return self.vector_store
+
+    def _n_candidates(self) -> int:
+        return max(reranker_candidates, n_rag_results) if self.reranker is not None else n_rag_results
+
+    def _run(self, query: str, chapter: Optional[int] = None, place: Optional[str] = None) -> str:
+        if self.corpus_router is not None:
+            retrieved_chunks = self.corpus_router.search(query, n_results=self._n_candidates(), chapter=chapter, place=place)
+        else:
+            vector_store = self._get_vector_store()
+            where = vector_store.where_filter(chapter=chapter, place=place)
+            retrieved_chunks = vector_store.search(query, n_results=self._n_candidates(), where=where)
+        if self.reranker is not None:
+            retrieved_chunks = self.reranker.rerank(query, retrieved_chunks, n_rag_results)
+        formatted_context = assemble_context(retrieved_chunks)
         return formatted_context
     
-    async def _arun(self, query: str) -> str:
-        raise NotImplementedError("RAG tool does not support async")
\ No newline at end of file
+    async def aretrieve(self, query: str, chapter: Optional[int] = None, place: Optional[str] = None) -> list[dict]:
+        """Return the raw retrieved chunks, with their metadata, instead of the formatted context"""
+        if self.corpus_router is not None:
+            retrieved_chunks = await self.corpus_router.asearch(query, n_results=self._n_candidates(), chapter=chapter, place=place)
+        else:
+            vector_store = self._get_vector_store()
+            where = vector_store.where_filter(chapter=chapter, place=place)
+            retrieved_chunks = await vector_store.asearch(query, n_results=self._n_candidates(), where=where)
+        if self.reranker is not None:
+            retrieved_chunks = await self.reranker.arerank(query, retrieved_chunks, n_rag_results)
+        return retrieved_chunks
+
+    async def _arun(self, query: str, chapter: Optional[int] = None, place: Optional[str] = None) -> str:
+        retrieved_chunks = await self.aretrieve(query, chapter=chapter, place=place)
+        formatted_context = assemble_context(retrieved_chunks)
+        return formatted_context
\ No newline at end of file
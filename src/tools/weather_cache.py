@@ -0,0 +1,205 @@
+import re
+import json
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from src.config import (weather_cache_backend, weather_cache_path, weather_cache_ttl, weather_cache_stale_ttl,
+                        weather_cache_negative_ttl, weather_cache_max_entries)
+
+# Spellings of the same country share a key; the country itself is kept, since "London, Canada"
+# and "London" are different places
+_COUNTRY_ALIASES = {
+    "us": "united states", "usa": "united states", "u.s": "united states", "u.s.a": "united states",
+    "united states of america": "united states", "uk": "united kingdom", "u.k": "united kingdom",
+    "great britain": "united kingdom", "czech republic": "czechia",
+}
+
+
+def normalize_location(location: str) -> str:
+    """Build a cache key for a location: accent- and case-folded, whitespace collapsed, country spelling unified"""
+    folded = unicodedata.normalize("NFKD", location)
+    folded = "".join(c for c in folded if not unicodedata.combining(c)).lower()
+    parts = [re.sub(r"\s+", " ", part).strip(" .") for part in folded.split(",")]
+    parts = [part for part in parts if part]
+    if len(parts) > 1:
+        parts[-1] = _COUNTRY_ALIASES.get(parts[-1], parts[-1])
+    return ", ".join(parts)
+
+
+class MemoryWeatherCacheBackend:
+    """In-process LRU backend, private to one worker"""
+
+    blocking = False
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, dict, bool]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, stored_at: float, value: dict, is_error: bool):
+        with self._lock:
+            self._entries[key] = (stored_at, value, is_error)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteWeatherCacheBackend:
+    """Local persistent backend, shared by all uvicorn workers on the host"""
+
+    # Disk I/O: WeatherCache calls it from a thread, not on the event loop
+    blocking = True
+
+    def __init__(self, path: str, max_age: float):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        # WAL lets several worker processes read while one writes
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS weather_cache "
+            "(key TEXT PRIMARY KEY, stored_at REAL NOT NULL, value TEXT NOT NULL, is_error INTEGER NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT stored_at, value, is_error FROM weather_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), bool(row[2])
+
+    def set(self, key: str, stored_at: float, value: dict, is_error: bool):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO weather_cache (key, stored_at, value, is_error) VALUES (?, ?, ?, ?)",
+                (key, stored_at, json.dumps(value), int(is_error))
+            )
+            # Entries past their stale window are never served again
+            self._db.execute("DELETE FROM weather_cache WHERE stored_at < ?", (stored_at - self.max_age,))
+            self._db.commit()
+
+
+class WeatherCache:
+    """TTL cache for current-weather responses with stale-while-revalidate and negative caching.
+
+    Fresh entries (younger than ttl) are served directly. Entries within the
+    following stale_ttl seconds are served immediately while a background task
+    refreshes them. Failed lookups are remembered for negative_ttl seconds.
+    """
+
+    def __init__(self, backend=None, ttl: float = weather_cache_ttl, stale_ttl: float = weather_cache_stale_ttl,
+                 negative_ttl: float = weather_cache_negative_ttl):
+        self.backend = backend if backend is not None else MemoryWeatherCacheBackend()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    async def get_or_fetch(self, location: str, fetch: Callable[[str], Awaitable[dict]]) -> dict:
+        """Return cached weather for a location, calling fetch(location) on a miss"""
+        key = normalize_location(location)
+        entry = await self._backend_call(self.backend.get, key)
+        if entry is not None:
+            stored_at, value, is_error = entry
+            age = time.time() - stored_at
+            if is_error and age <= self.negative_ttl:
+                self.negative_hits += 1
+                return value
+            if not is_error and age <= self.ttl:
+                self.hits += 1
+                return value
+            if not is_error and age <= self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._revalidate(key, location, fetch)
+                return value
+
+        self.misses += 1
+        value = await fetch(location)
+        await self._store(key, value)
+        return value
+
+    async def _backend_call(self, method, *args):
+        if getattr(self.backend, "blocking", False):
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def _store(self, key: str, value: dict):
+        await self._backend_call(self.backend.set, key, time.time(), value, "error" in value)
+
+    async def oldest_age(self, locations) -> Optional[float]:
+        """Age in seconds of the oldest cached weather among the locations, None if any is missing or failed"""
+        ages = []
+        now = time.time()
+        for location in locations:
+            entry = await self._backend_call(self.backend.get, normalize_location(location))
+            if entry is None or entry[2]:
+                return None
+            ages.append(now - entry[0])
+        return max(ages) if ages else None
+
+    def _revalidate(self, key: str, location: str, fetch: Callable[[str], Awaitable[dict]]):
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                value = await fetch(location)
+                # A failed refresh keeps serving the stale entry instead of replacing it
+                if "error" not in value:
+                    await self._store(key, value)
+            except Exception as e:
+                logging.info(f"Background weather refresh failed for {location}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.ensure_future(refresh())
+
+    def stats(self) -> dict:
+        """Hit/miss counters for monitoring"""
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+        }
+
+
+# Process-wide cache shared by every WeatherTool instance
+_shared_weather_cache: Optional[WeatherCache] = None
+_shared_weather_cache_lock = threading.Lock()
+
+
+def get_weather_cache() -> WeatherCache:
+    """Return the process-wide WeatherCache, with the backend selected in config"""
+    global _shared_weather_cache
+    if _shared_weather_cache is None:
+        with _shared_weather_cache_lock:
+            if _shared_weather_cache is None:
+                if weather_cache_backend == "sqlite":
+                    backend = SQLiteWeatherCacheBackend(
+                        weather_cache_path, max_age=weather_cache_ttl + weather_cache_stale_ttl
+                    )
+                else:
+                    backend = MemoryWeatherCacheBackend(max_entries=weather_cache_max_entries)
+                _shared_weather_cache = WeatherCache(backend=backend)
+    return _shared_weather_cache
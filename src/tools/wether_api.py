@@ -1,39 +1,119 @@
-from dotenv import load_dotenv
-load_dotenv()
+import os, json, asyncio, threading, httpx
+from typing import TYPE_CHECKING, Optional
 
-import os, json, requests, httpx
+from src.tools.weather_cache import normalize_location
+from src.utils.metrics import metrics
+from src.config import weather_api_base_url, weather_api_timeout, weather_api_max_connections, weather_api_retries
+
+if TYPE_CHECKING:
+    import requests
 
 
 class WeatherAPIClient:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, base_url: Optional[str] = None, timeout: float = weather_api_timeout,
+                 max_connections: int = weather_api_max_connections, retries: int = weather_api_retries):
         self.api_key = api_key
-        self.base_url = "http://api.weatherapi.com/v1/current.json"
+        # Overridable so the client can be pointed at a local stub server
+        self.base_url = base_url or weather_api_base_url
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.retries = retries
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+        self._session = None
+        self._async_client = None
+        # In-flight upstream lookups keyed by location, shared by concurrent callers
+        self._inflight: dict[str, asyncio.Future] = {}
 
-    def get_current_weather(self, location: str) -> dict:
-        params = {
+    def _get_session(self) -> "requests.Session":
+        # requests is only needed by the sync path; the API process uses the async httpx client
+        import requests
+        if self._session is None:
+            self._session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.max_connections, max_retries=self.retries)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+        return self._session
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Long-lived pooled client so lookups reuse keep-alive connections"""
+        if self._async_client is None or self._async_client.is_closed:
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=30.0,
+            )
+            self._async_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                # No transport-level retries: _fetch_current_weather is the one retry layer (connect errors and 5xx)
+                transport=httpx.AsyncHTTPTransport(limits=limits),
+            )
+        return self._async_client
+
+    def _params(self, location: str) -> dict:
+        return {
             "q": location,
             "key": self.api_key,
             "aqi": "no"
         }
-        response = requests.get(self.base_url, params=params)
+
+    def get_current_weather(self, location: str) -> dict:
+        import requests
+        try:
+            response = self._get_session().get(self.base_url, params=self._params(location), timeout=self.timeout)
+        except requests.RequestException as e:
+            return {"error": f"Could not retrieve weather data for {location}. {e}"}
         if response.status_code == 200:
             return response.json()
         else:
             return {"error": f"Could not retrieve weather data for {location}. Status code: {response.status_code}"}
     
     async def aget_current_weather(self, location: str) -> dict:
-    
-        params = {
-            "q": location,
-            "key": self.api_key,
-            "aqi": "no"
-        }
-        async with httpx.AsyncClient() as client:
-            response = await client.get(self.base_url, params=params)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return {"error": f"Could not retrieve weather data for {location}. Status code: {response.status_code}"}
+        """Get current weather, sharing one upstream call between concurrent lookups of the same location"""
+        key = normalize_location(location)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced_calls += 1
+            return await asyncio.shield(inflight)
+
+        task = asyncio.ensure_future(self._fetch_current_weather(location))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so a cancelled caller doesn't cancel the lookup other callers are waiting on
+        return await asyncio.shield(task)
+
+    async def _fetch_current_weather(self, location: str) -> dict:
+        client = self._get_async_client()
+        self.upstream_calls += 1
+        response, error = None, None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(0.1 * 2 ** (attempt - 1))
+            try:
+                with metrics.timer("weather_http"):
+                    response = await client.get(self.base_url, params=self._params(location))
+            except httpx.HTTPError as e:
+                response, error = None, e
+                continue
+            # Only server errors are worth retrying
+            if response.status_code < 500:
+                break
+
+        if response is None:
+            return {"error": f"Could not retrieve weather data for {location}. {error}"}
+        if response.status_code == 200:
+            return response.json()
+        else:
+            return {"error": f"Could not retrieve weather data for {location}. Status code: {response.status_code}"}
+
+    async def aclose(self):
+        """Close pooled connections, called on application shutdown"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
     
     def parse_results(self, data: dict) -> str:
         if "error" in data:
@@ -59,3 +139,17 @@ class WeatherAPIClient:
                 f"Humidity: {humidity}%\n"
                 f"Wind Speed: {wind_kph} kph")
 
+
+# Process-wide client so every weather lookup shares one connection pool
+_shared_weather_client: Optional[WeatherAPIClient] = None
+_shared_weather_client_lock = threading.Lock()
+
+
+def get_weather_client() -> WeatherAPIClient:
+    """Return the process-wide WeatherAPIClient, creating it on first use"""
+    global _shared_weather_client
+    if _shared_weather_client is None:
+        with _shared_weather_client_lock:
+            if _shared_weather_client is None:
+                _shared_weather_client = WeatherAPIClient(api_key=os.getenv("WEATHERAPI_KEY"))
+    return _shared_weather_client
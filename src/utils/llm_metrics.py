@@ -0,0 +1,57 @@
+"""LangChain callback feeding LLM call latency and token counts into the metrics registry.
+
+Kept apart from src.utils.metrics so the registry can be imported (by the API module,
+the probes, the vector store) without loading LangChain.
+"""
+import time
+from typing import Any, Dict, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.utils.metrics import MetricsRegistry, metrics
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """LangChain callback timing each LLM call and counting its tokens, labelled by the "llm_call" metadata"""
+
+    def __init__(self, registry: MetricsRegistry = metrics):
+        self.registry = registry
+        self._starts: Dict[Any, Tuple[float, str]] = {}
+
+    def _start(self, run_id, metadata):
+        self._starts[run_id] = (time.perf_counter(), (metadata or {}).get("llm_call", "llm"))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start, call = self._starts.pop(run_id, (None, "llm"))
+        if start is not None:
+            self.registry.observe(f"llm.{call}", time.perf_counter() - start)
+        self.registry.inc("llm_calls_total", call=call)
+        for kind, count in _token_usage(response).items():
+            self.registry.inc("llm_tokens_total", count, call=call, kind=kind)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        _, call = self._starts.pop(run_id, (None, "llm"))
+        self.registry.inc("llm_errors_total", call=call)
+
+
+def _token_usage(response) -> Dict[str, int]:
+    """Prompt/completion token counts from the provider's llm_output, or the message usage metadata when streaming"""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return {"prompt": usage.get("prompt_tokens", 0), "completion": usage.get("completion_tokens", 0)}
+    totals = {"prompt": 0, "completion": 0}
+    for generations in response.generations:
+        for generation in generations:
+            usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            totals["prompt"] += usage_metadata.get("input_tokens", 0)
+            totals["completion"] += usage_metadata.get("output_tokens", 0)
+    return totals
+
+
+llm_metrics_callback = LLMMetricsCallback()
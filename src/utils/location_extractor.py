@@ -0,0 +1,207 @@
+"""Local gazetteer-based location extraction, used before falling back to the LLM.
+
+The gazetteer (countries, major cities and the places of "The Innocents Abroad",
+with their old spellings as aliases) is compiled into an Aho-Corasick automaton
+and pickled, so workers load it in milliseconds. Build the index ahead of time with
+    python -m src.utils.location_extractor
+"""
+import os
+import re
+import pickle
+import logging
+from collections import Counter, deque
+from typing import NamedTuple
+
+from src.config import gazetteer_path, gazetteer_index_path, local_location_max
+
+_WORD_CHAR = re.compile(r"\w")
+# The word after "<city>," and the words there that continue a sentence or list rather than qualify the city
+_QUALIFIER = re.compile(r"\s*,\s*([^\W\d_]+)")
+_LIST_WORDS = frozenset("""
+and or please then but also plus right now today tonight tomorrow currently thanks thank what whats how is are
+was will would should can could do does i im we my our me you the a an in at for so if when where which
+""".split())
+_INDEX_VERSION = 1
+
+
+class Place(NamedTuple):
+    name: str
+    kind: str
+    country: str
+    ambiguous: bool
+
+
+class AhoCorasick:
+    """Multi-pattern matcher over character transitions"""
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+    def add(self, pattern: str, value: int):
+        node = 0
+        for char in pattern:
+            child = self.goto[node].get(char)
+            if child is None:
+                child = len(self.goto)
+                self.goto[node][char] = child
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = child
+        self.output[node].append((len(pattern), value))
+
+    def build(self):
+        """Compute failure links breadth-first"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(char, 0) if self.goto[state].get(char, 0) != child else 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def iter(self, text: str):
+        """Yield (start, end, value) for every pattern occurrence"""
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for length, value in self.output[node]:
+                yield index - length + 1, index + 1, value
+
+
+class LocationExtractor:
+
+    def __init__(self, automaton: AhoCorasick, places: list):
+        self.automaton = automaton
+        self.places = places
+
+    @classmethod
+    def from_gazetteer(cls, path: str = gazetteer_path) -> "LocationExtractor":
+        automaton = AhoCorasick()
+        places = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                kind, name, country, aliases, ambiguous = (line.rstrip("\n").split("\t") + [""] * 5)[:5]
+                place_id = len(places)
+                places.append(Place(name, kind, country, ambiguous == "1"))
+                for surface in [name] + [alias for alias in aliases.split(";") if alias]:
+                    automaton.add(surface.lower(), place_id)
+        automaton.build()
+        return cls(automaton, places)
+
+    @classmethod
+    def load(cls, path: str = gazetteer_path, index_path: str = gazetteer_index_path) -> "LocationExtractor":
+        """Load the pickled index, rebuilding it when it is missing or older than the gazetteer"""
+        if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(path):
+            with open(index_path, "rb") as f:
+                version, automaton, places = pickle.load(f)
+            if version == _INDEX_VERSION:
+                return cls(automaton, [Place(*place) for place in places])
+        extractor = cls.from_gazetteer(path)
+        try:
+            extractor.save(index_path)
+        except OSError as e:
+            logging.info(f"Could not write gazetteer index to {index_path}: {e}")
+        return extractor
+
+    def save(self, index_path: str = gazetteer_index_path):
+        with open(index_path, "wb") as f:
+            pickle.dump((_INDEX_VERSION, self.automaton, [tuple(place) for place in self.places]), f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _find_spans(self, text: str, require_capitalized: bool = False) -> list:
+        """(start, end, place) of the longest non-overlapping whole-word matches, in order"""
+        # Lower-case char by char so match offsets line up with the original text
+        lowered = "".join(char.lower()[:1] or char for char in text)
+        matches = []
+        for start, end, place_id in self.automaton.iter(lowered):
+            if start > 0 and _WORD_CHAR.match(text[start - 1]):
+                continue
+            if end < len(text) and _WORD_CHAR.match(text[end]):
+                continue
+            if require_capitalized and not text[start].isupper():
+                continue
+            matches.append((start, end, place_id))
+
+        spans, last_end = [], 0
+        for start, end, place_id in sorted(matches, key=lambda m: (m[0], m[0] - m[1])):
+            if start >= last_end:
+                spans.append((start, end, self.places[place_id]))
+                last_end = end
+        return spans
+
+    def find(self, text: str, require_capitalized: bool = False) -> list:
+        """Return the places mentioned in a text, longest non-overlapping whole-word matches in order"""
+        return [place for _, _, place in self._find_spans(text, require_capitalized)]
+
+    def extract(self, text: str) -> tuple[list[str], bool]:
+        """Locations named in a user query, and whether any of them is ambiguous.
+
+        A ", <qualifier>" after a city must be that city's own country or region ("Paris, France");
+        any other qualifier ("Paris, Texas", "London, Canada") means a place the gazetteer may not
+        hold, so the result is marked ambiguous and the qualifier itself is never returned.
+        """
+        spans = self._find_spans(text)
+        ambiguous = any(place.ambiguous for _, _, place in spans)
+        qualifiers = set()
+        for i, (_, end, place) in enumerate(spans):
+            if place.kind not in ("city", "landmark"):
+                continue
+            comma = _QUALIFIER.match(text, end)
+            if comma is None:
+                continue
+            following = spans[i + 1] if i + 1 < len(spans) and spans[i + 1][0] == comma.start(1) else None
+            if following is not None and following[2].kind in ("country", "region"):
+                qualifiers.add(i + 1)
+                ambiguous = ambiguous or following[2].country != place.country
+            elif following is None and comma.group(1).lower() not in _LIST_WORDS:
+                ambiguous = True
+        names = [place.name for i, (_, _, place) in enumerate(spans) if i not in qualifiers]
+        return list(dict.fromkeys(names))[:local_location_max], ambiguous
+
+    def extract_for_query(self, query: str, context: str) -> tuple[list[str], bool]:
+        """Locations a book query is asking about, picked from the query and the retrieved passages.
+
+        Returns (locations, confident). Places named in the query win; a country in
+        the query selects the cities of that country mentioned in the passages;
+        otherwise the cities the passages mention most are used.
+        """
+        query_places = self.find(query)
+        if any(place.ambiguous for place in query_places):
+            return [], False
+        named = [place.name for place in query_places if place.kind != "country"]
+        if named:
+            return list(dict.fromkeys(named))[:local_location_max], True
+
+        countries = {place.name for place in query_places if place.kind == "country"}
+        mentions = Counter(
+            place.name for place in self.find(context, require_capitalized=True)
+            if place.kind == "city" and not place.ambiguous and (not countries or place.country in countries)
+        )
+        locations = [name for name, _ in mentions.most_common(local_location_max)]
+        return locations, bool(locations)
+
+
+_extractor = None
+
+
+def get_location_extractor() -> LocationExtractor:
+    """Return the process-wide extractor, loading the index on first use"""
+    global _extractor
+    if _extractor is None:
+        _extractor = LocationExtractor.load()
+    return _extractor
+
+
+if __name__ == "__main__":
+    LocationExtractor.from_gazetteer().save()
+    print(f"Gazetteer index written to {gazetteer_index_path}")
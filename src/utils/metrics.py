@@ -0,0 +1,174 @@
+"""In-process latency, token and cache metrics with per-request traces, exported in Prometheus text format.
+
+Every timed stage ("node.oracle_node", "embedding", "vector_query", "weather_http",
+"llm.final_response", ...) feeds one labelled histogram. A bounded window of recent
+samples per stage gives p50/p95/p99 without a time-series backend. Observations
+made while a request trace is active are also recorded on that trace, so a single
+/ask can be broken down by stage under its trace id.
+
+Recording is a perf_counter pair, a bisect and an append under a lock, so it is
+cheap enough for the hot path.
+"""
+import time
+import uuid
+import bisect
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds, from sub-millisecond cache hits to slow LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+_NAMESPACE = "travel_agent"
+
+
+class Histogram:
+    """Cumulative bucket counts for Prometheus plus a window of recent samples for quantiles"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS, window: int = 1024):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+            self.recent.append(value)
+
+    def quantiles(self) -> Dict[float, float]:
+        with self._lock:
+            samples = sorted(self.recent)
+        if not samples:
+            return {}
+        return {q: samples[min(int(q * len(samples)), len(samples) - 1)] for q in QUANTILES}
+
+
+class Trace:
+    """Stage timings of one request, in the order they finished"""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List[Tuple[str, float]] = []
+
+    def summary(self) -> Dict[str, float]:
+        """Total ms per stage; stages that ran several times (e.g. embedding) are summed"""
+        totals: Dict[str, float] = {}
+        for stage, seconds in self.spans:
+            totals[stage] = round(totals.get(stage, 0.0) + seconds * 1000, 1)
+        return totals
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items())) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[Tuple[str, Tuple], float] = {}
+        self._collectors: Dict[str, Callable[[], dict]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, Histogram())
+        histogram.observe(seconds)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append((stage, seconds))
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def register_stats(self, component: str, stats_fn: Callable[[], dict]):
+        """Export a component's existing stats() dict (cache hits, batch sizes, ...) as gauges"""
+        self._collectors[component] = stats_fn
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = [f"# TYPE {_NAMESPACE}_latency_seconds histogram"]
+        quantile_lines = []
+        for stage, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{_NAMESPACE}_latency_seconds_bucket{_labels({'stage': stage, 'le': le})} {cumulative}")
+            lines.append(f"{_NAMESPACE}_latency_seconds_sum{_labels({'stage': stage})} {histogram.sum}")
+            lines.append(f"{_NAMESPACE}_latency_seconds_count{_labels({'stage': stage})} {histogram.count}")
+            for q, value in histogram.quantiles().items():
+                quantile_lines.append(f"{_NAMESPACE}_latency_recent_seconds{_labels({'stage': stage, 'quantile': q})} {value}")
+        lines.append(f"# TYPE {_NAMESPACE}_latency_recent_seconds gauge")
+        lines.extend(quantile_lines)
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+        for name in sorted({name for (name, _), _ in counters}):
+            lines.append(f"# TYPE {_NAMESPACE}_{name} counter")
+            lines.extend(f"{_NAMESPACE}_{n}{_labels(dict(labels))} {value}" for (n, labels), value in counters if n == name)
+
+        lines.append(f"# TYPE {_NAMESPACE}_component_stat gauge")
+        for component, stats_fn in sorted(self._collectors.items()):
+            try:
+                stats = stats_fn()
+            except Exception:
+                continue
+            for stat, value in _flatten(stats):
+                lines.append(f"{_NAMESPACE}_component_stat{_labels({'component': component, 'stat': stat})} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(stats: dict, prefix: str = ""):
+    for key, value in stats.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+metrics = MetricsRegistry()
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def start_trace(trace_id: Optional[str] = None) -> Trace:
+    """Collect the stage timings of the current request (and the tasks it spawns) under a trace id"""
+    trace = Trace(trace_id or new_trace_id())
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
@@ -0,0 +1,66 @@
+"""Startup progress and per-dependency status behind the /healthz and /readyz probes."""
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+from src.utils.metrics import metrics
+
+logger = logging.getLogger("agent")
+
+# Measured from module import, which is as close to process start as the app gets
+_process_start = time.perf_counter()
+
+
+class Readiness:
+    """Tracks each startup dependency as pending, ok or failed, with how long it took"""
+
+    def __init__(self, required: Sequence[str]):
+        self.required = tuple(required)
+        self.components: Dict[str, Dict[str, Any]] = {name: {"status": "pending"} for name in required}
+        self.ready_after_ms: Optional[float] = None
+
+    def set(self, name: str, status: str, **details):
+        self.components[name] = {"status": status, **details}
+        if self.ready_after_ms is None and self.is_ready():
+            self.ready_after_ms = round((time.perf_counter() - _process_start) * 1000, 1)
+            metrics.observe("startup.cold_start", self.ready_after_ms / 1000)
+            logger.info(f"Cold start: ready after {self.ready_after_ms} ms, components: {self.components}")
+
+    async def track(self, name: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        """Await one startup step, recording its status and duration"""
+        start = time.perf_counter()
+        self.set(name, "loading")
+        try:
+            result = await load()
+        except Exception as e:
+            logger.error(f"Startup step {name} failed: {e}")
+            self.set(name, "failed", error=str(e), elapsed_ms=round((time.perf_counter() - start) * 1000, 1))
+            raise
+        elapsed = time.perf_counter() - start
+        metrics.observe(f"startup.{name}", elapsed)
+        self.set(name, "ok", elapsed_ms=round(elapsed * 1000, 1))
+        return result
+
+    def is_ready(self) -> bool:
+        return all(self.components.get(name, {}).get("status") == "ok" for name in self.required)
+
+    def report(self) -> Dict[str, Any]:
+        return {"ready": self.is_ready(), "cold_start_ms": self.ready_after_ms, "components": self.components}
+
+
+async def wait_with_backoff(check: Callable[[], Any], name: str, timeout: float = 60.0,
+                            initial_delay: float = 0.1, max_delay: float = 5.0):
+    """Run a blocking check in a thread until it succeeds, backing off exponentially without blocking the loop"""
+    deadline = time.monotonic() + timeout
+    delay, attempt = initial_delay, 0
+    while True:
+        attempt += 1
+        try:
+            return await asyncio.to_thread(check)
+        except Exception as e:
+            if time.monotonic() + delay > deadline:
+                raise RuntimeError(f"{name} not available after {attempt} attempts: {e}") from e
+            logger.info(f"Waiting for {name} (attempt {attempt}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
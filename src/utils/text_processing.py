@@ -1,7 +1,96 @@
+import re
+
+from src.config import chunk_overlap, context_token_budget, context_duplicate_threshold
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_WORD_PATTERN = re.compile(r"\w+")
+# Overlap anchors shorter than this are too likely to match by accident
+_MIN_OVERLAP = 20
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local estimate of the LLM token count: words and punctuation, plus a margin for sub-word splits."""
+    return int(len(_TOKEN_PATTERN.findall(text)) * 1.25) + 1
+
+
+def join_overlapping(left: str, right: str, max_overlap: int = chunk_overlap) -> str:
+    """Join two consecutive chunks, writing the text they share through the splitter overlap only once."""
+    tail = left[-max_overlap:] if max_overlap else ""
+    anchor = right[:_MIN_OVERLAP]
+    position = tail.find(anchor) if len(anchor) == _MIN_OVERLAP else -1
+    while position != -1:
+        if right.startswith(tail[position:]):
+            return left + right[len(tail) - position:]
+        position = tail.find(anchor, position + 1)
+    return f"{left}\n{right}"
+
+
+def _shingles(text: str) -> set:
+    words = _WORD_PATTERN.findall(text.lower())
+    return {tuple(words[i:i + 3]) for i in range(max(len(words) - 2, 1))}
+
+
+def pack_context(results: list[dict], token_budget: int = context_token_budget, max_overlap: int = chunk_overlap,
+                 duplicate_threshold: float = context_duplicate_threshold) -> list[dict]:
+    """Merge adjacent chunks, drop near-duplicates and keep the best ranked passages that fit the token budget.
+
+    Results are expected best first, as the retrieval returns them: by cross-encoder score when reranked,
+    by fused score for hybrid search, by similarity otherwise. A merged passage ranks as its best chunk.
+    """
+    # Consecutive chunk_ids of one corpus are neighbours in the book and get merged into one passage
+    def key(result):
+        metadata = result.get('metadata') or {}
+        return metadata.get('corpus'), metadata.get('chunk_id')
+
+    ranked = list(enumerate(results))
+    ordered = sorted(((rank, r) for rank, r in ranked if key(r)[1] is not None),
+                     key=lambda item: (str(key(item[1])[0]), key(item[1])[1]))
+    passages = []
+    for rank, result in ordered:
+        previous = passages[-1] if passages else None
+        corpus, chunk_id = key(result)
+        if previous and previous['corpus'] == corpus and chunk_id - previous['chunk_ids'][-1] <= 1:
+            if chunk_id != previous['chunk_ids'][-1]:
+                previous['text'] = join_overlapping(previous['text'], result.get('text', ''), max_overlap)
+                previous['chunk_ids'].append(chunk_id)
+            previous['similarity'] = max(previous['similarity'], result.get('similarity', 0.0))
+            previous['rank'] = min(previous['rank'], rank)
+            continue
+        passages.append({'text': result.get('text', ''), 'metadata': result.get('metadata'), 'corpus': corpus,
+                         'chunk_ids': [chunk_id], 'similarity': result.get('similarity', 0.0), 'rank': rank})
+    passages.extend({'text': r.get('text', ''), 'metadata': r.get('metadata'), 'corpus': None, 'chunk_ids': [],
+                     'similarity': r.get('similarity', 0.0), 'rank': rank} for rank, r in ranked if key(r)[1] is None)
+
+    packed, kept_shingles, used = [], [], 0
+    for passage in sorted(passages, key=lambda p: p['rank']):
+        shingles = _shingles(passage['text'])
+        # A passage mostly contained in one already kept adds nothing
+        if any(len(shingles & other) / len(shingles) >= duplicate_threshold for other in kept_shingles):
+            continue
+        tokens = estimate_tokens(passage['text'])
+        if used + tokens > token_budget:
+            if packed:
+                # Smaller, lower ranked passages may still fit
+                continue
+            # Always keep the best passage, cut to the budget
+            words = passage['text'].split(" ")
+            passage['text'] = " ".join(words[:max(int(len(words) * token_budget / tokens), 1)])
+            tokens = estimate_tokens(passage['text'])
+        packed.append(passage)
+        kept_shingles.append(shingles)
+        used += tokens
+    return packed
+
+
 def format_retrieved_chunks(results: list[dict]) -> str:
     """Formats the retrieved chunks into a single string for being passed into the prompt for llm as context."""
     retrieved_chunks_str = ""
     for i, result in enumerate(results):
         added_string = f"Passage {i+1}:\n{result.get('text', '')}\n\n"
         retrieved_chunks_str += added_string
-    return retrieved_chunks_str
\ No newline at end of file
+    return retrieved_chunks_str
+
+
+def assemble_context(results: list[dict], token_budget: int = context_token_budget) -> str:
+    """Packs the retrieved chunks within the token budget and formats them as prompt context."""
+    return format_retrieved_chunks(pack_context(results, token_budget=token_budget))
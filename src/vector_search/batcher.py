@@ -0,0 +1,73 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Callable, List, Optional, Sequence
+
+
+class EmbeddingBatcher:
+    """Collects concurrent queries for a few milliseconds and encodes them in one batched call.
+
+    Each caller awaits its own future; a batch is flushed as soon as it reaches
+    max_batch_size or max_wait_ms after its first query arrived, whichever comes first.
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], Sequence], executor: Optional[Executor] = None,
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.encode_fn = encode_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batches = 0
+        self.items = 0
+        self._pending: List[tuple] = []
+        self._flush_handle = None
+        self._tasks = set()
+
+    async def encode(self, text: str) -> List[float]:
+        """Queue a text for the next batch and wait for its embedding"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run_batch(batch))
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[tuple]):
+        # Identical queries in the same window are encoded once
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        loop = asyncio.get_running_loop()
+        try:
+            embeddings = await loop.run_in_executor(self.executor, self.encode_fn, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = {text: list(map(float, embedding)) for text, embedding in zip(texts, embeddings)}
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+        self.batches += 1
+        self.items += len(batch)
+
+    def stats(self) -> dict:
+        """Batch counters for monitoring"""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,120 @@
+"""Sparse BM25 index over the chunks of a collection, stored next to it for hybrid retrieval.
+
+The index is a CSR-style inverted index: for term t, postings[offsets[t]:offsets[t+1]]
+are the positions of the chunks containing it and weights[...] their precomputed BM25
+term scores, so a query is a handful of vectorized adds. The arrays are .npy files
+loaded with memory mapping; the vocabulary and chunk ids sit in a small JSON file.
+"""
+import os
+import re
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.config import index_dir, bm25_k1, bm25_b
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by for from had has have he her his i in is it its me my not of on or our "
+    "she so that the their them there they this to was we were what when where which who will with you your".split()
+)
+_ARRAYS = ("offsets", "postings", "weights")
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if len(token) > 1 and token not in _STOPWORDS]
+
+
+def bm25_index_path(collection_name: str, part: str = "json") -> str:
+    suffix = "json" if part == "json" else f"{part}.npy"
+    return os.path.join(index_dir, f"{collection_name}.bm25.{suffix}")
+
+
+class BM25Index:
+    def __init__(self, ids: List[str], vocabulary: List[str], offsets: np.ndarray, postings: np.ndarray, weights: np.ndarray):
+        self.ids = ids
+        self.vocabulary = vocabulary
+        self._terms = {term: i for i, term in enumerate(vocabulary)}
+        self.offsets = offsets
+        self.postings = postings
+        self.weights = weights
+
+    @classmethod
+    def build(cls, chunks: Sequence[Dict[str, Any]], k1: float = bm25_k1, b: float = bm25_b) -> "BM25Index":
+        term_counts = []
+        for chunk in chunks:
+            counts: Dict[str, int] = {}
+            for token in tokenize(chunk['text']):
+                counts[token] = counts.get(token, 0) + 1
+            term_counts.append(counts)
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+        per_term: Dict[str, List[Tuple[int, int]]] = {}
+        for position, counts in enumerate(term_counts):
+            for term, count in counts.items():
+                per_term.setdefault(term, []).append((position, count))
+
+        vocabulary = sorted(per_term)
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        postings, weights = [], []
+        n_docs = len(chunks)
+        for i, term in enumerate(vocabulary):
+            entries = per_term[term]
+            idf = np.log(1.0 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            positions = np.array([position for position, _ in entries], dtype=np.int32)
+            tf = np.array([count for _, count in entries], dtype=np.float32)
+            norm = k1 * (1.0 - b + b * lengths[positions] / max(average_length, 1e-9))
+            postings.append(positions)
+            weights.append((idf * tf * (k1 + 1.0) / (tf + norm)).astype(np.float32))
+            offsets[i + 1] = offsets[i] + len(entries)
+        return cls(
+            ids=[chunk['id'] for chunk in chunks],
+            vocabulary=vocabulary,
+            offsets=offsets,
+            postings=np.concatenate(postings) if postings else np.zeros(0, dtype=np.int32),
+            weights=np.concatenate(weights) if weights else np.zeros(0, dtype=np.float32),
+        )
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Ids and BM25 scores of the k best matching chunks, best first"""
+        terms = [self._terms[token] for token in set(tokenize(query)) if token in self._terms]
+        if not terms or k <= 0:
+            return []
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in terms:
+            start, end = self.offsets[term], self.offsets[term + 1]
+            # A chunk appears at most once per term, so plain fancy-index add is exact
+            scores[self.postings[start:end]] += self.weights[start:end]
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(self.ids[i], float(scores[i])) for i in matched]
+
+
+def save_bm25_index(collection_name: str, index: BM25Index):
+    os.makedirs(index_dir, exist_ok=True)
+    for part in _ARRAYS:
+        path = bm25_index_path(collection_name, part)
+        tmp_path = f"{path[:-4]}.tmp.npy"
+        np.save(tmp_path, getattr(index, part))
+        os.replace(tmp_path, path)
+    # The JSON file is written last, a reader only loads the index once it exists
+    path = bm25_index_path(collection_name)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"ids": index.ids, "vocabulary": index.vocabulary}, f)
+    os.replace(tmp_path, path)
+
+
+def load_bm25_index(collection_name: str) -> Optional[BM25Index]:
+    """Load the index for a collection with its arrays memory-mapped, None if ingestion hasn't written one"""
+    path = bm25_index_path(collection_name)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    arrays = {part: np.load(bm25_index_path(collection_name, part), mmap_mode="r") for part in _ARRAYS}
+    return BM25Index(ids=data["ids"], vocabulary=data["vocabulary"], **arrays)
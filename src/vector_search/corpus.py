@@ -0,0 +1,117 @@
+"""Corpus registry and query routing across per-corpus collections.
+
+The registry (CORPUS_REGISTRY, JSON) maps a corpus name, which is also its
+logical collection name, to a description, a list of source files or
+directories of .txt files, and routing keywords. At query time each query is
+sent only to the corpora it is relevant to and their top-k results are merged.
+"""
+import os
+import json
+import asyncio
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from src.config import corpus_registry_path, route_max_collections, route_min_similarity
+
+
+class Corpus(NamedTuple):
+    name: str
+    description: str
+    sources: List[str]
+    keywords: List[str]
+
+    def document_paths(self) -> List[str]:
+        """Source files, with directories expanded to the .txt files they contain"""
+        paths = []
+        for source in self.sources:
+            if os.path.isdir(source):
+                paths.extend(sorted(os.path.join(source, name) for name in os.listdir(source) if name.endswith(".txt")))
+            else:
+                paths.append(source)
+        return paths
+
+
+def load_corpus_registry(path: str = corpus_registry_path) -> Dict[str, Corpus]:
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    return {
+        name: Corpus(name, entry.get("description", ""), entry["sources"], [k.lower() for k in entry.get("keywords", [])])
+        for name, entry in raw.items()
+    }
+
+
+class CorpusRouter:
+    """Routes each query to the most relevant corpora and merges their results by similarity"""
+
+    def __init__(self, corpora: Dict[str, Corpus], stores: Dict[str, Any],
+                 max_collections: int = route_max_collections, min_similarity: float = route_min_similarity):
+        self.corpora = corpora
+        self.stores = stores
+        self.max_collections = max_collections
+        self.min_similarity = min_similarity
+        self._names = list(stores)
+        self._profiles = None
+        if len(self._names) > 1:
+            # Every store shares the same embedder, so any of them can encode the descriptions
+            embedder = stores[self._names[0]].embedder
+            profiles = np.asarray(embedder.encode([corpora[name].description for name in self._names]), dtype=np.float32)
+            self._profiles = profiles / np.linalg.norm(profiles, axis=1, keepdims=True)
+
+    def _keyword_route(self, query: str) -> List[str]:
+        text = query.lower()
+        return [name for name in self._names if any(keyword in text for keyword in self.corpora[name].keywords)]
+
+    def _similarity_route(self, embedding) -> List[str]:
+        embedding = np.asarray(embedding, dtype=np.float32)
+        similarities = self._profiles @ (embedding / np.linalg.norm(embedding))
+        ranked = [int(i) for i in np.argsort(-similarities)]
+        selected = [self._names[i] for i in ranked[:self.max_collections] if similarities[i] >= self.min_similarity]
+        return selected or [self._names[ranked[0]]]
+
+    def route(self, query: str) -> List[str]:
+        """Names of the corpora to search for a query"""
+        if self._profiles is None:
+            return self._names
+        by_keyword = self._keyword_route(query)
+        if by_keyword:
+            return by_keyword[:self.max_collections]
+        return self._similarity_route(self.stores[self._names[0]].embed_query(query)[0])
+
+    async def aroute(self, query: str) -> List[str]:
+        if self._profiles is None:
+            return self._names
+        by_keyword = self._keyword_route(query)
+        if by_keyword:
+            return by_keyword[:self.max_collections]
+        # Query embeddings are cached, so retrieval reuses this encode
+        return self._similarity_route((await self.stores[self._names[0]].aembed_query(query))[0])
+
+    @staticmethod
+    def _merge(names: List[str], results_per_corpus: List[List[Dict]], n_results: int) -> List[Dict]:
+        merged = []
+        for name, results in zip(names, results_per_corpus):
+            for result in results:
+                result['metadata'] = {**(result.get('metadata') or {}), 'corpus': name}
+                merged.append(result)
+        merged.sort(key=lambda result: result['similarity'], reverse=True)
+        return merged[:n_results]
+
+    def search(self, query: str, n_results: int = 5, chapter: Optional[int] = None,
+               place: Optional[str] = None) -> List[Dict]:
+        names = self.route(query)
+        results = []
+        for name in names:
+            store = self.stores[name]
+            results.append(store.search(query, n_results=n_results, where=store.where_filter(chapter=chapter, place=place)))
+        return self._merge(names, results, n_results)
+
+    async def asearch(self, query: str, n_results: int = 5, chapter: Optional[int] = None,
+                      place: Optional[str] = None) -> List[Dict]:
+        """Search the routed corpora concurrently and keep the overall top n_results"""
+        names = await self.aroute(query)
+        searches = []
+        for name in names:
+            store = self.stores[name]
+            searches.append(store.asearch(query, n_results=n_results, where=store.where_filter(chapter=chapter, place=place)))
+        return self._merge(names, await asyncio.gather(*searches), n_results)
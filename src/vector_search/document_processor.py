@@ -1,34 +1,105 @@
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 import re
+import hashlib
+
+from src.utils.location_extractor import LocationExtractor, get_location_extractor
+
+# Body chapters start with an unindented "CHAPTER XII." line; the table of contents indents them
+_CHAPTER_HEADING = re.compile(r"^(?P<indent>[ \t]*)CHAPTER (?P<number>[IVXLC]+)\.[ \t]*$", re.MULTILINE)
+_ROMAN = {"I": 1, "V": 5, "X": 10, "L": 50, "C": 100}
+
+
+def roman_to_int(numeral: str) -> int:
+    total = 0
+    for i, char in enumerate(numeral):
+        value = _ROMAN[char]
+        total += -value if i + 1 < len(numeral) and _ROMAN[numeral[i + 1]] > value else value
+    return total
+
 
 class DocumentProcessor:
-    def __init__(self, chunk_size=1000, chunk_overlap=200):
+    def __init__(self, chunk_size=1000, chunk_overlap=200, location_extractor: LocationExtractor = None):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             separators=["\n\n", "\n", ". ", " "]
         )
+        self.location_extractor = location_extractor or get_location_extractor()
     
-    def load_and_process_document(self, file_path):
-        """Load document and split into semantic chunks"""
+    def load_and_process_document(self, file_path, first_chunk_id=0, seen_ids=None):
+        """Load document and split into semantic chunks.
+
+        When several documents go into one collection, first_chunk_id and a shared
+        seen_ids dict keep chunk ids unique across them.
+        """
         with open(file_path, 'r', encoding='utf-8') as f:
             text = f.read()
         
         # Clean text and split into chapters/sections
         chunks = self.text_splitter.split_text(text)
+        chapters = self._find_chapters(text)
         
-        # Add metadata (chapter, page numbers if available)
+        # Add metadata (chapter, places mentioned)
         processed_chunks = []
-        for i, chunk in enumerate(chunks):
+        offset = 0
+        seen_ids = {} if seen_ids is None else seen_ids
+        for i, chunk in enumerate(chunks, start=first_chunk_id):
+            found = text.find(chunk, offset)
+            if found != -1:
+                offset = found
+            metadata = self._extract_metadata(chunk, i, offset, chapters)
+            metadata['source'] = file_path
             processed_chunks.append({
                 'text': chunk,
                 'chunk_id': i,
-                'metadata': self._extract_metadata(chunk)
+                'id': self._content_id(chunk, seen_ids),
+                'metadata': metadata
             })
         
         return processed_chunks
+
+    @staticmethod
+    def _content_id(chunk, seen_ids):
+        """Stable id derived from the chunk text, so unchanged chunks keep their id across re-ingestion"""
+        digest = hashlib.sha256(chunk.encode('utf-8')).hexdigest()[:32]
+        # Identical passages occurring more than once get an occurrence suffix
+        occurrence = seen_ids.get(digest, 0)
+        seen_ids[digest] = occurrence + 1
+        return digest if occurrence == 0 else f"{digest}-{occurrence}"
+
+    def _find_chapters(self, text):
+        """Return (start offset, number, title) for each body chapter, titles taken from the contents"""
+        titles = {}
+        starts = []
+        for match in _CHAPTER_HEADING.finditer(text):
+            number = roman_to_int(match.group("number"))
+            if match.group("indent"):
+                # Contents entry: the summary lines up to the next blank line are the title
+                summary = text[match.end():].lstrip("\n").split("\n\n", 1)[0]
+                titles.setdefault(number, " ".join(line.strip() for line in summary.splitlines()))
+            else:
+                starts.append((match.start(), number))
+        return [(start, number, titles.get(number, "")) for start, number in starts]
     
-    def _extract_metadata(self, chunk):
+    def _extract_metadata(self, chunk, chunk_id, offset, chapters):
         """Extract location names, chapter info, etc."""
-        # Implementation for extracting locations, chapters, etc.
-        pass
\ No newline at end of file
+        metadata = {'chunk_id': chunk_id}
+
+        chapter = None
+        for start, number, title in chapters:
+            if start > offset:
+                break
+            chapter = (number, title)
+        if chapter is not None:
+            metadata['chapter'], metadata['chapter_title'] = chapter
+
+        # Chroma metadata values must be scalars, so place lists are stored "|"-joined
+        places = [place for place in self.location_extractor.find(chunk, require_capitalized=True) if not place.ambiguous]
+        if places:
+            metadata['places'] = "|".join(dict.fromkeys(place.name for place in places))
+            cities = [place.name for place in places if place.kind == "city"]
+            if cities:
+                metadata['cities'] = "|".join(dict.fromkeys(cities))
+        return metadata
@@ -0,0 +1,166 @@
+"""Pluggable sentence encoders: the PyTorch SentenceTransformer or ONNX Runtime on CPU.
+
+Every backend exposes the one method the rest of the code calls,
+``encode(texts, batch_size=...) -> np.ndarray`` of unit-length float32 rows, so a
+VectorStore, the intent classifier and the response cache work with any of them.
+
+The ONNX backends run the exported transformer with mean pooling and normalisation
+in numpy, needing only onnxruntime and tokenizers at serve time (no torch). "onnx-int8"
+uses a dynamically quantised copy of the same graph, smaller and faster on CPU at a
+small cost in cosine agreement (see benchmarks/eval_embedder_parity.py). Export the
+artifacts ahead of time, on a machine with torch:
+    python -m src.vector_search.embedders --output src/data/models/all-MiniLM-L6-v2
+"""
+import os
+import json
+import logging
+import argparse
+from typing import List, Sequence, Union
+
+import numpy as np
+
+from src.config import embedding_model_name, embedding_backend, embedding_onnx_dir, embedding_onnx_threads
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+_MODEL_FILES = {"onnx": "model.onnx", "onnx-int8": "model.int8.onnx"}
+_CONFIG_FILE = "embedder.json"
+_TOKENIZER_FILE = "tokenizer.json"
+
+
+class OnnxEmbedder:
+    """SentenceTransformer-compatible encoder running an exported model with ONNX Runtime on CPU"""
+
+    def __init__(self, model_dir: str = embedding_onnx_dir, quantized: bool = False,
+                 threads: int = embedding_onnx_threads):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, _MODEL_FILES["onnx-int8" if quantized else "onnx"])
+        config_path = os.path.join(model_dir, _CONFIG_FILE)
+        if not (os.path.exists(model_path) and os.path.exists(config_path)):
+            raise FileNotFoundError(f"No exported model at {model_path}, run "
+                                    f"`python -m src.vector_search.embedders --output {model_dir}` first")
+        with open(config_path, encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.model_name = self.config["model_name"]
+        self.backend = "onnx-int8" if quantized else "onnx"
+        # Cached query vectors of the int8 model differ slightly, so they are kept apart from the fp32 ones
+        self.cache_namespace = f"{self.model_name}:{self.backend}"
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, _TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dimension"]
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": np.array([e.ids for e in encodings], dtype=np.int64), "attention_mask": mask,
+                 "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)}
+        token_embeddings = self.session.run(None, {name: feeds[name] for name in self._input_names})[0]
+        # Mean over the real tokens, as the SentenceTransformer pooling layer does
+        weights = mask[:, :, None].astype(np.float32)
+        embeddings = (token_embeddings * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        if self.config.get("normalize", True):
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings.astype(np.float32)
+
+    def encode(self, sentences: Union[str, Sequence[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self.encode([sentences], batch_size=batch_size)[0]
+        if not sentences:
+            return np.zeros((0, self.config["dimension"]), dtype=np.float32)
+        # Batching texts of similar length keeps padding, and so wasted compute, low
+        order = np.argsort([-len(text) for text in sentences], kind="stable")
+        embeddings = np.empty((len(sentences), self.config["dimension"]), dtype=np.float32)
+        for start in range(0, len(sentences), batch_size):
+            batch = order[start:start + batch_size]
+            embeddings[batch] = self._encode_batch([sentences[i] for i in batch])
+        return embeddings
+
+
+def load_embedder(backend: str = embedding_backend, model_name: str = embedding_model_name,
+                  model_dir: str = embedding_onnx_dir):
+    """Create the query/document encoder for the configured backend"""
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name, device="cpu")
+    if backend in _MODEL_FILES:
+        return OnnxEmbedder(model_dir, quantized=backend == "onnx-int8")
+    raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {', '.join(EMBEDDING_BACKENDS)}")
+
+
+def export_onnx(model_name: str = embedding_model_name, output_dir: str = embedding_onnx_dir, opset: int = 17,
+                quantize: bool = True):
+    """Export the SentenceTransformer's transformer to ONNX, with its tokenizer and an int8 copy (needs torch)"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    model = SentenceTransformer(model_name, device="cpu")
+    pooling = next((module for module in model if isinstance(module, Pooling)), None)
+    if pooling is not None and pooling.get_pooling_mode_str() != "mean":
+        raise ValueError(f"{model_name} uses {pooling.get_pooling_mode_str()} pooling, only mean pooling is supported")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+    os.makedirs(output_dir, exist_ok=True)
+
+    sample = tokenizer(["an example sentence to trace the graph"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+    model_path = os.path.join(output_dir, _MODEL_FILES["onnx"])
+    with torch.no_grad():
+        torch.onnx.export(transformer, tuple(sample[name] for name in input_names), model_path,
+                          input_names=input_names, output_names=["token_embeddings"],
+                          dynamic_axes=dynamic_axes, opset_version=opset, do_constant_folding=True)
+    tokenizer.save_pretrained(output_dir)
+
+    config = {
+        "model_name": model_name,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "normalize": any(isinstance(module, Normalize) for module in model),
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    if quantize:
+        quantize_int8(model_path, os.path.join(output_dir, _MODEL_FILES["onnx-int8"]))
+    # Written last: its presence marks a complete export
+    with open(os.path.join(output_dir, _CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    return config
+
+
+def quantize_int8(model_path: str, output_path: str):
+    """Dynamic int8 quantisation of the weights; activations are quantised per batch at run time"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX (fp32 and int8) for CPU serving")
+    parser.add_argument("--model", default=embedding_model_name)
+    parser.add_argument("--output", default=embedding_onnx_dir)
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--no-quantize", action="store_true", help="skip the int8 copy")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    config = export_onnx(args.model, args.output, opset=args.opset, quantize=not args.no_quantize)
+    for name in sorted(os.listdir(args.output)):
+        logging.info(f"{name}: {os.path.getsize(os.path.join(args.output, name)) / 1e6:.1f} MB")
+    logging.info(f"Exported {config['model_name']} ({config['dimension']} dims) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import re
+import time
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
+
+
+class EmbeddingCache:
+    """Bounded LRU cache of query embeddings with TTL eviction and an optional SQLite layer"""
+
+    def __init__(self, max_size: int = 2048, ttl_seconds: float = 24 * 3600, persist_path: Optional[str] = None, namespace: str = ""):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # The namespace (usually the model name) keeps vectors from different embedders apart on disk
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._entries: "OrderedDict[str, tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if persist_path:
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings "
+                "(key TEXT PRIMARY KEY, created REAL NOT NULL, embedding BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Collapse case, whitespace and trailing punctuation so trivially different queries share a key"""
+        query = re.sub(r"\s+", " ", query.strip().lower())
+        return query.rstrip(" ?!.")
+
+    def _key(self, query: str) -> str:
+        return f"{self.namespace}:{self.normalize(query)}"
+
+    @property
+    def persistent(self) -> bool:
+        """Whether misses in memory fall through to the SQLite layer (blocking I/O)"""
+        return self._db is not None
+
+    def _get_memory(self, key: str, now: float) -> Optional[List[float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        created, embedding = entry
+        if now - created <= self.ttl_seconds:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+        del self._entries[key]
+        return None
+
+    def get_memory(self, query: str) -> Optional[List[float]]:
+        """In-memory lookup only, safe to call on the event loop; a None here is not counted as a miss"""
+        with self._lock:
+            return self._get_memory(self._key(query), time.time())
+
+    def get(self, query: str) -> Optional[List[float]]:
+        """Return the cached embedding for a query, or None on a miss"""
+        key = self._key(query)
+        now = time.time()
+        with self._lock:
+            embedding = self._get_memory(key, now)
+            if embedding is not None:
+                return embedding
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT created, embedding FROM query_embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[0] <= self.ttl_seconds:
+                    embedding = array("f", row[1]).tolist()
+                    self._store(key, row[0], embedding)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return embedding
+
+            self.misses += 1
+            return None
+
+    def put(self, query: str, embedding: List[float]):
+        """Cache the embedding of a query in memory and, if configured, on disk"""
+        key = self._key(query)
+        created = time.time()
+        with self._lock:
+            self._store(key, created, list(embedding))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (key, created, embedding) VALUES (?, ?, ?)",
+                    (key, created, array("f", embedding).tobytes())
+                )
+                self._db.commit()
+
+    def _store(self, key: str, created: float, embedding: List[float]):
+        self._entries[key] = (created, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached embeddings, including the on-disk layer"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM query_embeddings")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters for monitoring"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,243 @@
+"""Batched, resumable, incremental ingestion of a document into the vector store.
+
+Chunks are keyed by a hash of their content. While the chunker parameters and
+embedding model recorded in the manifest are unchanged, re-running ingestion only
+embeds and upserts new chunks, deletes removed ones and refreshes the metadata
+of the rest. Changing the parameters builds a new collection version, which is
+swapped in atomically once complete.
+
+Chunks are embedded page by page and upserted while the next page is being
+embedded, with a checkpoint after every page, so an interrupted build resumes
+where it stopped. The numpy backend rewrites its files on every write, so there the
+whole sync is batched and persisted once at the end; an interrupted numpy build
+re-embeds the pages it had not persisted.
+
+Run standalone so ingestion doesn't hold up API startup:
+    python -m src.vector_search.ingestion --document src/data/book.txt
+"""
+import os
+import hashlib
+import logging
+import argparse
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from src.config import (book_path, embedding_model_name, chunk_size, chunk_overlap,
+                        ingestion_page_size, ingestion_embed_batch_size)
+from src.vector_search.document_processor import DocumentProcessor
+from src.vector_search.place_index import build_place_index, save_place_index
+from src.vector_search.bm25_index import BM25Index, bm25_index_path, save_bm25_index
+from src.vector_search.manifest import load_manifest, save_manifest
+
+logger = logging.getLogger("ingestion")
+
+
+def documents_sha256(paths: Sequence[str]) -> str:
+    """One hash over the names and contents of all documents of a collection"""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(path.encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def as_paths(document_paths: Union[str, Sequence[str]]) -> List[str]:
+    return [document_paths] if isinstance(document_paths, str) else list(document_paths)
+
+
+class IngestionPipeline:
+
+    def __init__(self, vector_store, processor: Optional[DocumentProcessor] = None,
+                 page_size: int = ingestion_page_size, embed_batch_size: int = ingestion_embed_batch_size):
+        self.vector_store = vector_store
+        self.processor = processor or DocumentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.page_size = page_size
+        self.embed_batch_size = embed_batch_size
+        self.base_collection = vector_store.base_collection_name
+
+    def index_params(self) -> Dict[str, Any]:
+        # Changing any of these invalidates every stored embedding or chunk boundary
+        return {
+            "chunk_size": self.processor.chunk_size,
+            "chunk_overlap": self.processor.chunk_overlap,
+            "embedding_model": embedding_model_name,
+        }
+
+    def is_complete(self, document_paths: Union[str, Sequence[str]]) -> bool:
+        active = load_manifest(self.base_collection).get("active")
+        return (bool(active) and active["params"] == self.index_params()
+                and active["document_sha256"] == documents_sha256(as_paths(document_paths))
+                and os.path.exists(bm25_index_path(active["collection"])))
+
+    def load_chunks(self, paths: Sequence[str]) -> List[Dict[str, Any]]:
+        """Chunk every document, with chunk ids unique across the whole collection"""
+        chunks, seen_ids = [], {}
+        for path in paths:
+            chunks.extend(self.processor.load_and_process_document(path, first_chunk_id=len(chunks), seen_ids=seen_ids))
+        return chunks
+
+    def _pages(self, chunks: List[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        for start in range(0, len(chunks), self.page_size):
+            yield chunks[start:start + self.page_size]
+
+    def _embed_and_upsert(self, collection, chunks: List[Dict[str, Any]], on_page_done: Callable[[int], None]):
+        """Embed chunks page by page, overlapping the upsert of one page with the embedding of the next"""
+        def upsert(page, embeddings):
+            collection.upsert(
+                ids=[chunk['id'] for chunk in page],
+                embeddings=embeddings,
+                documents=[chunk['text'] for chunk in page],
+                metadatas=[chunk['metadata'] for chunk in page],
+            )
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-upsert") as uploader:
+            pending, done = None, 0
+            for page in self._pages(chunks):
+                texts = [chunk['text'] for chunk in page]
+                embeddings = self.vector_store.embedder.encode(texts, batch_size=self.embed_batch_size).tolist()
+                if pending is not None:
+                    pending.result()
+                    on_page_done(done)
+                pending = uploader.submit(upsert, page, embeddings)
+                done += len(page)
+            if pending is not None:
+                pending.result()
+                on_page_done(done)
+
+    def _sync_collection(self, collection, chunks: List[Dict[str, Any]], on_page_done: Callable[[int], None]) -> Dict[str, int]:
+        """Bring a collection in line with the chunks, embedding only those it doesn't have yet"""
+        existing = set(collection.get(include=[])['ids'])
+        current = {chunk['id'] for chunk in chunks}
+        new_chunks = [chunk for chunk in chunks if chunk['id'] not in existing]
+        kept_chunks = [chunk for chunk in chunks if chunk['id'] in existing]
+        removed = sorted(existing - current)
+
+        # Collections that persist every write in full (NumpyCollection) write once per sync instead of per page
+        batch = getattr(collection, "batch", None)
+        with batch() if batch is not None else nullcontext():
+            self._embed_and_upsert(collection, new_chunks, on_page_done)
+            # Unchanged text may still have moved (chunk_id, chapter), which is a cheap metadata-only update
+            for page in self._pages(kept_chunks):
+                collection.update(ids=[chunk['id'] for chunk in page], metadatas=[chunk['metadata'] for chunk in page])
+            for start in range(0, len(removed), self.page_size):
+                collection.delete(ids=removed[start:start + self.page_size])
+        return {"added": len(new_chunks), "updated": len(kept_chunks), "deleted": len(removed)}
+
+    @staticmethod
+    def _save_side_indexes(collection_name: str, chunks: List[Dict[str, Any]]):
+        save_place_index(collection_name, build_place_index(chunks))
+        save_bm25_index(collection_name, BM25Index.build(chunks))
+
+    def run(self, document_paths: Union[str, Sequence[str]] = book_path, rebuild: bool = False) -> Dict[str, Any]:
+        """Ingest documents incrementally, or into a new collection version when the parameters changed"""
+        paths = as_paths(document_paths)
+        params = self.index_params()
+        document_sha256 = documents_sha256(paths)
+        manifest = load_manifest(self.base_collection)
+        active = manifest.get("active")
+        client = self.vector_store.client
+
+        # Chunking runs the splitter and a gazetteer pass over every document, so an up-to-date collection skips it
+        if active and active["params"] == params and not rebuild:
+            if active["document_sha256"] == document_sha256:
+                if not os.path.exists(bm25_index_path(active["collection"])):
+                    # Collection ingested before hybrid search existed: only the side indexes need building
+                    self._save_side_indexes(active["collection"], self.load_chunks(paths))
+                    self.vector_store.reload_indexes()
+                logger.info(f"{', '.join(paths)} already ingested into {active['collection']}")
+                return active
+            chunks = self.load_chunks(paths)
+            collection = client.get_or_create_collection(name=active["collection"], metadata={"hnsw:space": "cosine"})
+            stats = self._sync_collection(
+                collection, chunks, lambda done: logger.info(f"Embedded {done} new chunks")
+            )
+            self._save_side_indexes(active["collection"], chunks)
+            active.update({"document_sha256": document_sha256, "total_chunks": len(chunks)})
+            save_manifest(self.base_collection, manifest)
+            self.vector_store.reload_indexes()
+            logger.info(f"Incrementally updated {active['collection']}: {stats}")
+            return active
+
+        # Full (re)build into a fresh version; a matching unfinished build is resumed
+        chunks = self.load_chunks(paths)
+        building = manifest.get("building")
+        if not building or building["params"] != params:
+            version = max((active or {}).get("version", 0), (building or {}).get("version", 0)) + 1
+            building = {"collection": f"{self.base_collection}_v{version}", "version": version, "params": params}
+            manifest["building"] = building
+            save_manifest(self.base_collection, manifest)
+        logger.info(f"Building {building['collection']} from {', '.join(paths)}")
+        collection = client.get_or_create_collection(name=building["collection"], metadata={"hnsw:space": "cosine"})
+
+        def checkpoint(done: int):
+            building["embedded_chunks"] = done
+            save_manifest(self.base_collection, manifest)
+            logger.info(f"Embedded {done} chunks into {building['collection']}")
+
+        # Chunks already upserted before a crash share their content ids, so they are skipped here
+        self._sync_collection(collection, chunks, checkpoint)
+        self._save_side_indexes(building["collection"], chunks)
+
+        # Atomic swap: one manifest write moves every reader to the new version
+        building.update({"document_sha256": document_sha256, "total_chunks": len(chunks)})
+        previous = active
+        manifest["active"] = building
+        manifest.pop("building", None)
+        save_manifest(self.base_collection, manifest)
+        self.vector_store.use_collection(building["collection"])
+        logger.info(f"Swapped in {building['collection']}")
+
+        # Before the first versioned build, queries were served by the unversioned base collection
+        previous_collection = previous["collection"] if previous else self.base_collection
+        if previous_collection != building["collection"]:
+            try:
+                client.delete_collection(previous_collection)
+            except Exception as e:
+                logger.info(f"Could not delete previous collection {previous_collection}: {e}")
+        return building
+
+
+def main():
+    from src.config import chroma_collection_name, chroma_host, chroma_port
+    from src.vector_search.vector_store import VectorStore
+    from src.vector_search.corpus import load_corpus_registry
+
+    parser = argparse.ArgumentParser(description="Ingest documents into a Chroma collection")
+    parser.add_argument("--document", nargs="+", default=[book_path])
+    parser.add_argument("--collection", default=chroma_collection_name)
+    parser.add_argument("--corpus", help="ingest a corpus from the registry (its sources into its collection); 'all' for every corpus")
+    parser.add_argument("--host", default=chroma_host)
+    parser.add_argument("--port", type=int, default=chroma_port)
+    parser.add_argument("--page-size", type=int, default=ingestion_page_size)
+    parser.add_argument("--embed-batch-size", type=int, default=ingestion_embed_batch_size)
+    parser.add_argument("--chunk-size", type=int, default=chunk_size)
+    parser.add_argument("--chunk-overlap", type=int, default=chunk_overlap)
+    parser.add_argument("--rebuild", action="store_true", help="build a fresh collection version even if nothing changed")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    if args.corpus:
+        corpora = load_corpus_registry()
+        jobs = [(c.name, c.document_paths()) for c in corpora.values() if args.corpus in ("all", c.name)]
+        if not jobs:
+            parser.error(f"unknown corpus {args.corpus!r}, registry has: {', '.join(corpora)}")
+    else:
+        jobs = [(args.collection, args.document)]
+
+    processor = DocumentProcessor(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+    vector_store = None
+    for collection, documents in jobs:
+        # Corpora share one embedder and embedding cache
+        vector_store = VectorStore(collection_name=collection, chroma_host=args.host, chroma_port=args.port,
+                                   embedder=vector_store.embedder if vector_store else None,
+                                   embedding_cache=vector_store.embedding_cache if vector_store else None)
+        pipeline = IngestionPipeline(vector_store, processor=processor, page_size=args.page_size,
+                                     embed_batch_size=args.embed_batch_size)
+        pipeline.run(documents, rebuild=args.rebuild)
+
+
+if __name__ == "__main__":
+    main()
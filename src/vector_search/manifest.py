@@ -0,0 +1,39 @@
+"""Ingestion manifest: which physical, versioned collection serves a logical collection name.
+
+The manifest records the chunker parameters and embedding model each collection
+version was built with. Swapping in a rebuilt version is a single atomic file
+replace, which every VectorStore picks up.
+"""
+import os
+import json
+from typing import Any, Dict, Optional
+
+from src.config import index_dir
+
+
+def manifest_path(base_collection: str) -> str:
+    return os.path.join(index_dir, f"{base_collection}.manifest.json")
+
+
+def load_manifest(base_collection: str) -> Dict[str, Any]:
+    path = manifest_path(base_collection)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(base_collection: str, manifest: Dict[str, Any]):
+    """Write the manifest atomically so readers never see a half-written file"""
+    path = manifest_path(base_collection)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def active_collection_name(base_collection: str) -> str:
+    """Physical collection currently serving queries; the base name itself before the first versioned build"""
+    active: Optional[Dict[str, Any]] = load_manifest(base_collection).get("active")
+    return active["collection"] if active else base_collection
@@ -0,0 +1,291 @@
+"""In-process exact vector index, a drop-in for the Chroma client and collection API used by VectorStore.
+
+Each collection is two files in the index directory: normalized float32 vectors in
+{name}.vectors.npy, memory-mapped for queries, and ids, documents and metadatas in
+{name}.records.json. A query is one matmul over the mapped array plus argpartition,
+and distances are reported as cosine distances like an "hnsw:space": "cosine" collection.
+
+Every write rewrites both files, so bulk loads should run inside collection.batch(),
+which keeps the writes in memory and persists them once when the block exits.
+"""
+import os
+import json
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.config import index_dir
+
+_COMPARISONS = {
+    "$eq": lambda value, target: value == target,
+    "$ne": lambda value, target: value != target,
+    "$gt": lambda value, target: value is not None and value > target,
+    "$gte": lambda value, target: value is not None and value >= target,
+    "$lt": lambda value, target: value is not None and value < target,
+    "$lte": lambda value, target: value is not None and value <= target,
+    "$in": lambda value, target: value in target,
+    "$nin": lambda value, target: value not in target,
+}
+
+
+def matches_where(metadata: Optional[Dict[str, Any]], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma metadata where clause against one record's metadata"""
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            if not all(_COMPARISONS[op](value, target) for op, target in condition.items()):
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def _normalize(embeddings) -> np.ndarray:
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class NumpyCollection:
+    """Chroma-compatible collection held in a memory-mapped .npy file"""
+
+    def __init__(self, name: str, directory: str):
+        self.name = name
+        self.directory = directory
+        self._vectors_path = os.path.join(directory, f"{name}.vectors.npy")
+        self._records_path = os.path.join(directory, f"{name}.records.json")
+        self._write_lock = threading.Lock()
+        self._batch_depth = 0
+        self._load()
+
+    def _records_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self._records_path)
+        except OSError:
+            return None
+
+    def _load(self):
+        self._loaded_mtime = self._records_mtime()
+        # Writes held in memory by batch() and not yet persisted
+        self._dirty = False
+        # Spare capacity for rows appended inside a batch, so each page doesn't copy the whole array
+        self._buffer = None
+        if os.path.exists(self._records_path):
+            with open(self._records_path, encoding="utf-8") as f:
+                records = json.load(f)
+            vectors = np.load(self._vectors_path, mmap_mode="r")
+        else:
+            records = {"ids": [], "documents": [], "metadatas": []}
+            vectors = np.zeros((0, 0), dtype=np.float32)
+        # Readers take one reference to this tuple, so a concurrent write never shows them half an update
+        self._state = (vectors, records, {id_: i for i, id_ in enumerate(records["ids"])})
+
+    def _save(self, vectors: np.ndarray, records: Dict[str, List]):
+        os.makedirs(self.directory, exist_ok=True)
+        # np.save appends .npy to names without it, so the temporary name keeps the suffix
+        tmp_vectors = f"{self._vectors_path[:-4]}.tmp.npy"
+        np.save(tmp_vectors, np.ascontiguousarray(vectors, dtype=np.float32))
+        tmp_records = f"{self._records_path}.tmp"
+        with open(tmp_records, "w", encoding="utf-8") as f:
+            json.dump(records, f)
+        os.replace(tmp_vectors, self._vectors_path)
+        os.replace(tmp_records, self._records_path)
+        self._load()
+
+    def _commit(self, vectors: np.ndarray, records: Dict[str, List]):
+        """Persist a write, or only publish it to readers of this process while a batch is open"""
+        if self._batch_depth:
+            self._state = (vectors, records, {id_: i for i, id_ in enumerate(records["ids"])})
+            self._dirty = True
+        else:
+            self._save(vectors, records)
+
+    @contextmanager
+    def batch(self):
+        """Hold writes in memory and persist them once when the outermost batch exits"""
+        with self._write_lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._write_lock:
+                self._batch_depth -= 1
+                if not self._batch_depth and self._dirty:
+                    vectors, records, _ = self._state
+                    self._save(vectors, records)
+
+    def _append_rows(self, vectors: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """vectors followed by rows, written into the spare capacity of a geometrically grown buffer"""
+        count, total = len(vectors), len(vectors) + len(rows)
+        buffer = self._buffer
+        if buffer is None or vectors.base is not buffer or total > len(buffer) or buffer.shape[1] != rows.shape[1]:
+            buffer = np.empty((max(2 * total, 1024), rows.shape[1]), dtype=np.float32)
+            if count:
+                buffer[:count] = vectors
+            self._buffer = buffer
+        # Readers hold buffer[:count], which the rows written past it leave untouched
+        buffer[count:total] = rows
+        return buffer[:total]
+
+    def _current(self):
+        """State to read from, reloaded when another process (e.g. the ingestion CLI) rewrote the files"""
+        if self._dirty:
+            return self._state
+        if self._records_mtime() != self._loaded_mtime:
+            with self._write_lock:
+                if self._records_mtime() != self._loaded_mtime:
+                    self._load()
+        return self._state
+
+    def _write(self, ids: Sequence[str], embeddings=None, documents=None, metadatas=None,
+               insert: bool = True, overwrite: bool = True):
+        self._current()
+        with self._write_lock:
+            vectors, records, positions = self._state
+            records = {key: list(values) for key, values in records.items()}
+            new_vectors = _normalize(embeddings) if embeddings is not None else None
+            appended, copied = [], False
+            for i, id_ in enumerate(ids):
+                position = positions.get(id_)
+                if position is None:
+                    if not insert:
+                        continue
+                    position = len(records["ids"])
+                    appended.append(i)
+                    records["ids"].append(id_)
+                    records["documents"].append(None)
+                    records["metadatas"].append(None)
+                elif not overwrite:
+                    continue
+                elif new_vectors is not None:
+                    if not copied:
+                        # Overwritten rows must not change under readers of the current state
+                        vectors, copied = np.array(vectors, dtype=np.float32), True
+                    vectors[position] = new_vectors[i]
+                if documents is not None:
+                    records["documents"][position] = documents[i]
+                if metadatas is not None:
+                    records["metadatas"][position] = metadatas[i]
+            if appended:
+                if new_vectors is None:
+                    raise ValueError("embeddings are required to add new records")
+                vectors = self._append_rows(vectors, new_vectors[appended])
+            self._commit(vectors, records)
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        self._write(ids, embeddings, documents, metadatas, overwrite=False)
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        self._write(ids, embeddings, documents, metadatas)
+
+    def update(self, ids, embeddings=None, documents=None, metadatas=None):
+        self._write(ids, embeddings, documents, metadatas, insert=False)
+
+    def delete(self, ids: Optional[Sequence[str]] = None, where: Optional[Dict] = None):
+        self._current()
+        with self._write_lock:
+            vectors, records, positions = self._state
+            doomed = {positions[id_] for id_ in ids or [] if id_ in positions}
+            if where:
+                doomed.update(i for i, metadata in enumerate(records["metadatas"]) if matches_where(metadata, where))
+            if not doomed:
+                return
+            keep = [i for i in range(len(records["ids"])) if i not in doomed]
+            self._commit(np.asarray(vectors)[keep],
+                         {key: [values[i] for i in keep] for key, values in records.items()})
+
+    def count(self) -> int:
+        return len(self._current()[1]["ids"])
+
+    def _selection(self, records: Dict[str, List], where: Optional[Dict]) -> Optional[np.ndarray]:
+        if not where:
+            return None
+        return np.fromiter((i for i, metadata in enumerate(records["metadatas"]) if matches_where(metadata, where)),
+                           dtype=np.int64)
+
+    def get(self, ids: Optional[Sequence[str]] = None, where: Optional[Dict] = None,
+            include: Sequence[str] = ("documents", "metadatas"), limit: Optional[int] = None) -> Dict[str, Any]:
+        vectors, records, positions = self._current()
+        if ids is not None:
+            selected = [positions[id_] for id_ in ids if id_ in positions]
+        else:
+            selection = self._selection(records, where)
+            selected = list(range(len(records["ids"]))) if selection is None else selection.tolist()
+        if ids is not None and where:
+            selected = [i for i in selected if matches_where(records["metadatas"][i], where)]
+        selected = selected[:limit] if limit is not None else selected
+        result = {"ids": [records["ids"][i] for i in selected]}
+        for key in ("documents", "metadatas"):
+            result[key] = [records[key][i] for i in selected] if key in include else None
+        result["embeddings"] = np.asarray(vectors)[selected].tolist() if "embeddings" in include else None
+        return result
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict] = None,
+              include: Sequence[str] = ("documents", "metadatas", "distances")) -> Dict[str, Any]:
+        """Exact cosine top-k for every query embedding"""
+        vectors, records, _ = self._current()
+        queries = _normalize(query_embeddings)
+        selection = self._selection(records, where)
+        candidates = vectors if selection is None else np.asarray(vectors)[selection]
+        k = min(n_results, len(candidates))
+
+        result = {key: [] for key in ("ids", "documents", "metadatas", "distances")}
+        if k == 0:
+            for key in result:
+                result[key] = [[] for _ in queries]
+        else:
+            similarities = queries @ np.asarray(candidates).T
+            # argpartition finds the top k in linear time, only those k are then sorted
+            top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+            for row, columns in zip(similarities, top):
+                columns = columns[np.argsort(-row[columns], kind="stable")]
+                positions = columns if selection is None else selection[columns]
+                result["ids"].append([records["ids"][i] for i in positions])
+                result["documents"].append([records["documents"][i] for i in positions])
+                result["metadatas"].append([records["metadatas"][i] for i in positions])
+                result["distances"].append((1.0 - row[columns]).tolist())
+        for key in ("documents", "metadatas", "distances"):
+            if key not in include:
+                result[key] = None
+        return result
+
+
+class NumpyClient:
+    """The subset of the Chroma client API used by VectorStore and the ingestion pipeline"""
+
+    def __init__(self, path: str = index_dir):
+        self.path = path
+        self._collections: Dict[str, NumpyCollection] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict] = None) -> NumpyCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = NumpyCollection(name, self.path)
+            return self._collections[name]
+
+    get_collection = get_or_create_collection
+
+    def delete_collection(self, name: str):
+        with self._lock:
+            self._collections.pop(name, None)
+            for suffix in (".vectors.npy", ".records.json"):
+                path = os.path.join(self.path, f"{name}{suffix}")
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def heartbeat(self) -> int:
+        return 0
@@ -0,0 +1,55 @@
+"""Inverted index from place name to the ids of the chunks that mention it, stored next to the collection."""
+import os
+import re
+import json
+import unicodedata
+from typing import Any, Dict, List
+
+from src.config import index_dir
+
+
+def place_index_path(collection_name: str) -> str:
+    return os.path.join(index_dir, f"{collection_name}.places.json")
+
+
+def place_key(place: str) -> str:
+    """Index key of a place name: accent- and case-folded, whitespace collapsed"""
+    folded = unicodedata.normalize("NFKD", place)
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", folded).strip().casefold()
+
+
+def _merge_keys(index: Dict[str, List[int]]) -> Dict[str, List[int]]:
+    merged: Dict[str, List[int]] = {}
+    for place, chunk_ids in index.items():
+        merged.setdefault(place_key(place), []).extend(chunk_ids)
+    return {key: sorted(set(chunk_ids)) for key, chunk_ids in merged.items()}
+
+
+def build_place_index(chunks: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """Map every place in the chunk metadata to the chunk ids mentioning it"""
+    index: Dict[str, List[int]] = {}
+    for chunk in chunks:
+        places = (chunk.get('metadata') or {}).get('places', "")
+        for place in filter(None, places.split("|")):
+            index.setdefault(place, []).append(chunk['chunk_id'])
+    return _merge_keys(index)
+
+
+def save_place_index(collection_name: str, index: Dict[str, List[int]]):
+    path = place_index_path(collection_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, path)
+
+
+def load_place_index(collection_name: str) -> Dict[str, List[int]]:
+    """Load the index for a collection, empty if ingestion hasn't written one yet"""
+    path = place_index_path(collection_name)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        # Indexes written before keys were normalised are folded on load
+        return _merge_keys(json.load(f))
@@ -0,0 +1,160 @@
+"""Optional cross-encoder re-ranking of retrieved chunks under a hard latency budget."""
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from src.config import reranker_model_name, reranker_batch_size, reranker_deadline_ms, reranker_cache_size
+from src.config import reranker_max_queued_batches
+from src.vector_search.embedding_cache import EmbeddingCache
+from src.utils.metrics import metrics
+
+
+class CrossEncoderReranker:
+    """Re-score (query, chunk) pairs with a small CPU cross-encoder, falling back to the dense order on timeout"""
+
+    def __init__(self, model_name: str = reranker_model_name, batch_size: int = reranker_batch_size,
+                 deadline_ms: float = reranker_deadline_ms, cache_size: int = reranker_cache_size,
+                 max_queued_batches: int = reranker_max_queued_batches, model=None):
+        if model is None:
+            from sentence_transformers import CrossEncoder
+            model = CrossEncoder(model_name, device="cpu")
+        self.model = model
+        self.batch_size = batch_size
+        self.deadline_ms = deadline_ms
+        self.cache_size = cache_size
+        self.max_queued_batches = max_queued_batches
+        self.hits = 0
+        self.misses = 0
+        self.timeouts = 0
+        self.skipped = 0
+        self.dropped_batches = 0
+        # Batches submitted to the scoring thread and not finished or cancelled yet
+        self._queued = 0
+        self._scores: "OrderedDict[tuple, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One worker: batches of one request run in order and don't compete with each other for cores
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+
+    @staticmethod
+    def _key(query: str, chunk: Dict) -> tuple:
+        return EmbeddingCache.normalize(query), hashlib.sha1(chunk.get('text', '').encode("utf-8")).hexdigest()
+
+    def warmup(self):
+        self.model.predict([("warmup", "warmup")])
+
+    def _cached(self, query: str, chunks: List[Dict]) -> List[Optional[float]]:
+        scores = []
+        with self._lock:
+            for chunk in chunks:
+                key = self._key(query, chunk)
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                scores.append(score)
+        return scores
+
+    def _score_batch(self, query: str, chunks: List[Dict], deadline: Optional[float] = None) -> Optional[List[float]]:
+        """Score one batch and remember it; None, without scoring, if its request's deadline passed while it queued"""
+        if deadline is not None and time.perf_counter() > deadline:
+            with self._lock:
+                self.dropped_batches += 1
+            return None
+        scores = [float(score) for score in self.model.predict([(query, chunk.get('text', '')) for chunk in chunks])]
+        with self._lock:
+            for chunk, score in zip(chunks, scores):
+                self._scores[self._key(query, chunk)] = score
+            while len(self._scores) > self.cache_size:
+                self._scores.popitem(last=False)
+        return scores
+
+    def _pending_batches(self, chunks: List[Dict], scores: List[Optional[float]]):
+        pending = [i for i, score in enumerate(scores) if score is None]
+        for start in range(0, len(pending), self.batch_size):
+            yield pending[start:start + self.batch_size]
+
+    @staticmethod
+    def _ordered(chunks: List[Dict], scores: List[float], k: int) -> List[Dict]:
+        order = sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True)[:k]
+        return [{**chunks[i], 'rerank_score': scores[i]} for i in order]
+
+    def rerank(self, query: str, chunks: List[Dict], k: int) -> List[Dict]:
+        """Best k chunks by cross-encoder score; the dense order if scoring overruns the deadline.
+
+        The deadline is checked between batches, so it can be exceeded by at most one batch.
+        """
+        deadline = time.perf_counter() + self.deadline_ms / 1000
+        scores = self._cached(query, chunks)
+        for batch in self._pending_batches(chunks, scores):
+            if time.perf_counter() > deadline:
+                self.timeouts += 1
+                return chunks[:k]
+            for i, score in zip(batch, self._score_batch(query, [chunks[i] for i in batch])):
+                scores[i] = score
+        return self._ordered(chunks, scores, k)
+
+    async def arerank(self, query: str, chunks: List[Dict], k: int) -> List[Dict]:
+        """Async rerank; the deadline is enforced exactly and the dense order returned when scoring is backed up.
+
+        A batch already running when the deadline passes still fills the score cache; batches not yet
+        started are cancelled, so an abandoned request doesn't hold the scoring thread for the next ones.
+        """
+        with metrics.timer("rerank"):
+            return await self._arerank(query, chunks, k)
+
+    def _submit(self, query: str, chunks: List[Dict], deadline: float) -> asyncio.Future:
+        with self._lock:
+            self._queued += 1
+        future = self._executor.submit(self._score_batch, query, chunks, deadline)
+        future.add_done_callback(self._batch_done)
+        # Cancelling the asyncio future cancels the executor's, unless the batch is already running
+        return asyncio.wrap_future(future)
+
+    def _batch_done(self, future):
+        with self._lock:
+            self._queued -= 1
+
+    async def _arerank(self, query: str, chunks: List[Dict], k: int) -> List[Dict]:
+        deadline = time.perf_counter() + self.deadline_ms / 1000
+        scores = self._cached(query, chunks)
+        for batch in self._pending_batches(chunks, scores):
+            if self._queued >= self.max_queued_batches:
+                # The batches ahead would use up the deadline anyway
+                self.skipped += 1
+                return chunks[:k]
+            future = self._submit(query, [chunks[i] for i in batch], deadline)
+            try:
+                batch_scores = await asyncio.wait_for(future, timeout=max(deadline - time.perf_counter(), 0))
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                return chunks[:k]
+            if batch_scores is None:
+                self.timeouts += 1
+                return chunks[:k]
+            for i, score in zip(batch, batch_scores):
+                scores[i] = score
+        return self._ordered(chunks, scores, k)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "timeouts": self.timeouts, "skipped": self.skipped,
+                "dropped_batches": self.dropped_batches, "queued": self._queued, "size": len(self._scores)}
+
+
+_shared_reranker: Optional[CrossEncoderReranker] = None
+_shared_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> CrossEncoderReranker:
+    """Return the process-wide reranker, loading the model on first use"""
+    global _shared_reranker
+    if _shared_reranker is None:
+        with _shared_reranker_lock:
+            if _shared_reranker is None:
+                _shared_reranker = CrossEncoderReranker()
+    return _shared_reranker
@@ -1,23 +1,42 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any
+import numpy as np
+from typing import List, Dict, Any, Optional
 import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Load configuration variables
-from src.config import embedding_model_name
+from src.config import embedding_model_name, chroma_collection_name, chroma_host, chroma_port, embedding_max_workers
+from src.config import embedding_cache_size, embedding_cache_ttl, embedding_cache_path
+from src.config import embedding_batch_max_size, embedding_batch_wait_ms, vector_backend, index_dir
+from src.config import hybrid_search_enabled, hybrid_candidates, rrf_k, rrf_dense_weight, rrf_sparse_weight
+from src.vector_search.embedding_cache import EmbeddingCache
+from src.vector_search.embedders import load_embedder
+from src.vector_search.batcher import EmbeddingBatcher
+from src.vector_search.place_index import load_place_index, place_key
+from src.vector_search.manifest import active_collection_name, manifest_path
+from src.vector_search.numpy_index import NumpyClient
+from src.vector_search.bm25_index import BM25Index, load_bm25_index
+from src.utils.metrics import metrics
 
 class VectorStore:
-    def __init__(self, collection_name=None, chroma_host=None, chroma_port=None, use_docker=True):
+    def __init__(self, collection_name=None, chroma_host=None, chroma_port=None, use_docker=True, embedder=None, embedding_cache=None,
+                 backend=vector_backend):
         # Get configuration from environment variables or use defaults
-        self.collection_name = collection_name
+        # collection_name is the logical name; the manifest maps it to the versioned collection serving queries
+        self.base_collection_name = collection_name
+        self.collection_name = active_collection_name(collection_name)
         self.chroma_host = chroma_host 
         self.chroma_port = chroma_port
+        self.use_docker = use_docker
+        self.backend = backend
         
-        if use_docker:
+        if backend == "numpy":
+            # In-process exact index, no HTTP hop per query
+            self.client = NumpyClient(index_dir)
+        elif use_docker:
+            import chromadb
             # Use HTTP client to connect to Dockerized ChromaDB
             self.client = chromadb.HttpClient(
                 host=self.chroma_host,
@@ -25,6 +44,7 @@ class VectorStore:
             )
         else:
             # Fallback to persistent client for local development
+            import chromadb
             chroma_db_path = os.getenv("CHROMA_DB_PATH", "./chroma_db")
             self.client = chromadb.PersistentClient(path=chroma_db_path)
         
@@ -32,14 +52,87 @@ class VectorStore:
             name=self.collection_name,
             metadata={"hnsw:space": "cosine"}
         )
-        self.embedder = SentenceTransformer(embedding_model_name)
+        # The embedder can be shared between stores so the model is only loaded once per process
+        # The backend (torch or ONNX Runtime) follows embedding_backend in src/config.py
+        self.embedder = embedder if embedder is not None else load_embedder()
+        if embedding_cache is None:
+            embedding_cache = EmbeddingCache(
+                max_size=embedding_cache_size,
+                ttl_seconds=embedding_cache_ttl,
+                persist_path=embedding_cache_path,
+                namespace=getattr(self.embedder, "cache_namespace", embedding_model_name),
+            )
+        self.embedding_cache = embedding_cache
+
+        # Async path: embedding runs in a bounded pool, Chroma is queried through its async client
+        self._executor = ThreadPoolExecutor(max_workers=embedding_max_workers, thread_name_prefix="embedder")
+        self.batcher = EmbeddingBatcher(
+            self.embedder.encode,
+            executor=self._executor,
+            max_batch_size=embedding_batch_max_size,
+            max_wait_ms=embedding_batch_wait_ms,
+        )
+        self._async_collection = None
+        self._async_collection_lock = asyncio.Lock()
+        self._place_index = None
+        self._bm25_index = None
+        self._manifest_checked_at = time.monotonic()
+        self._manifest_mtime = self._read_manifest_mtime()
+    
+    def _read_manifest_mtime(self):
+        try:
+            return os.path.getmtime(manifest_path(self.base_collection_name))
+        except OSError:
+            return None
+
+    def use_collection(self, collection_name: str):
+        """Switch queries to another physical collection, e.g. after a rebuilt version was swapped in"""
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name,
+            metadata={"hnsw:space": "cosine"}
+        )
+        self.collection_name = collection_name
+        self._async_collection = None
+        self.reload_indexes()
+
+    def refresh_active_collection(self, min_interval: float = 30.0):
+        """Follow a collection swap made by another process, checking the manifest at most every min_interval seconds"""
+        now = time.monotonic()
+        if now - self._manifest_checked_at < min_interval:
+            return
+        self._manifest_checked_at = now
+        self._follow_manifest()
+
+    async def arefresh_active_collection(self, min_interval: float = 30.0):
+        """Async version of refresh_active_collection: the manifest read and the switch run off the event loop"""
+        now = time.monotonic()
+        if now - self._manifest_checked_at < min_interval:
+            return
+        # Claimed before the thread hop so concurrent requests don't all re-check
+        self._manifest_checked_at = now
+        await asyncio.to_thread(self._follow_manifest)
+
+    def _follow_manifest(self):
+        """Switch to the active collection if the manifest changed; use_collection is a client round trip"""
+        mtime = self._read_manifest_mtime()
+        if mtime == self._manifest_mtime:
+            return
+        self._manifest_mtime = mtime
+        active = active_collection_name(self.base_collection_name)
+        if active != self.collection_name:
+            self.use_collection(active)
+
+    def warmup(self):
+        """Run one encode and one collection round trip so the first user query doesn't pay for them"""
+        self.embedder.encode(["warmup"])
+        self.collection.count()
     
     def add_documents(self, chunks: List[Dict[str, Any]]):
         """Add book chunks to vector store"""
         texts = [chunk['text'] for chunk in chunks]
         embeddings = self.embedder.encode(texts).tolist()
         
-        ids = [f"chunk_{chunk['chunk_id']}" for chunk in chunks]
+        ids = [self._chunk_id(chunk) for chunk in chunks]
         metadatas = [chunk['metadata'] for chunk in chunks]
         
         self.collection.add(
@@ -49,17 +142,202 @@ class VectorStore:
             ids=ids
         )
     
-    def search(self, query: str, n_results: int = 5) -> List[Dict]:
-        """Search for relevant passages"""
-        query_embedding = self.embedder.encode([query]).tolist()
+    @property
+    def place_index(self) -> Dict[str, List[int]]:
+        """Place name -> ids of the chunks mentioning it, built at ingestion time"""
+        if self._place_index is None:
+            self._place_index = load_place_index(self.collection_name)
+        return self._place_index
+
+    @property
+    def bm25_index(self) -> Optional[BM25Index]:
+        """Sparse index over the same chunks, None until ingestion has built one"""
+        if self._bm25_index is None:
+            self._bm25_index = load_bm25_index(self.collection_name)
+        return self._bm25_index
+
+    def reload_indexes(self):
+        """Drop cached side indexes so the next access reads what ingestion just wrote"""
+        self._place_index = None
+        self._bm25_index = None
+
+    def where_filter(self, chapter: Optional[int] = None, place: Optional[str] = None) -> Optional[Dict]:
+        """Build a Chroma where clause restricting a search to a chapter and/or chunks mentioning a place"""
+        clauses = []
+        if chapter is not None:
+            clauses.append({"chapter": chapter})
+        if place is not None:
+            # An empty $in (a place the book never mentions) is answered by search() without a query
+            clauses.append({"chunk_id": {"$in": self.place_index.get(place_key(place), [])}})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    @staticmethod
+    def _matches_nothing(where: Optional[Dict]) -> bool:
+        """Whether a where clause contains an empty $in, which Chroma rejects and which can match no chunk"""
+        if not where:
+            return False
+        clauses = where.get("$and", [where])
+        return any(isinstance(condition, dict) and condition.get("$in") == []
+                   for clause in clauses for condition in clause.values())
+
+    def embed_query(self, query: str) -> List[List[float]]:
+        """Encode a single query into the embedding format expected by Chroma"""
+        embedding = self.embedding_cache.get(query)
+        if embedding is None:
+            with metrics.timer("embedding"):
+                embedding = self.embedder.encode([query])[0].tolist()
+            self.embedding_cache.put(query, embedding)
+        return [embedding]
+    
+    @staticmethod
+    def _chunk_id(chunk: Dict[str, Any]) -> str:
+        # Content-hash id from the DocumentProcessor, positional id for chunks built elsewhere
+        return chunk.get('id') or f"chunk_{chunk['chunk_id']}"
+
+    def upsert_documents(self, chunks: List[Dict[str, Any]], embeddings: Optional[List[List[float]]] = None):
+        """Insert or overwrite book chunks, so a repeated page after a crash is harmless"""
+        texts = [chunk['text'] for chunk in chunks]
+        if embeddings is None:
+            embeddings = self.embedder.encode(texts).tolist()
         
-        results = self.collection.query(
+        self.collection.upsert(
+            embeddings=embeddings,
+            documents=texts,
+            metadatas=[chunk['metadata'] for chunk in chunks],
+            ids=[self._chunk_id(chunk) for chunk in chunks]
+        )
+    
+    def search(self, query: str, n_results: int = 5, where: Optional[Dict] = None) -> List[Dict]:
+        """Search for relevant passages, optionally filtered with a where clause (see where_filter)"""
+        if self._matches_nothing(where):
+            return []
+        self.refresh_active_collection()
+        query_embedding = self.embed_query(query)
+        bm25_index = self.bm25_index if hybrid_search_enabled else None
+        
+        with metrics.timer("vector_query"):
+            results = self.collection.query(**self._query_kwargs(query_embedding, n_results, where, bm25_index))
+        if bm25_index is None:
+            return self._format_results(results)
+        
+        with metrics.timer("sparse_query"):
+            sparse = bm25_index.search(query, hybrid_candidates)
+        missing = self._sparse_only_ids(results, sparse)
+        with metrics.timer("vector_get"):
+            fetched = self.collection.get(ids=missing, where=where, include=['documents', 'metadatas', 'embeddings']) if missing else None
+        return self._fuse(query_embedding, results, sparse, fetched, n_results)
+    
+    @staticmethod
+    def _query_kwargs(query_embedding, n_results: int, where: Optional[Dict], bm25_index) -> Dict[str, Any]:
+        return dict(
             query_embeddings=query_embedding,
-            n_results=n_results,
+            # Hybrid search fuses a deeper dense candidate list with the BM25 hits
+            n_results=max(n_results, hybrid_candidates) if bm25_index is not None else n_results,
+            where=where,
             include=['documents', 'metadatas', 'distances']
         )
+    
+    @staticmethod
+    def _sparse_only_ids(dense, sparse: List) -> List[str]:
+        dense_ids = set(dense['ids'][0])
+        return [id_ for id_, _ in sparse if id_ not in dense_ids]
+    
+    def _fuse(self, query_embedding, dense, sparse: List, fetched: Optional[Dict], n_results: int) -> List[Dict]:
+        """Weighted reciprocal rank fusion of the dense hits and the BM25 hits that pass the where clause"""
+        candidates, scores = {}, {}
+        for rank, (id_, hit) in enumerate(zip(dense['ids'][0], self._format_results(dense))):
+            candidates[id_] = hit
+            scores[id_] = rrf_dense_weight / (rrf_k + rank + 1)
+        if fetched:
+            # BM25-only hits get a real cosine similarity too, so callers can keep ranking and thresholding on it
+            query_vector = np.asarray(query_embedding[0], dtype=np.float32)
+            query_vector /= np.linalg.norm(query_vector)
+            for id_, text, metadata, embedding in zip(fetched['ids'], fetched['documents'], fetched['metadatas'], fetched['embeddings']):
+                embedding = np.asarray(embedding, dtype=np.float32)
+                candidates[id_] = {
+                    'text': text,
+                    'metadata': metadata,
+                    'similarity': float(embedding @ query_vector / np.linalg.norm(embedding)),
+                }
+        rank = 0
+        for id_, _ in sparse:
+            if id_ not in candidates:
+                # Excluded by the where clause
+                continue
+            scores[id_] = scores.get(id_, 0.0) + rrf_sparse_weight / (rrf_k + rank + 1)
+            rank += 1
+        best = sorted(scores, key=scores.get, reverse=True)[:n_results]
+        return [{**candidates[id_], 'score': scores[id_]} for id_ in best]
+    
+    async def aembed_query(self, query: str) -> List[List[float]]:
+        """Encode a query in the embedding pool without blocking the event loop"""
+        # Memory hits are answered inline; the SQLite layer and misses pay a thread hop
+        cache = self.embedding_cache
+        if cache.persistent:
+            embedding = cache.get_memory(query)
+            if embedding is None:
+                embedding = await asyncio.to_thread(cache.get, query)
+        else:
+            embedding = cache.get(query)
+        if embedding is not None:
+            return [embedding]
+        # Misses from concurrent requests are encoded together by the micro-batcher
+        with metrics.timer("embedding"):
+            embedding = await self.batcher.encode(query)
+        if cache.persistent:
+            await asyncio.to_thread(cache.put, query, embedding)
+        else:
+            cache.put(query, embedding)
+        return [embedding]
+    
+    async def _get_async_collection(self):
+        """Lazily connect the async Chroma client on first use"""
+        if self._async_collection is None:
+            async with self._async_collection_lock:
+                if self._async_collection is None:
+                    import chromadb
+                    client = await chromadb.AsyncHttpClient(host=self.chroma_host, port=self.chroma_port)
+                    self._async_collection = await client.get_or_create_collection(
+                        name=self.collection_name,
+                        metadata={"hnsw:space": "cosine"}
+                    )
+        return self._async_collection
+    
+    async def _acollection_call(self, method: str, **kwargs):
+        """Call a collection method from async code with whatever the backend offers"""
+        if self.backend == "numpy":
+            # A single matmul over the mapped vectors, cheaper than an executor hop
+            return getattr(self.collection, method)(**kwargs)
+        if self.use_docker:
+            collection = await self._get_async_collection()
+            return await getattr(collection, method)(**kwargs)
+        # The local persistent client has no async counterpart
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: getattr(self.collection, method)(**kwargs))
+    
+    async def asearch(self, query: str, n_results: int = 5, where: Optional[Dict] = None) -> List[Dict]:
+        """Async version of search for use inside graph nodes"""
+        if self._matches_nothing(where):
+            return []
+        await self.arefresh_active_collection()
+        query_embedding = await self.aembed_query(query)
+        bm25_index = self.bm25_index if hybrid_search_enabled else None
+        
+        with metrics.timer("vector_query"):
+            results = await self._acollection_call('query', **self._query_kwargs(query_embedding, n_results, where, bm25_index))
+        if bm25_index is None:
+            return self._format_results(results)
         
-        return self._format_results(results)
+        with metrics.timer("sparse_query"):
+            sparse = bm25_index.search(query, hybrid_candidates)
+        missing = self._sparse_only_ids(results, sparse)
+        fetched = None
+        if missing:
+            with metrics.timer("vector_get"):
+                fetched = await self._acollection_call('get', ids=missing, where=where, include=['documents', 'metadatas', 'embeddings'])
+        return self._fuse(query_embedding, results, sparse, fetched, n_results)
     
     def _format_results(self, results):
         """Format ChromaDB results"""
@@ -70,4 +348,30 @@ class VectorStore:
                 'metadata': results['metadatas'][0][i],
                 'similarity': 1 - results['distances'][0][i]  # Convert distance to similarity
             })
-        return formatted
\ No newline at end of file
+        return formatted
+
+
+# Process-wide store shared by the API, the agent tools and the ingestion path
+_shared_vector_store: Optional[VectorStore] = None
+_shared_vector_store_lock = threading.Lock()
+
+
+def get_vector_store() -> VectorStore:
+    """Return the process-wide VectorStore, creating it from config on first use"""
+    global _shared_vector_store
+    if _shared_vector_store is None:
+        with _shared_vector_store_lock:
+            if _shared_vector_store is None:
+                _shared_vector_store = VectorStore(
+                    collection_name=chroma_collection_name,
+                    chroma_host=chroma_host,
+                    chroma_port=chroma_port,
+                )
+    return _shared_vector_store
+
+
+def set_vector_store(vector_store: Optional[VectorStore]):
+    """Register an already constructed VectorStore as the process-wide instance"""
+    global _shared_vector_store
+    with _shared_vector_store_lock:
+        _shared_vector_store = vector_store
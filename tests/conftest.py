@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the project root importable, as the benchmarks do
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
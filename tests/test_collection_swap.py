@@ -0,0 +1,66 @@
+import asyncio
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from src.vector_search import bm25_index, manifest, numpy_index, place_index, vector_store
+from src.vector_search.manifest import active_collection_name
+from src.vector_search.vector_store import VectorStore
+
+
+class StubEmbedder:
+    def encode(self, texts, **kwargs):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+@pytest.fixture
+def index_dir(tmp_path, monkeypatch):
+    for module in (vector_store, place_index, manifest, bm25_index, numpy_index):
+        monkeypatch.setattr(module, "index_dir", str(tmp_path), raising=False)
+    return tmp_path
+
+
+def test_first_versioned_build_deletes_the_unversioned_collection(index_dir, tmp_path):
+    pytest.importorskip("langchain_text_splitters")
+    from src.vector_search.ingestion import IngestionPipeline
+
+    store = VectorStore(collection_name="book", backend="numpy", embedder=StubEmbedder())
+    store.collection.upsert(ids=["legacy"], embeddings=[[1.0, 0.0, 0.0, 0.0]], documents=["old"], metadatas=[{}])
+    document = tmp_path / "doc.txt"
+    document.write_text("CHAPTER I.\n\nWe sailed from New York to Paris and then on to Rome.\n" * 20)
+
+    IngestionPipeline(store).run(str(document))
+
+    assert active_collection_name("book") == "book_v1"
+    assert store.collection_name == "book_v1"
+    assert not os.path.exists(index_dir / "book.records.json")
+
+
+def test_async_refresh_switches_collection_off_the_event_loop(index_dir, monkeypatch):
+    store = VectorStore(collection_name="book", backend="numpy", embedder=StubEmbedder())
+    manifest.save_manifest("book", {"active": {"collection": "book_v2"}})
+    switched_on = []
+    use_collection = store.use_collection
+    monkeypatch.setattr(store, "use_collection",
+                        lambda name: (switched_on.append(threading.current_thread()), use_collection(name)))
+
+    asyncio.run(store.arefresh_active_collection(min_interval=0))
+
+    assert store.collection_name == "book_v2"
+    assert switched_on and switched_on[0] is not threading.main_thread()
+
+
+def test_rerun_on_unchanged_documents_skips_chunking(index_dir, tmp_path, monkeypatch):
+    pytest.importorskip("langchain_text_splitters")
+    from src.vector_search.ingestion import IngestionPipeline
+
+    store = VectorStore(collection_name="book", backend="numpy", embedder=StubEmbedder())
+    document = tmp_path / "doc.txt"
+    document.write_text("CHAPTER I.\n\nWe sailed from New York to Paris and then on to Rome.\n" * 20)
+    pipeline = IngestionPipeline(store)
+    pipeline.run(str(document))
+
+    monkeypatch.setattr(pipeline, "load_chunks", lambda paths: pytest.fail("chunked an up-to-date collection"))
+    assert pipeline.run(str(document))["collection"] == "book_v1"
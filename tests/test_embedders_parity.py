@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+pytest.importorskip("sentence_transformers")
+
+from src.config import embedding_onnx_dir
+from src.vector_search.embedders import load_embedder
+
+TEXTS = [
+    "What's the weather like in Paris?",
+    "What did Mark Twain write about Venice?",
+    "How did the pilgrims behave in Jerusalem?",
+    "Tell me about the voyage of the Quaker City",
+    "Is it raining in Naples right now?",
+    "What did Twain think of the Sphinx?",
+    "The ship lay at anchor in the harbour of Gibraltar for two days while we explored the rock.",
+    "We rode donkeys through the narrow streets of Tangier and bargained with the merchants.",
+    "hi",
+    "Constantinople, the mosque of St. Sophia, and the dogs of the city",
+]
+
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory):
+    if os.path.exists(os.path.join(embedding_onnx_dir, "embedder.json")):
+        return embedding_onnx_dir
+    # No exported artifacts: build them once for this run, which needs torch
+    pytest.importorskip("torch")
+    from src.vector_search.embedders import export_onnx
+    output_dir = str(tmp_path_factory.mktemp("onnx"))
+    try:
+        export_onnx(output_dir=output_dir)
+    except OSError as e:
+        pytest.skip(f"could not export the model: {e}")
+    return output_dir
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return load_embedder("torch").encode(TEXTS, batch_size=4)
+
+
+@pytest.mark.parametrize("backend, min_cosine", [("onnx", 0.999), ("onnx-int8", 0.99)])
+def test_onnx_embeddings_match_sentence_transformer(model_dir, reference, backend, min_cosine):
+    embeddings = load_embedder(backend, model_dir=model_dir).encode(TEXTS, batch_size=4)
+    assert embeddings.shape == reference.shape
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0, atol=1e-4)
+    cosines = (embeddings * reference).sum(axis=1)
+    assert cosines.mean() >= min_cosine, f"{backend} mean cosine {cosines.mean():.5f}"
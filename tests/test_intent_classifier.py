@@ -0,0 +1,104 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.agent.intent_classifier import INTENT_LABELS, RULE_CONFIDENCE, IntentClassifier
+from src.config import intent_confidence_threshold
+
+
+@pytest.fixture
+def classifier():
+    return IntentClassifier()
+
+
+@pytest.mark.parametrize("query", [
+    "write a poem about the rain",
+    "how many degrees is a right angle",
+    "wind instruments",
+    "Convert 30 degrees Celsius to Fahrenheit",
+    "hey, explain quantum physics",
+    "Who built the pyramids?",
+])
+def test_bare_keyword_hits_are_left_to_the_llm(classifier, query):
+    _, confidence = classifier.classify_rules(query)
+    assert confidence < intent_confidence_threshold
+
+
+@pytest.mark.parametrize("query, intent", [
+    ("What's the weather like in Paris?", "weather"),
+    ("Is it raining in London right now?", "weather"),
+    ("What did Mark Twain think about the Sphynx?", "book"),
+    ("What's the weather today in the cities Mark Twain wrote about in Greece?", "combined"),
+    ("Hi, how are you?", "chitchat"),
+])
+def test_grounded_queries_are_decided_locally(classifier, query, intent):
+    label, confidence = classifier.classify_rules(query)
+    assert label == intent and confidence >= intent_confidence_threshold
+
+
+def test_gazetteer_lookup_grounds_a_weather_keyword():
+    classifier = IntentClassifier(has_location=lambda query: "lisbon" in query.lower())
+    label, confidence = classifier.classify_rules("lisbon temperature")
+    assert label == "weather" and confidence >= intent_confidence_threshold
+
+
+class OneHotEncoder:
+    """Encodes the prototypes of the i-th intent as the i-th unit vector"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, texts):
+        vectors = np.zeros((len(texts), len(INTENT_LABELS)), dtype=np.float32)
+        vectors[:, self.calls] = 1.0
+        self.calls += 1
+        return vectors
+
+
+def unit(label):
+    vector = np.full(len(INTENT_LABELS), 0.01, dtype=np.float32)
+    vector[INTENT_LABELS.index(label)] = 1.0
+    return vector
+
+
+@pytest.fixture
+def embedding_classifier():
+    return IntentClassifier(encode_fn=OneHotEncoder(), has_location=lambda query: "lisbon" in query.lower())
+
+
+@pytest.mark.parametrize("label", ["weather", "combined"])
+def test_ungrounded_weather_centroid_is_capped(embedding_classifier, label):
+    assert embedding_classifier.classify_embedding(unit(label), "rainy days") == (label, RULE_CONFIDENCE["weather_keyword"])
+
+
+def test_grounded_weather_centroid_is_confident(embedding_classifier):
+    label, confidence = embedding_classifier.classify_embedding(unit("weather"), "umbrella in Lisbon tomorrow?")
+    assert label == "weather" and confidence >= intent_confidence_threshold
+    assert embedding_classifier.classify_embedding(unit("book"), "rainy days")[1] >= intent_confidence_threshold
+
+
+class WeatherVectorStore:
+    """Embeds every query next to the weather centroid"""
+
+    async def aembed_query(self, query):
+        return [unit("weather").tolist()]
+
+
+@pytest.mark.parametrize("query, path", [
+    ("umbrella in Lisbon tomorrow?", "embedding"),
+    ("umbrella tomorrow?", "llm"),
+])
+def test_oracle_node_embedding_path(embedding_classifier, query, path):
+    pytest.importorskip("langgraph")
+    from benchmarks.fakes import FakeChatModel
+    from src.agent.prompts import Prompts
+    from src.agent.travel_agent import TravelChatbotGraph
+
+    graph = TravelChatbotGraph(llm=FakeChatModel(first_token_latency=0, token_latency=0), prompts=Prompts(),
+                               intent_classifier=embedding_classifier)
+    graph.vector_store = WeatherVectorStore()
+    result = asyncio.run(graph.oracle_node({"query": query, "chat_history": []}))
+
+    assert embedding_classifier.path_counts == {path: 1}
+    assert result["intent"] == ("weather" if path == "embedding" else "irrelevant")
@@ -0,0 +1,30 @@
+import pytest
+
+from src.utils.location_extractor import LocationExtractor
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    return LocationExtractor.from_gazetteer()
+
+
+@pytest.mark.parametrize("query, city", [
+    ("weather in paris, texas", "Paris"),
+    ("Naples, Florida", "Naples"),
+    ("Cairo, Illinois", "Cairo"),
+    ("London, Canada", "London"),
+])
+def test_unknown_qualifier_falls_back_to_the_llm(extractor, query, city):
+    locations, ambiguous = extractor.extract(query)
+    assert ambiguous
+    assert locations == [city]
+
+
+@pytest.mark.parametrize("query, locations", [
+    ("Paris, France", ["Paris"]),
+    ("What's the weather in London, UK?", ["London"]),
+    ("Paris, Rome and Naples", ["Paris", "Rome", "Naples"]),
+    ("weather in Rome, please", ["Rome"]),
+])
+def test_own_country_and_lists_stay_confident(extractor, query, locations):
+    assert extractor.extract(query) == (locations, False)
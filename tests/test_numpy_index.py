@@ -0,0 +1,47 @@
+import numpy as np
+
+from src.vector_search.numpy_index import NumpyCollection
+
+
+def page(start, size, dim=8):
+    ids = [f"chunk_{i}" for i in range(start, start + size)]
+    rng = np.random.default_rng(start)
+    return ids, rng.normal(size=(size, dim)).tolist()
+
+
+def test_batch_persists_once_at_exit(tmp_path, monkeypatch):
+    collection = NumpyCollection("book", str(tmp_path))
+    saves = []
+    save = collection._save
+    monkeypatch.setattr(collection, "_save", lambda *args: (saves.append(1), save(*args)))
+
+    with collection.batch():
+        for start in range(0, 100, 10):
+            ids, embeddings = page(start, 10)
+            collection.upsert(ids=ids, embeddings=embeddings, documents=ids, metadatas=[{"n": 1}] * 10)
+        # Readers in this process already see the buffered pages
+        assert collection.count() == 100
+        assert not (tmp_path / "book.records.json").exists()
+
+    assert len(saves) == 1
+    reopened = NumpyCollection("book", str(tmp_path))
+    assert reopened.count() == 100
+    ids, embeddings = page(40, 10)
+    hit = reopened.query(query_embeddings=[embeddings[3]], n_results=1)
+    assert hit["ids"] == [["chunk_43"]]
+
+
+def test_batched_appends_leave_earlier_reads_unchanged(tmp_path):
+    collection = NumpyCollection("book", str(tmp_path))
+    with collection.batch():
+        ids, embeddings = page(0, 5)
+        collection.upsert(ids=ids, embeddings=embeddings)
+        before = collection.get(include=["embeddings"])
+        ids, embeddings = page(5, 5)
+        collection.upsert(ids=ids, embeddings=embeddings)
+        ids, embeddings = page(100, 1)
+        collection.upsert(ids=["chunk_0"], embeddings=embeddings)
+        assert collection.get(ids=["chunk_1"], include=["embeddings"])["embeddings"] == before["embeddings"][1:2]
+    assert collection.count() == 10
+    assert np.allclose(collection.get(ids=["chunk_0"], include=["embeddings"])["embeddings"][0],
+                       np.asarray(embeddings[0]) / np.linalg.norm(embeddings[0]), atol=1e-6)
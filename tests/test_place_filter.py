@@ -0,0 +1,34 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.vector_search import manifest, place_index, vector_store
+from src.vector_search.place_index import build_place_index, save_place_index
+from src.vector_search.vector_store import VectorStore
+
+
+class StubEmbedder:
+    def encode(self, texts, **kwargs):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    for module in (vector_store, place_index, manifest):
+        monkeypatch.setattr(module, "index_dir", str(tmp_path), raising=False)
+    save_place_index("book", build_place_index([
+        {"chunk_id": 0, "metadata": {"places": "Paris|Rome"}},
+        {"chunk_id": 1, "metadata": {"places": "Paris"}},
+    ]))
+    return VectorStore(collection_name="book", backend="numpy", embedder=StubEmbedder())
+
+
+def test_place_lookup_ignores_case(store):
+    assert store.where_filter(place="paris") == {"chunk_id": {"$in": [0, 1]}}
+
+
+def test_unknown_place_returns_no_passages(store):
+    where = store.where_filter(place="Atlantis", chapter=3)
+    assert store.search("anything", where=where) == []
+    assert asyncio.run(store.asearch("anything", where=where)) == []
@@ -0,0 +1,9 @@
+from src.agent.prompts import Prompts
+
+
+def test_latest_version_is_picked_numerically(monkeypatch):
+    templates = {name: dict(variants) for name, variants in Prompts.TEMPLATES.items()}
+    oracle = templates["oracle"]["v1"]
+    templates["oracle"].update({"v2": oracle, "v10": oracle})
+    monkeypatch.setattr(Prompts, "TEMPLATES", templates)
+    assert Prompts().versions["oracle"] == "v10"
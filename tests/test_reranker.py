@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import time
+
+from src.vector_search.reranker import CrossEncoderReranker
+
+
+class SlowCrossEncoder:
+    """Scores by text length, taking a fixed time per batch"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.batches = 0
+        self._lock = threading.Lock()
+
+    def predict(self, pairs):
+        with self._lock:
+            self.batches += 1
+        time.sleep(self.latency)
+        return [len(text) for _, text in pairs]
+
+
+def chunks(n, prefix="chunk"):
+    return [{'text': f"{prefix} {'x' * i}", 'similarity': 1.0 - i / 100} for i in range(n)]
+
+
+def test_reranks_within_the_deadline():
+    reranker = CrossEncoderReranker(model=SlowCrossEncoder(0.0), batch_size=4, deadline_ms=1000)
+    ranked = asyncio.run(reranker.arerank("query", chunks(6), k=2))
+    assert [chunk['text'] for chunk in ranked] == [chunks(6)[5]['text'], chunks(6)[4]['text']]
+    assert ranked[0]['rerank_score'] > ranked[1]['rerank_score']
+
+
+def test_abandoned_requests_do_not_leave_batches_queued():
+    model = SlowCrossEncoder(0.1)
+    reranker = CrossEncoderReranker(model=model, batch_size=2, deadline_ms=30, max_queued_batches=100)
+
+    async def burst():
+        return await asyncio.gather(*(reranker.arerank(f"query {i}", chunks(6, prefix=str(i)), k=3)
+                                      for i in range(8)))
+
+    started = time.perf_counter()
+    results = asyncio.run(burst())
+    assert time.perf_counter() - started < 0.5
+    # Every request fell back to its dense order
+    assert all(result == chunks(6, prefix=str(i))[:3] for i, result in enumerate(results))
+    reranker._executor.shutdown(wait=True)
+    # Only the batch that was already running when the deadlines passed got scored
+    assert model.batches == 1
+    assert reranker.stats()["queued"] == 0
+
+
+def test_skips_reranking_when_the_queue_is_backed_up():
+    model = SlowCrossEncoder(0.2)
+    reranker = CrossEncoderReranker(model=model, batch_size=2, deadline_ms=1000, max_queued_batches=1)
+
+    async def two_requests():
+        first = asyncio.create_task(reranker.arerank("first", chunks(2), k=2))
+        await asyncio.sleep(0.05)
+        second = await reranker.arerank("second", chunks(2, prefix="b"), k=2)
+        return await first, second
+
+    first, second = asyncio.run(two_requests())
+    assert 'rerank_score' in first[0]
+    assert second == chunks(2, prefix="b")
+    assert reranker.stats()["skipped"] == 1
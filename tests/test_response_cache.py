@@ -0,0 +1,14 @@
+from src.agent.response_cache import SemanticResponseCache
+
+
+def test_entries_with_different_keys_are_not_shared():
+    cache = SemanticResponseCache({"weather": 600})
+    cache.store([1.0, 0.0], "weather", "Sunny in Rome", key=("rome",))
+    assert cache.lookup([1.0, 0.0], "weather", key=("paris",)) is None
+    assert cache.lookup([1.0, 0.0], "weather", key=("rome",)) == "Sunny in Rome"
+
+
+def test_expired_weather_is_not_stored():
+    cache = SemanticResponseCache({"weather": 600})
+    cache.store([1.0, 0.0], "weather", "Sunny in Rome", key=("rome",), ttl=-1)
+    assert cache.lookup([1.0, 0.0], "weather", key=("rome",)) is None
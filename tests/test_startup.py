@@ -0,0 +1,26 @@
+import logging
+import time
+
+from fastapi.testclient import TestClient
+
+import app as app_module
+
+
+def test_failed_startup_is_logged_without_a_probe(monkeypatch, caplog):
+    async def initialize():
+        raise RuntimeError("vector index unreachable")
+
+    closed = []
+
+    async def close_clients():
+        closed.append(True)
+
+    monkeypatch.setattr(app_module, "initialize", initialize)
+    monkeypatch.setattr(app_module, "close_clients", close_clients)
+    with caplog.at_level(logging.ERROR, logger="agent"), TestClient(app_module.app):
+        deadline = time.monotonic() + 2
+        while not caplog.records and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    assert any("vector index unreachable" in str(record.exc_info[1]) for record in caplog.records if record.exc_info)
+    assert closed == [True]
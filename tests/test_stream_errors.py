@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+pytest.importorskip("langgraph")
+from fastapi.testclient import TestClient
+
+import app as app_module
+from benchmarks.fakes import FakeChatModel
+from src.agent.prompts import Prompts
+from src.agent.travel_agent import TravelChatbotGraph
+
+
+class FailingMidStreamModel(FakeChatModel):
+    """Streams a few tokens, then loses the connection"""
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        count = 0
+        async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+            yield chunk
+            count += 1
+            if count == 3:
+                raise RuntimeError("upstream reset")
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_failure_after_streamed_tokens_sends_an_error_event(monkeypatch):
+    llm = FailingMidStreamModel(first_token_latency=0, token_latency=0)
+    monkeypatch.setattr(app_module, "graph", TravelChatbotGraph(llm=llm, prompts=Prompts()))
+    response = TestClient(app_module.app).post("/ask/stream", json={"query": "Hi, how are you?"})
+
+    events = parse_events(response.text)
+    assert [name for name, _ in events].count("token") == 3
+    name, data = events[-1]
+    assert name == "error"
+    assert data["partial"] is True and data["fallback"] and "upstream reset" in data["message"]
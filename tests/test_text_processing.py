@@ -0,0 +1,26 @@
+from src.utils.text_processing import pack_context
+
+
+def chunk(chunk_id, text, similarity, **scores):
+    return {'text': text, 'metadata': {'chunk_id': chunk_id}, 'similarity': similarity, **scores}
+
+
+def test_pack_context_keeps_the_reranked_order():
+    # The cross-encoder preferred the chunk with the lowest dense similarity
+    results = [
+        chunk(40, "Twain describes the Sphinx at length and with awe.", 0.31, rerank_score=7.5),
+        chunk(3, "The ship left New York harbour in the rain.", 0.82, rerank_score=-2.0),
+        chunk(17, "Pilgrims argued about the price of donkeys.", 0.64, rerank_score=-4.1),
+    ]
+    packed = pack_context(results, duplicate_threshold=0.9)
+    assert [p['chunk_ids'] for p in packed] == [[40], [3], [17]]
+
+
+def test_merged_passage_ranks_as_its_best_chunk():
+    results = [
+        chunk(8, "Second half of a long description of Venice and its canals.", 0.4, score=0.05),
+        chunk(20, "An unrelated passage about the Azores and their donkeys.", 0.9, score=0.03),
+        chunk(7, "First half of a long description of the city on the water.", 0.3, score=0.01),
+    ]
+    packed = pack_context(results, duplicate_threshold=0.9)
+    assert [p['chunk_ids'] for p in packed] == [[7, 8], [20]]
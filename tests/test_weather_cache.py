@@ -0,0 +1,22 @@
+import pytest
+
+from src.tools.weather_cache import normalize_location
+
+
+@pytest.mark.parametrize("location, other", [
+    ("London, Canada", "London"),
+    ("Paris, US", "Paris"),
+    ("Paris, US", "Paris, France"),
+    ("Tbilisi, Georgia", "Tbilisi"),
+])
+def test_country_qualifier_is_part_of_the_key(location, other):
+    assert normalize_location(location) != normalize_location(other)
+
+
+@pytest.mark.parametrize("location, other", [
+    ("Paris, USA", "paris, united states"),
+    ("  São Paulo , Brazil ", "sao paulo, brazil"),
+    ("London, UK", "london, united kingdom"),
+])
+def test_spellings_of_the_same_place_share_a_key(location, other):
+    assert normalize_location(location) == normalize_location(other)
@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import StubWeatherServer
+from src.tools.wether_api import WeatherAPIClient
+
+
+@pytest.fixture
+def stub_server():
+    # Slow enough that every concurrent lookup arrives while the first is still in flight
+    server = StubWeatherServer(latency=0.2).start()
+    yield server
+    server.stop()
+
+
+def test_concurrent_lookups_share_one_upstream_call(stub_server):
+    client = WeatherAPIClient(api_key="test", base_url=stub_server.url)
+
+    async def lookups():
+        try:
+            return await asyncio.gather(*[client.aget_current_weather("Paris") for _ in range(50)])
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(lookups())
+    assert client.upstream_calls == 1
+    assert client.coalesced_calls == 49
+    assert all(result["location"]["name"] == "Paris" for result in results)
+
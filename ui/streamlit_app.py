@@ -1,7 +1,7 @@
 import streamlit as st
 import httpx
-import time
-from typing import List, Dict
+import json
+from typing import List, Dict, Iterator
 
 
 # Page configuration
@@ -140,20 +140,23 @@ st.markdown("""
 # Configuration
 API_URL = "http://agent-api:8080/ask"
 LOCAL_API_URL = "http://localhost:8080/ask"  # Fallback for local testing
+STREAM_API_URL = API_URL + "/stream"
+LOCAL_STREAM_API_URL = LOCAL_API_URL + "/stream"
 
-def check_api_connection():
-    """Check if the API is accessible"""
-    try:
-        with httpx.Client(timeout=5.0) as client:
-            response = client.get(API_URL.replace("/ask", "/health"))
-            return True
-    except:
+def check_api_connection() -> str:
+    """API status from its probes: ready, starting (alive but still loading) or down"""
+    for url in (API_URL, LOCAL_API_URL):
+        base_url = url[:-len("/ask")]
         try:
             with httpx.Client(timeout=5.0) as client:
-                response = client.get(LOCAL_API_URL.replace("/ask", "/health"))
-                return True
-        except:
-            return False
+                if client.get(f"{base_url}/readyz").status_code == 200:
+                    return "ready"
+                if client.get(f"{base_url}/healthz").status_code == 200:
+                    return "starting"
+                return "down"
+        except httpx.HTTPError:
+            continue
+    return "down"
 
 def call_travel_agent(query: str, chat_history: List[Dict]) -> str:
     """Call the travel agent API"""
@@ -185,12 +188,38 @@ def call_travel_agent(query: str, chat_history: List[Dict]) -> str:
     except Exception as e:
         return f"Error: {str(e)}"
 
-def stream_response(text: str):
-    """Stream response text word by word for better UX"""
-    words = text.split()
-    for i, word in enumerate(words):
-        yield word + (" " if i < len(words) - 1 else "")
-        time.sleep(0.02)
+def stream_travel_agent(query: str, chat_history: List[Dict]) -> Iterator[str]:
+    """Stream the answer from the travel agent API as it is generated (Server-Sent Events)"""
+    payload = {"query": query, "chat_history": chat_history}
+    for url in (STREAM_API_URL, LOCAL_STREAM_API_URL):
+        try:
+            with httpx.Client(timeout=httpx.Timeout(30.0, read=60.0)) as client:
+                with client.stream("POST", url, json=payload) as response:
+                    if response.status_code != 200:
+                        yield f"API Error: {response.status_code} - {response.read().decode()}"
+                        return
+                    event = None
+                    for line in response.iter_lines():
+                        if line.startswith("event:"):
+                            event = line[len("event:"):].strip()
+                        elif line.startswith("data:"):
+                            data = json.loads(line[len("data:"):])
+                            if event == "token":
+                                yield data.get("text", "")
+                            elif event == "error":
+                                # A failed answer comes with fallback text, after whatever had already streamed
+                                if data.get("fallback"):
+                                    yield ("\n\n" if data.get("partial") else "") + data["fallback"]
+                                else:
+                                    yield f"Error: {data.get('message', '')}"
+            return
+        except httpx.ConnectError:
+            # Fallback to local URL
+            continue
+        except Exception as e:
+            yield f"Error: {str(e)}"
+            return
+    yield "Connection Error: Unable to reach the travel planning service. Please ensure the API is running."
 
 # Sidebar
 with st.sidebar:
@@ -198,8 +227,12 @@ with st.sidebar:
     
     # API Status
     st.markdown("### 📡 Connection Status")
-    if check_api_connection():
+    api_status = check_api_connection()
+    if api_status == "ready":
         st.markdown('<div class="status-box status-connected">🟢 API Connected</div>', unsafe_allow_html=True)
+    elif api_status == "starting":
+        st.markdown('<div class="status-box status-connected">🟡 API Starting</div>', unsafe_allow_html=True)
+        st.info("The travel planning API is loading its models, it will be ready shortly.")
     else:
         st.markdown('<div class="status-box status-error">🔴 API Disconnected</div>', unsafe_allow_html=True)
         st.warning("The travel planning API is not accessible. Please check if the service is running.")
@@ -299,22 +332,19 @@ if "pending_query" in st.session_state:
                                 "agent": assistant_msg["content"]
                             })
         
-        # Show loading indicator
-        with st.spinner("🤔 Thinking..."):
-            response = call_travel_agent(prompt, api_history[-4:])  # Last 4 exchanges
-        
-        # Stream the response
+        # Stream the response as the agent generates it
         response_placeholder = st.empty()
+        response_placeholder.markdown("🤔 Thinking...")
         full_response = ""
         
-        for chunk in stream_response(response):
+        for chunk in stream_travel_agent(prompt, api_history[-4:]):  # Last 4 exchanges
             full_response += chunk
             response_placeholder.markdown(full_response + "▌")
             
         response_placeholder.markdown(full_response)
     
     # Add assistant response to chat history
-    st.session_state.messages.append({"role": "assistant", "content": response})
+    st.session_state.messages.append({"role": "assistant", "content": full_response})
     
     st.rerun()
 
@@ -345,22 +375,19 @@ if prompt := st.chat_input("Ask me anything about travel planning..."):
             else:
                 i += 1
         
-        # Show loading indicator
-        with st.spinner("🤔 Thinking..."):
-            response = call_travel_agent(prompt, api_history[-4:])  # Last 4 exchanges
-        
-        # Stream the response
+        # Stream the response as the agent generates it
         response_placeholder = st.empty()
+        response_placeholder.markdown("🤔 Thinking...")
         full_response = ""
         
-        for chunk in stream_response(response):
+        for chunk in stream_travel_agent(prompt, api_history[-4:]):  # Last 4 exchanges
             full_response += chunk
             response_placeholder.markdown(full_response + "▌")
             
         response_placeholder.markdown(full_response)
     
     # Add assistant response to chat history
-    st.session_state.messages.append({"role": "assistant", "content": response})
+    st.session_state.messages.append({"role": "assistant", "content": full_response})
 
 # Footer
 st.markdown("---")